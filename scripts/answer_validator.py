@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回答验证引擎
+将问题模板中的 answer_type 和 validation 验证标准一次性编译为预编译正则、
+日期时间解析器和枚举集合，在 process_response 中内联执行并返回结构化反馈；
+支持用进程池批量验证历史访谈记录
+"""
+
+import re
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from . import serializers
+except ImportError:
+    import serializers
+
+VAGUE_PATTERN = re.compile(r"不清楚|不知道|不确定|大概|可能吧|好像|差不多|说不好|待定")
+MEASURE_PATTERN = re.compile(r"\d+(\.\d+)?\s*(%|％|台|件|起|个|批|万元|元|美元|小时|天|次|mm|℃|V|A|Pa|psi|°F)")
+EVIDENCE_PATTERN = re.compile(r"检测|测试|试验|记录|照片|视频|数据|报告|验证|复现|测量")
+SUBJECTIVE_PATTERN = re.compile(r"感觉|觉得|应该是|非常严重|特别严重|极其")
+CAUSE_PATTERN = re.compile(r"原因|导致|因为|由于|造成|引起")
+ROOT_PATTERN = re.compile(r"根本|系统|机制|体系|管理|设计|标准缺失|未覆盖|失效")
+IMPROVE_PATTERN = re.compile(r"改进|优化|完善|增加|修改|更新|加强")
+ACTION_PATTERN = re.compile(r"增加|修改|更换|培训|制定|实施|更新|建立|导入|防错|检查")
+
+# 日期时间格式（依次尝试解析以确认为有效日期）
+DATE_CANDIDATE_PATTERN = re.compile(
+    r"(?P<ymd>\d{4}[-/.]\d{1,2}[-/.]\d{1,2})|(?P<cn>\d{4}年\d{1,2}月(\d{1,2}[日号])?)|(?P<hm>(?<!\d)\d{1,2}:\d{2}(?!\d))"
+)
+RELATIVE_TIME_PATTERN = re.compile(r"昨天|今天|前天|上周|本周|上个?月|本月|今年|去年|凌晨|早上|上午|下午|晚上|批次")
+
+LOCATION_TERMS = frozenset([
+    "工厂", "产线", "生产线", "车间", "工位", "现场", "仓库", "门店", "地区", "北美", "美国", "加拿大",
+    "安装", "部位", "环节", "工序", "外壳", "室内机", "室外机", "压缩机", "冷凝器", "蒸发器", "控制板"
+])
+PERSON_TERMS = frozenset([
+    "供应商", "操作员", "操作工", "工程师", "技术员", "班组", "人员", "安装工", "检验员", "客户",
+    "经销商", "维修", "主管", "经理"
+])
+# 人、机、料、法、环
+FISHBONE_TERMS = {
+    "人员": frozenset(["人员", "操作", "培训", "技能"]),
+    "机器": frozenset(["设备", "机器", "工装", "夹具", "校准"]),
+    "材料": frozenset(["材料", "来料", "供应商", "物料", "元件", "电容"]),
+    "方法": frozenset(["方法", "流程", "标准", "作业", "工艺", "程序"]),
+    "环境": frozenset(["环境", "温度", "湿度", "清洁", "粉尘"])
+}
+
+
+def _parse_dates(text: str) -> List[str]:
+    """解析文本中的日期/时间，返回有效的标准化结果"""
+    parsed = []
+    for match in DATE_CANDIDATE_PATTERN.finditer(text):
+        value = match.group(0)
+        try:
+            if match.lastgroup == "ymd":
+                parsed.append(datetime.strptime(re.sub(r"[/.]", "-", value), "%Y-%m-%d").date().isoformat())
+            elif match.lastgroup == "cn":
+                normalized = value.replace("号", "日")
+                fmt = "%Y年%m月%d日" if normalized.endswith("日") else "%Y年%m月"
+                parsed.append(datetime.strptime(normalized, fmt).date().isoformat())
+            elif match.lastgroup == "hm":
+                parsed.append(datetime.strptime(value, "%H:%M").time().isoformat())
+        except ValueError:
+            continue
+    return parsed
+
+
+def _contains_any(text: str, terms: frozenset) -> bool:
+    return any(term in text for term in terms)
+
+
+# 各项检查：(answer, evidence) -> (是否通过, 提示)
+def _check_specific(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if VAGUE_PATTERN.search(answer):
+        return False, "回答包含模糊表述，请给出具体事实"
+    return True, ""
+
+
+def _check_measurable(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if MEASURE_PATTERN.search(answer):
+        return True, ""
+    return False, "请补充可量化的数据（数量、比例、金额、时长等）"
+
+
+def _check_verifiable(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if evidence or EVIDENCE_PATTERN.search(answer):
+        return True, ""
+    return False, "请提供可验证的证据（检测数据、记录、照片等）"
+
+
+def _check_time(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if _parse_dates(answer):
+        return True, ""
+    if DATE_CANDIDATE_PATTERN.search(answer):
+        return False, "日期或时间无效，请检查格式（如 2024-01-20）"
+    return False, "请给出具体的日期或时间点"
+
+
+def _check_time_range(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if _parse_dates(answer) or RELATIVE_TIME_PATTERN.search(answer):
+        return True, ""
+    return False, "请说明问题发生的时间范围"
+
+
+def _check_location(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if _contains_any(answer, LOCATION_TERMS):
+        return True, ""
+    return False, "请说明具体的地点、产线、工序或部位"
+
+
+def _check_people(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if _contains_any(answer, PERSON_TERMS):
+        return True, ""
+    return False, "请列出涉及的人员、岗位或供应商"
+
+
+def _check_objective(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if SUBJECTIVE_PATTERN.search(answer) and not MEASURE_PATTERN.search(answer):
+        return False, "评估偏主观，请用数据支撑"
+    return True, ""
+
+
+def _check_cause(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if CAUSE_PATTERN.search(answer) and len(answer) >= 8:
+        return True, ""
+    return False, "请明确说明原因及其作用机理"
+
+
+def _check_root(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if ROOT_PATTERN.search(answer):
+        return True, ""
+    return False, "分析停留在表面，请继续追问至系统或管理层面的根本原因"
+
+
+def _check_comprehensive(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    covered = [name for name, terms in FISHBONE_TERMS.items() if _contains_any(answer, terms)]
+    if len(covered) >= 2:
+        return True, ""
+    return False, "请从人、机、料、法、环多个维度分析"
+
+
+def _check_improvement(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if IMPROVE_PATTERN.search(answer):
+        return True, ""
+    return False, "请指出可改进的环节"
+
+
+def _check_actionable(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if ACTION_PATTERN.search(answer):
+        return True, ""
+    return False, "请给出可执行的具体措施"
+
+
+def _check_nonempty(answer: str, evidence: List[str]) -> Tuple[bool, str]:
+    if answer.strip():
+        return True, ""
+    return False, "回答为空"
+
+
+# 验证标准文本 -> 检查函数
+CRITERIA_CHECKS = {
+    "是否具体": _check_specific,
+    "是否可测量": _check_measurable,
+    "是否可验证": _check_verifiable,
+    "时间是否准确": _check_time_range,
+    "是否有具体时间点": _check_time,
+    "位置是否具体": _check_location,
+    "是否可定位": _check_location,
+    "是否完整": _check_nonempty,
+    "是否准确": _check_people,
+    "评估是否客观": _check_objective,
+    "是否有数据支持": _check_measurable,
+    "原因是否具体": _check_cause,
+    "分析是否深入": _check_root,
+    "是否触及根本": _check_root,
+    "分析是否全面": _check_comprehensive,
+    "是否有改进空间": _check_improvement,
+    "措施是否可行": _check_actionable,
+    "是否有针对性": _check_specific
+}
+
+# answer_type 附加的基础检查
+ANSWER_TYPE_CHECKS = {
+    "时间描述": ("时间范围", _check_time_range),
+    "位置描述": ("位置信息", _check_location),
+    "人员列表": ("人员信息", _check_people),
+    "原因分析": ("原因说明", _check_cause),
+    "措施建议": ("措施说明", _check_actionable)
+}
+
+
+class CompiledQuestionRules:
+    """单个问题编译后的验证规则"""
+
+    __slots__ = ("question_id", "checks", "unchecked")
+
+    def __init__(self, question: Dict):
+        self.question_id = question["id"]
+        self.checks = [("非空", _check_nonempty)]
+        self.unchecked = []
+
+        type_check = ANSWER_TYPE_CHECKS.get(question.get("answer_type", ""))
+        if type_check is not None:
+            self.checks.append(type_check)
+
+        for criterion in question.get("validation", []):
+            check = CRITERIA_CHECKS.get(criterion)
+            if check is None:
+                # 无法自动判断的标准留给人工复核
+                self.unchecked.append(criterion)
+            elif all(existing is not check for _, existing in self.checks):
+                self.checks.append((criterion, check))
+
+    def validate(self, answer: str, evidence: List[str]) -> Dict:
+        failures = []
+        passed = 0
+        for criterion, check in self.checks:
+            ok, message = check(answer, evidence)
+            if ok:
+                passed += 1
+            else:
+                failures.append({"criterion": criterion, "message": message})
+        return {
+            "question_id": self.question_id,
+            "valid": not failures,
+            "score": passed / len(self.checks),
+            "failures": failures,
+            "unchecked": self.unchecked
+        }
+
+
+class AnswerValidator:
+    """回答验证器：按问题编译并缓存规则"""
+
+    def __init__(self, question_templates: Optional[Dict] = None):
+        self._rules = {}
+        self._questions = {}
+        if question_templates:
+            self.load_templates(question_templates)
+
+    def load_templates(self, question_templates: Dict):
+        """登记问题模板（规则在首次使用时编译）"""
+        for phase_data in question_templates.values():
+            for question in phase_data["questions"]:
+                if self._questions.get(question["id"]) is not question:
+                    self._questions[question["id"]] = question
+                    self._rules.pop(question["id"], None)
+
+    def compile(self, question_id: str) -> Optional[CompiledQuestionRules]:
+        """获取问题的编译规则，未知问题返回None"""
+        rules = self._rules.get(question_id)
+        if rules is None:
+            question = self._questions.get(question_id)
+            if question is None:
+                return None
+            rules = self._rules[question_id] = CompiledQuestionRules(question)
+        return rules
+
+    def validate(self, question_id: str, answer_text: str,
+                 answer_details: Optional[List[str]] = None,
+                 supporting_evidence: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        验证单个回答
+
+        Args:
+            question_id: 问题ID
+            answer_text: 回答文本
+            answer_details: 回答详情（与回答文本合并检查）
+            supporting_evidence: 支持证据
+
+        Returns:
+            Optional[Dict]: 结构化反馈，未知问题返回None
+        """
+        rules = self.compile(question_id)
+        if rules is None:
+            return None
+        text = answer_text if not answer_details else answer_text + " " + " ".join(answer_details)
+        return rules.validate(text, supporting_evidence or [])
+
+
+def _default_templates() -> Dict:
+    try:
+        from .five_w_interviewer import FiveWInterviewer
+    except ImportError:
+        from five_w_interviewer import FiveWInterviewer
+    return FiveWInterviewer().question_templates
+
+
+def validate_transcript(path: str, question_templates: Optional[Dict] = None) -> Dict:
+    """
+    验证一份 export_conversation 导出的访谈记录
+
+    Args:
+        path: 访谈记录文件路径
+        question_templates: 问题模板，默认使用 FiveWInterviewer 的模板
+
+    Returns:
+        Dict: 文件级汇总和逐题反馈
+    """
+    validator = AnswerValidator(question_templates or _default_templates())
+    data = serializers.read_file(path)
+
+    results = []
+    for entry in data.get("访谈记录", {}).get("对话历史", []):
+        answer = entry.get("回答", {})
+        feedback = validator.validate(
+            entry.get("问题ID") or answer.get("question_id", ""),
+            answer.get("answer_text", ""),
+            answer.get("answer_details", []),
+            answer.get("supporting_evidence", [])
+        )
+        if feedback is not None:
+            results.append(feedback)
+
+    return {
+        "file": path,
+        "answers": len(results),
+        "invalid": sum(1 for r in results if not r["valid"]),
+        "score": sum(r["score"] for r in results) / len(results) if results else 0.0,
+        "results": results
+    }
+
+
+def _validate_transcript_task(path: str) -> Dict:
+    try:
+        return validate_transcript(path)
+    except Exception as e:
+        return {"file": path, "error": str(e)}
+
+
+def validate_transcripts(paths: List[str], max_workers: Optional[int] = None) -> List[Dict]:
+    """
+    用进程池批量验证历史访谈记录
+
+    Args:
+        paths: 访谈记录文件路径列表
+        max_workers: 进程数，默认CPU核数
+
+    Returns:
+        List[Dict]: 每个文件的验证结果
+    """
+    if len(paths) <= 1 or max_workers == 1:
+        return [_validate_transcript_task(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_validate_transcript_task, paths, chunksize=16))
+
+
+def main():
+    """命令行入口：批量验证访谈记录，未提供文件时运行示例"""
+    parser = argparse.ArgumentParser(description="访谈回答验证")
+    parser.add_argument("transcripts", nargs="*", help="export_conversation 导出的访谈记录文件")
+    parser.add_argument("--workers", type=int, default=None, help="进程数")
+    args = parser.parse_args()
+
+    if args.transcripts:
+        for report in validate_transcripts(args.transcripts, args.workers):
+            if "error" in report:
+                print(f"{report['file']}: 错误 {report['error']}")
+            else:
+                print(f"{report['file']}: {report['answers']}条回答，{report['invalid']}条不合格，"
+                      f"平均得分 {report['score']:.2f}")
+        return
+
+    validator = AnswerValidator(_default_templates())
+    samples = [
+        ("when_problem", "大概上个月吧"),
+        ("when_problem", "2024-02-30 首次出现"),
+        ("when_problem", "2024年1月15日首次出现，之后每批次都有"),
+        ("how_severe", "非常严重"),
+        ("how_severe", "已有300台受影响，客户投诉12起"),
+        ("why_process", "作业标准缺失，来料检验流程未覆盖电容参数")
+    ]
+    for question_id, answer in samples:
+        feedback = validator.validate(question_id, answer)
+        print(question_id, answer, "->", feedback["valid"], [f["message"] for f in feedback["failures"]])
+
+
+if __name__ == "__main__":
+    main()
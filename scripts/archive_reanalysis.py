@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史媒体归档分片重分析
+缺陷模型或标准阈值变化后，对全部历史图片/视频重新分析并重新生成受影响的8D报告：
+按内容哈希去重并分片，分片在本机进程池中执行，也可由多台主机共享同一工作目录（共享文件系统作为工作队列）；
+进度按分片写入检查点，中断后重跑只处理未完成的内容，最后汇总吞吐量和错误
+"""
+
+import os
+import json
+import time
+import socket
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    from .multimedia_processor import MultimediaProcessor
+    from .eight_d_report_generator import EightDReportGenerator
+    from .media_access import MappedMedia
+    from . import serializers
+except ImportError:
+    from multimedia_processor import MultimediaProcessor
+    from eight_d_report_generator import EightDReportGenerator
+    from media_access import MappedMedia
+    import serializers
+
+MANIFEST_VERSION = 1
+
+# 分片锁超过该时长未续期视为持有者已失效，可被其他进程接管
+DEFAULT_LEASE_SECONDS = 600
+
+# 每处理多少个内容写一次检查点（刷盘并续期分片锁）
+CHECKPOINT_EVERY = 20
+
+# 汇总中保留的错误样本数
+MAX_ERROR_SAMPLES = 20
+
+_processor = None
+
+
+def _worker_processor() -> MultimediaProcessor:
+    """工作进程内复用的处理器"""
+    global _processor
+    if _processor is None:
+        _processor = MultimediaProcessor()
+    return _processor
+
+
+def _atomic_write(data, path: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    serializers.write_file(data, tmp_path, "json")
+    os.replace(tmp_path, path)
+
+
+def _hash_file(path: str) -> Tuple[str, Optional[str], int, int]:
+    """计算文件内容哈希，返回 (路径, 哈希或None, 大小, 修改时间)"""
+    try:
+        stat = os.stat(path)
+        with MappedMedia(path) as media:
+            return path, media.sha256(), stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return path, None, 0, 0
+
+
+def shard_of(content_hash: str, shards: int) -> int:
+    """内容哈希对应的分片号（与主机、文件路径无关，重新规划时保持稳定）"""
+    return int(content_hash[:8], 16) % shards
+
+
+class ShardLock:
+    """
+    基于共享文件系统的分片锁：O_EXCL 创建锁文件即为持有，处理过程中定期续期（更新修改时间），
+    超过租期未续期的锁可被接管。接管在极端竞争下可能让两个进程处理同一分片，
+    由于每个持有者写各自的结果文件、结果按内容哈希合并，重复处理不会损坏结果
+    """
+
+    def __init__(self, path: str, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+
+    def acquire(self) -> bool:
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    age = time.time() - os.stat(self.path).st_mtime
+                except FileNotFoundError:
+                    continue
+                if age <= self.lease_seconds:
+                    return False
+                # 接管失效的锁：先改名移走，只有一个进程能改名成功，随后重新竞争创建
+                stale_path = f"{self.path}.stale-{self.owner}"
+                try:
+                    os.rename(self.path, stale_path)
+                    os.remove(stale_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(self.owner)
+            return True
+        return False
+
+    def renew(self):
+        try:
+            os.utime(self.path)
+        except FileNotFoundError:
+            pass
+
+    def release(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def read_results(work_dir: str, shard: int, results_from: int = 0,
+                 analysis_types: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+    """
+    合并分片的全部结果文件（各持有者各写一个），同一内容以最后完成的记录为准；
+    中断时写了一半的末行会被忽略
+
+    Args:
+        work_dir: 工作目录
+        shard: 分片号
+        results_from: 有效结果的最早规划代数，更早的记录（分片数或分析参数变化前）被丢弃
+        analysis_types: 当前分析类型，提供时丢弃分析类型不符的记录
+
+    Returns:
+        Dict[str, Dict]: 内容哈希 -> 结果记录
+    """
+    records = {}
+    prefix = f"shard-{shard:05d}."
+    results_dir = os.path.join(work_dir, "results")
+    for name in sorted(os.listdir(results_dir)):
+        if not name.startswith(prefix) or not name.endswith(".jsonl"):
+            continue
+        with open(os.path.join(results_dir, name), "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("generation", 0) < results_from:
+                    continue
+                if analysis_types is not None and record.get("analysis_type") != analysis_types.get(record["kind"]):
+                    continue
+                previous = records.get(record["hash"])
+                if previous is None or record["finished_at"] >= previous["finished_at"]:
+                    records[record["hash"]] = record
+    return records
+
+
+def _analyze_with_retries(processor: MultimediaProcessor, item: Dict, analysis_types: Dict[str, str],
+                          max_retries: int, retry_backoff: float, generation: int) -> Dict:
+    """分析一个内容（路径失效时换用同内容的其他副本），失败按退避重试"""
+    analysis_type = analysis_types[item["kind"]]
+    started = time.time()
+    result, attempts = {"status": "error", "error_message": "没有可读取的文件"}, 0
+    for attempt in range(max_retries + 1):
+        attempts = attempt + 1
+        path = next((p for p in item["paths"] if os.path.exists(p)), None)
+        if path is None:
+            break
+        try:
+            if item["kind"] == "video":
+                result = processor.process_video(path, analysis_type)
+            else:
+                result = processor.process_image(path, analysis_type)
+        except Exception as e:
+            result = {"status": "error", "error_message": str(e)}
+        if result.get("status") == "success":
+            break
+        if attempt < max_retries and retry_backoff:
+            time.sleep(retry_backoff * (attempt + 1))
+    return {
+        "hash": item["hash"],
+        "generation": generation,
+        "kind": item["kind"],
+        "paths": item["paths"],
+        "analysis_type": analysis_type,
+        "status": result.get("status", "error"),
+        "attempts": attempts,
+        "seconds": round(time.time() - started, 4),
+        "finished_at": time.time(),
+        "result": result
+    }
+
+
+def process_shard(work_dir: str, shard: int, owner: str, config: Dict) -> Dict:
+    """
+    处理一个已持有锁的分片：跳过检查点中已成功的内容，结果逐条追加到本持有者的结果文件
+
+    Returns:
+        Dict: 本次处理数、成功数、失败数
+    """
+    items = serializers.read_file(os.path.join(work_dir, "shards", f"shard-{shard:05d}.json"), "json")
+    records = read_results(work_dir, shard, config["results_from"], config["analysis_types"])
+    done = {h for h, record in records.items() if record["status"] == "success"}
+    todo = [item for item in items if item["hash"] not in done]
+
+    lock = ShardLock(os.path.join(work_dir, "locks", f"shard-{shard:05d}.lock"), owner, config["lease_seconds"])
+    stats = {"processed": 0, "succeeded": 0, "failed": 0}
+    processor = _worker_processor()
+    results_path = os.path.join(work_dir, "results", f"shard-{shard:05d}.{owner}.jsonl")
+    with open(results_path, "ab+") as f:
+        # 同名持有者上次中断时末行可能不完整，先换行，避免与新记录粘连
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+        for i, item in enumerate(todo, 1):
+            record = _analyze_with_retries(processor, item, config["analysis_types"],
+                                           config["max_retries"], config["retry_backoff"], config["generation"])
+            f.write(serializers.dumps(record, "json") + b"\n")
+            stats["processed"] += 1
+            stats["succeeded" if record["status"] == "success" else "failed"] += 1
+            if i % config["checkpoint_every"] == 0:
+                f.flush()
+                os.fsync(f.fileno())
+                lock.renew()
+        f.flush()
+        os.fsync(f.fileno())
+
+    with open(os.path.join(work_dir, "done", f"shard-{shard:05d}"), "w") as f:
+        f.write(owner)
+    return stats
+
+
+def _worker_loop(work_dir: str, owner: str, config: Dict) -> Dict:
+    """工作进程：反复领取未完成的分片直到没有可领取的分片"""
+    totals = {"shards": 0, "processed": 0, "succeeded": 0, "failed": 0}
+    # 各进程从不同分片开始轮询，减少对同一分片锁的竞争
+    offset = config["offset"] % config["shards"]
+    for shard in list(range(offset, config["shards"])) + list(range(offset)):
+        if os.path.exists(os.path.join(work_dir, "done", f"shard-{shard:05d}")):
+            continue
+        lock = ShardLock(os.path.join(work_dir, "locks", f"shard-{shard:05d}.lock"), owner, config["lease_seconds"])
+        if not lock.acquire():
+            continue
+        try:
+            # 获得锁后再检查一次，避免处理刚被其他进程完成的分片
+            if os.path.exists(os.path.join(work_dir, "done", f"shard-{shard:05d}")):
+                continue
+            stats = process_shard(work_dir, shard, owner, config)
+        finally:
+            lock.release()
+        totals["shards"] += 1
+        for key in ("processed", "succeeded", "failed"):
+            totals[key] += stats[key]
+    return totals
+
+
+def _iter_media(roots: Iterable[str], formats: Dict[str, str]) -> Iterator[Tuple[str, str]]:
+    for root in roots:
+        for directory, _, names in os.walk(root):
+            for name in sorted(names):
+                kind = formats.get(os.path.splitext(name)[1].lower())
+                if kind:
+                    yield os.path.abspath(os.path.join(directory, name)), kind
+
+
+def _iter_strings(value) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_strings(item)
+
+
+class ArchiveReanalyzer:
+    """历史归档分片重分析引擎"""
+
+    def __init__(self, work_dir: str, processes: int = None, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_retries: int = 2, retry_backoff: float = 1.0, checkpoint_every: int = CHECKPOINT_EVERY):
+        """
+        Args:
+            work_dir: 工作目录（多主机运行时放在共享文件系统上）
+            processes: 本机工作进程数，默认CPU核数
+            lease_seconds: 分片锁租期（秒）
+            max_retries: 单个内容失败后的重试次数
+            retry_backoff: 重试退避基数（秒）
+            checkpoint_every: 检查点间隔（内容数）
+        """
+        self.work_dir = work_dir
+        self.processes = processes or os.cpu_count() or 1
+        self.lease_seconds = lease_seconds
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.checkpoint_every = checkpoint_every
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        for name in ("shards", "results", "locks", "done"):
+            os.makedirs(os.path.join(work_dir, name), exist_ok=True)
+        self.manifest_path = os.path.join(work_dir, "manifest.json")
+
+    def manifest(self) -> Optional[Dict]:
+        """已规划的清单，未规划时返回None"""
+        if not os.path.exists(self.manifest_path):
+            return None
+        return serializers.read_file(self.manifest_path, "json")
+
+    def plan(self, roots: Iterable[str], shards: int = 64, image_analysis: str = "quality_defect",
+             video_analysis: str = "fault_phenomenon", model_version: str = "") -> Dict:
+        """
+        扫描归档、按内容哈希去重并分片（哈希在进程池中并行计算，
+        大小和修改时间未变的文件沿用上次清单中的哈希）
+
+        Args:
+            roots: 归档目录
+            shards: 分片数（应明显多于全部主机的进程总数，便于负载均衡）
+            image_analysis: 图片重分析类型
+            video_analysis: 视频重分析类型
+            model_version: 缺陷模型版本/标准阈值标识，与上次规划不同时全部内容重新分析
+
+        Returns:
+            Dict: 清单（文件数、内容数、分片数、分析参数）
+        """
+        processor = MultimediaProcessor()
+        formats = {ext: "image" for ext in processor.supported_image_formats}
+        formats.update({ext: "video" for ext in processor.supported_video_formats})
+
+        previous = self.manifest() or {}
+        known = {path: tuple(entry) for path, entry in previous.get("file_hashes", {}).items()}
+        files = list(_iter_media(roots, formats))
+        kinds = dict(files)
+
+        hashes, to_hash = {}, []
+        for path, _ in files:
+            entry = known.get(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if entry and entry[1] == stat.st_size and entry[2] == stat.st_mtime_ns:
+                hashes[path] = entry
+            else:
+                to_hash.append(path)
+        if to_hash:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                for path, content_hash, size, mtime_ns in executor.map(_hash_file, to_hash, chunksize=64):
+                    if content_hash:
+                        hashes[path] = (content_hash, size, mtime_ns)
+
+        contents = {}
+        for path, (content_hash, _, _) in sorted(hashes.items()):
+            item = contents.setdefault(content_hash, {"hash": content_hash, "kind": kinds[path], "paths": []})
+            item["paths"].append(path)
+
+        analysis_types = {"image": image_analysis, "video": video_analysis}
+        generation = previous.get("generation", 0) + 1
+        # 分片数、分析参数或模型版本变化后，之前的结果全部作废；只是文件增减时保留未变内容的结果
+        if (previous.get("shards") == shards and previous.get("analysis_types") == analysis_types
+                and previous.get("model_version", "") == model_version):
+            results_from = previous.get("results_from", 0)
+        else:
+            results_from = generation
+
+        buckets = [[] for _ in range(shards)]
+        for content_hash, item in contents.items():
+            buckets[shard_of(content_hash, shards)].append(item)
+        for shard, items in enumerate(buckets):
+            shard_path = os.path.join(self.work_dir, "shards", f"shard-{shard:05d}.json")
+            unchanged = (results_from != generation and os.path.exists(shard_path)
+                         and serializers.read_file(shard_path, "json") == items)
+            if unchanged:
+                continue
+            _atomic_write(items, shard_path)
+            # 内容列表有变化的分片重新打开，新增内容会被处理
+            try:
+                os.remove(os.path.join(self.work_dir, "done", f"shard-{shard:05d}"))
+            except FileNotFoundError:
+                pass
+        for shard in range(shards, previous.get("shards", 0)):
+            for name in (os.path.join("shards", f"shard-{shard:05d}.json"), os.path.join("done", f"shard-{shard:05d}")):
+                try:
+                    os.remove(os.path.join(self.work_dir, name))
+                except FileNotFoundError:
+                    pass
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "created": time.time(),
+            "generation": generation,
+            "results_from": results_from,
+            "shards": shards,
+            "files": len(hashes),
+            "contents": len(contents),
+            "analysis_types": analysis_types,
+            "model_version": model_version,
+            "file_hashes": {path: list(entry) for path, entry in hashes.items()}
+        }
+        _atomic_write(manifest, self.manifest_path)
+        return manifest
+
+    def run(self, retry_errors: bool = False) -> Dict:
+        """
+        在本机进程池中处理所有未完成的分片（多台主机可同时对同一工作目录运行）
+
+        Args:
+            retry_errors: 重新打开含失败内容的已完成分片，只重试失败的内容
+
+        Returns:
+            Dict: 汇总
+        """
+        manifest = self.manifest()
+        if manifest is None:
+            raise RuntimeError("尚未规划，请先调用 plan()")
+        if retry_errors:
+            for shard in range(manifest["shards"]):
+                marker = os.path.join(self.work_dir, "done", f"shard-{shard:05d}")
+                if os.path.exists(marker) and any(r["status"] != "success"
+                                                  for r in self._results(manifest, shard).values()):
+                    os.remove(marker)
+
+        config = {
+            "shards": manifest["shards"],
+            "analysis_types": manifest["analysis_types"],
+            "generation": manifest.get("generation", 0),
+            "results_from": manifest.get("results_from", 0),
+            "lease_seconds": self.lease_seconds,
+            "max_retries": self.max_retries,
+            "retry_backoff": self.retry_backoff,
+            "checkpoint_every": self.checkpoint_every
+        }
+        start = time.time()
+        totals = {"shards": 0, "processed": 0, "succeeded": 0, "failed": 0}
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            futures = [executor.submit(_worker_loop, self.work_dir, f"{self.owner}-{i}",
+                                       dict(config, offset=hash(self.owner) + i * config["shards"] // self.processes))
+                       for i in range(self.processes)]
+            for future in futures:
+                for key, value in future.result().items():
+                    totals[key] += value
+        elapsed = time.time() - start
+
+        summary = self.summary()
+        summary["this_run"] = dict(totals, seconds=round(elapsed, 2),
+                                   throughput_per_second=round(totals["processed"] / elapsed, 2) if elapsed else 0.0)
+        return summary
+
+    def _results(self, manifest: Dict, shard: int) -> Dict[str, Dict]:
+        """当前规划下分片的有效结果（只保留仍在分片内容列表中的内容）"""
+        records = read_results(self.work_dir, shard, manifest.get("results_from", 0), manifest.get("analysis_types"))
+        items = serializers.read_file(os.path.join(self.work_dir, "shards", f"shard-{shard:05d}.json"), "json")
+        current = {item["hash"] for item in items}
+        return {h: record for h, record in records.items() if h in current}
+
+    def summary(self) -> Dict:
+        """
+        汇总全部分片的检查点
+
+        Returns:
+            Dict: 完成情况、失败样本、整体吞吐量，以及按该吞吐量估算的全量耗时
+        """
+        manifest = self.manifest() or {"shards": 0, "contents": 0, "files": 0}
+        succeeded, failed, busy_seconds = 0, 0, 0.0
+        first, last = None, None
+        errors = []
+        for shard in range(manifest["shards"]):
+            for record in self._results(manifest, shard).values():
+                busy_seconds += record["seconds"]
+                first = record["finished_at"] if first is None else min(first, record["finished_at"])
+                last = record["finished_at"] if last is None else max(last, record["finished_at"])
+                if record["status"] == "success":
+                    succeeded += 1
+                else:
+                    failed += 1
+                    if len(errors) < MAX_ERROR_SAMPLES:
+                        errors.append({"paths": record["paths"],
+                                       "error": record["result"].get("error_message", "")})
+        done_shards = sum(1 for shard in range(manifest["shards"])
+                          if os.path.exists(os.path.join(self.work_dir, "done", f"shard-{shard:05d}")))
+        wall = (last - first) if first is not None and last > first else 0.0
+        throughput = (succeeded + failed) / wall if wall else 0.0
+        return {
+            "files": manifest["files"],
+            "contents": manifest["contents"],
+            "shards": manifest["shards"],
+            "shards_done": done_shards,
+            "succeeded": succeeded,
+            "failed": failed,
+            "remaining": manifest["contents"] - succeeded - failed,
+            "throughput_per_second": round(throughput, 2),
+            "avg_seconds_per_content": round(busy_seconds / (succeeded + failed), 4) if succeeded + failed else 0.0,
+            "estimated_full_run_hours": round(manifest["contents"] / throughput / 3600, 2) if throughput else None,
+            "errors": errors
+        }
+
+    def results_index(self) -> Dict[str, Dict]:
+        """
+        按文件路径、内容哈希和文件名索引的成功结果摘要，用于定位受影响的8D报告；
+        归档中同名文件内容不同时（如各目录下的 IMG_0001.jpg）不按文件名索引，避免关联到其他文件的结果
+
+        Returns:
+            Dict[str, Dict]: 路径/文件名/哈希 -> 结果摘要
+        """
+        manifest = self.manifest() or {"shards": 0}
+        basename_hashes = {}
+        for path, entry in manifest.get("file_hashes", {}).items():
+            basename_hashes.setdefault(os.path.basename(path), set()).add(entry[0])
+        index = {}
+        for shard in range(manifest["shards"]):
+            for record in self._results(manifest, shard).values():
+                if record["status"] != "success":
+                    continue
+                result = record["result"]
+                digest = {
+                    "content_hash": record["hash"],
+                    "analysis_type": record["analysis_type"],
+                    "severity": result.get("severity", ""),
+                    "defects": [d.get("type", "") for d in result.get("defects_detected", [])],
+                    "issues": [i.get("issue", "") for i in result.get("issues_detected", [])],
+                    "description": result.get("description", "")
+                }
+                index[record["hash"]] = digest
+                for path in record["paths"]:
+                    index[path] = digest
+                    name = os.path.basename(path)
+                    if len(basename_hashes.get(name, ())) == 1:
+                        index.setdefault(name, digest)
+        return index
+
+    def regenerate_reports(self, report_paths: Iterable[str], output_dir: str) -> Dict[str, int]:
+        """
+        重新生成引用了已重分析媒体（路径、内容哈希或归档中唯一的文件名）的8D报告：
+        将新结果写入D4数据分析的"多媒体复核"，通过 EightDReportGenerator 重新生成到输出目录
+
+        Args:
+            report_paths: generate_report 输出的报告文件
+            output_dir: 重新生成的报告目录（重复执行覆盖同名文件，结果相同）
+
+        Returns:
+            Dict[str, int]: 检查数、受影响数、重新生成数
+        """
+        index = self.results_index()
+        stats = {"checked": 0, "affected": 0, "regenerated": 0}
+        os.makedirs(output_dir, exist_ok=True)
+        for path in report_paths:
+            report = serializers.read_file(path)
+            stats["checked"] += 1
+            referenced = {}
+            for text in _iter_strings(report.get("8D分析", {})):
+                digest = index.get(text) or index.get(os.path.basename(text))
+                if digest is not None:
+                    referenced[text] = digest
+            if not referenced:
+                continue
+            stats["affected"] += 1
+            d4 = report["8D分析"].get("D4")
+            if not d4:
+                continue
+            d4["data_analysis"] = dict(d4.get("data_analysis") or {}, 多媒体复核=referenced)
+            generator = EightDReportGenerator.from_report_data(report)
+            generator.generate_report(os.path.join(output_dir, os.path.basename(path)))
+            stats["regenerated"] += 1
+        return stats
+
+
+def create_demo_archive(directory: str, images: int, videos: int) -> str:
+    """生成演示归档（含重复内容和无法分析的文件）和引用其中照片的8D报告，返回报告目录"""
+    archive = os.path.join(directory, "archive")
+    os.makedirs(archive)
+    for i in range(images):
+        # 每10张图片中有一张与上一张内容相同（同一照片被归档了两次）
+        seed = i - 1 if i % 10 == 9 else i
+        with open(os.path.join(archive, f"img_{i:05d}.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + seed.to_bytes(4, "big") * 1024)
+    for i in range(videos):
+        with open(os.path.join(archive, f"clip_{i:03d}.mp4"), "wb") as f:
+            f.write(b"\x00\x00\x00\x18ftypmp42" + i.to_bytes(4, "big") * 4096)
+    # 扩展名与内容不符的文件（视频被存成了.jpg）
+    with open(os.path.join(archive, "mislabeled.jpg"), "wb") as f:
+        f.write(b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 64)
+
+    reports = os.path.join(directory, "reports")
+    os.makedirs(reports)
+    for k in range(5):
+        generator = EightDReportGenerator()
+        generator.collect_information("D4", {
+            "root_cause_analysis": "鱼骨图分析", "fishbone_diagram": {}, "five_whys": [],
+            "data_analysis": {"支持证据": [f"img_{k * 7:05d}.png", "现场记录"]},
+            "potential_causes": [], "verified_root_cause": "来料划伤"
+        })
+        generator.generate_report(os.path.join(reports, f"8D-{k:03d}.json"))
+    return reports
+
+
+def main():
+    """命令行入口：规划（首次或指定归档目录时）、执行未完成分片、可选重新生成报告并输出汇总"""
+    parser = argparse.ArgumentParser(description="历史媒体归档分片重分析")
+    parser.add_argument("roots", nargs="*", help="归档目录，提供时重新规划（沿用未变文件的哈希）")
+    parser.add_argument("--work-dir", default="", help="工作目录，多主机运行时位于共享文件系统，缺省时运行演示")
+    parser.add_argument("--shards", type=int, default=64, help="分片数")
+    parser.add_argument("--processes", type=int, default=None, help="本机工作进程数")
+    parser.add_argument("--image-analysis", default="quality_defect", help="图片重分析类型")
+    parser.add_argument("--video-analysis", default="fault_phenomenon", help="视频重分析类型")
+    parser.add_argument("--model-version", default="", help="缺陷模型版本/标准阈值标识，变化时全部内容重新分析")
+    parser.add_argument("--retry-errors", action="store_true", help="重试之前失败的内容")
+    parser.add_argument("--retry-backoff", type=float, default=1.0, help="重试退避基数（秒）")
+    parser.add_argument("--reports", nargs="*", default=[], help="需检查并重新生成的8D报告文件")
+    parser.add_argument("--report-output", default="regenerated_reports", help="重新生成的报告目录")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="archive_demo_") as demo_dir:
+        work_dir, roots, reports = args.work_dir, args.roots, args.reports
+        if not work_dir:
+            report_dir = create_demo_archive(demo_dir, 2000, 20)
+            work_dir, roots = os.path.join(demo_dir, "work"), [os.path.join(demo_dir, "archive")]
+            reports = sorted(os.path.join(report_dir, name) for name in os.listdir(report_dir))
+            args.report_output = os.path.join(demo_dir, "regenerated")
+            args.retry_backoff = 0.0
+
+        engine = ArchiveReanalyzer(work_dir, args.processes, retry_backoff=args.retry_backoff)
+        if roots or engine.manifest() is None:
+            start = time.time()
+            manifest = engine.plan(roots, args.shards, args.image_analysis, args.video_analysis,
+                                   args.model_version)
+            print(f"规划完成: {manifest['files']} 个文件, {manifest['contents']} 个不同内容, "
+                  f"{manifest['shards']} 个分片, 耗时 {time.time() - start:.2f}s")
+
+        summary = engine.run(args.retry_errors)
+        this_run = summary["this_run"]
+        print(f"本次运行: {this_run['shards']} 个分片, 处理 {this_run['processed']} 个内容, "
+              f"失败 {this_run['failed']}, {this_run['throughput_per_second']} 个/秒")
+        print(f"总体: 完成 {summary['shards_done']}/{summary['shards']} 个分片, 成功 {summary['succeeded']}, "
+              f"失败 {summary['failed']}, 剩余 {summary['remaining']}")
+        for error in summary["errors"][:5]:
+            print(f"  失败: {os.path.basename(error['paths'][0])}: {error['error']}")
+
+        if reports:
+            stats = engine.regenerate_reports(reports, args.report_output)
+            print(f"8D报告: 检查 {stats['checked']}, 受影响 {stats['affected']}, 重新生成 {stats['regenerated']}")
+
+        # 再次运行：检查点中已完成的内容不会重复处理
+        rerun = engine.run()["this_run"]
+        print(f"重复运行: 处理 {rerun['processed']} 个内容")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试套件
+使用合成负载覆盖各公开入口，结果保存为带机器信息的JSON，并支持与基线对比
+发现超过阈值（默认10%）的性能回退
+
+用法:
+    python scripts/benchmark_suite.py --quick -o results.json
+    python scripts/benchmark_suite.py -o new.json --compare results.json
+    python scripts/benchmark_suite.py --filter interview
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .multimedia_processor import MultimediaProcessor
+    from .five_w_interviewer import FiveWInterviewer
+    from .eight_d_report_generator import EightDReportGenerator
+    from . import serializers
+except ImportError:
+    from multimedia_processor import MultimediaProcessor
+    from five_w_interviewer import FiveWInterviewer
+    from eight_d_report_generator import EightDReportGenerator
+    import serializers
+
+# 已注册的基准测试: name -> {"func", "params", "quick_params", "repeat"}
+BENCHMARKS = {}
+
+KB = 1024
+MB = 1024 * 1024
+
+
+def benchmark(name: str, params: List, quick_params: Optional[List] = None, repeat: int = 5) -> Callable:
+    """
+    注册基准测试
+
+    被装饰函数签名为 func(param, workdir)，完成准备工作后返回待计时的无参可调用对象；
+    返回 None 表示当前环境不支持该用例（例如缺少python-docx）
+
+    Args:
+        name: 基准名称
+        params: 完整模式下的参数列表
+        quick_params: 快速模式下的参数列表，默认与params相同
+        repeat: 重复计时次数
+    """
+    def decorator(func: Callable) -> Callable:
+        BENCHMARKS[name] = {
+            "func": func,
+            "params": params,
+            "quick_params": quick_params if quick_params is not None else params,
+            "repeat": repeat
+        }
+        return func
+    return decorator
+
+
+def _write_synthetic_image(path: str, size: int):
+    """写入指定大小的合成JPEG文件（JPEG头 + 伪随机数据）"""
+    header = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+    chunk = os.urandom(MB)
+    with open(path, 'wb') as f:
+        f.write(header)
+        remaining = size - len(header)
+        while remaining > 0:
+            f.write(chunk[:min(remaining, len(chunk))])
+            remaining -= len(chunk)
+
+
+def build_synthetic_templates(question_count: int) -> Dict:
+    """构建包含question_count个问题的合成问题模板，按阶段比例分配"""
+    phase_split = (("initial", 0.5), ("root_cause", 0.3), ("prevention", 0.2))
+    templates = {}
+    assigned = 0
+    for index, (phase, ratio) in enumerate(phase_split):
+        count = question_count - assigned if index == len(phase_split) - 1 else max(1, int(question_count * ratio))
+        assigned += count
+        templates[phase] = {
+            "description": f"合成{phase}阶段",
+            "questions": [
+                {
+                    "id": f"{phase}_{i}",
+                    "question": f"合成问题 {phase} #{i}？",
+                    "category": "合成",
+                    "purpose": "基准测试",
+                    "follow_up": ["追问一", "追问二"],
+                    "answer_type": "详细描述",
+                    "validation": ["是否具体"]
+                }
+                for i in range(count)
+            ]
+        }
+    return templates
+
+
+def build_full_8d_inputs() -> Dict[str, Dict]:
+    """构建D0-D8完整的合成输入"""
+    return {
+        "D0": {
+            "problem_description": "空调制冷效果不佳",
+            "discovery_date": "2024-01-20",
+            "discovery_person": "张三",
+            "affected_products": [f"AC-2024-{i:03d}" for i in range(50)],
+            "initial_severity": "中等",
+            "initial_response": "暂停相关产品出货"
+        },
+        "D1": {
+            "team_leader": "李四",
+            "team_members": ["王五", "赵六", "钱七", "孙八"],
+            "team_roles": {"王五": "质量", "赵六": "工艺", "钱七": "采购", "孙八": "售后"},
+            "communication_plan": "每日站会"
+        },
+        "D2": {
+            "problem_statement": "压缩机启动后立即停止",
+            "problem_scope": "2024年1月批次",
+            "affected_customers": 120,
+            "customer_impact": "制冷失效",
+            "safety_impact": "无",
+            "legal_impact": "无",
+            "financial_impact": "约50万元"
+        },
+        "D3": {
+            "containment_actions": ["库存隔离", "在途拦截", "客户现场更换"],
+            "implementation_date": "2024-01-22",
+            "responsible_person": "王五",
+            "effectiveness_verification": "抽检100台无复发",
+            "customer_notification": True
+        },
+        "D4": {
+            "root_cause_analysis": "启动电容容值偏低",
+            "fishbone_diagram": EightDReportGenerator().generate_fishbone_diagram("压缩机停机"),
+            "five_whys": EightDReportGenerator().generate_five_whys("压缩机停机"),
+            "data_analysis": {"样本数": 200, "不良率": 0.035},
+            "potential_causes": ["电容", "电压", "控制板"],
+            "verified_root_cause": "供应商电容批次不良"
+        },
+        "D5": {
+            "corrective_actions": [{"action": "更换电容供应商", "owner": "钱七"}],
+            "implementation_plan": "两周内切换",
+            "responsible_person": "钱七",
+            "target_date": "2024-02-15",
+            "resource_requirements": "采购预算"
+        },
+        "D6": {
+            "implementation_status": "已完成",
+            "verification_results": {"复测台数": 500, "不良数": 0},
+            "effectiveness_assessment": "有效",
+            "side_effects": "无"
+        },
+        "D7": {
+            "prevention_measures": ["来料全检"],
+            "process_improvements": ["增加启动测试"],
+            "training_requirements": ["检验员培训"],
+            "system_updates": ["MES增加电容参数"],
+            "documentation_changes": ["更新控制计划"]
+        },
+        "D8": {
+            "lessons_learned": ["关键元件需双供应商"],
+            "team_recognition": "全员表彰",
+            "process_improvements": "纳入年度改进",
+            "knowledge_sharing": "质量例会分享"
+        }
+    }
+
+
+@benchmark("process_image", params=[100 * KB, 1 * MB, 10 * MB, 100 * MB],
+           quick_params=[100 * KB, 1 * MB], repeat=3)
+def bench_process_image(size: int, workdir: str):
+    """不同大小图片经过 process_image 的耗时"""
+    image_path = os.path.join(workdir, f"synthetic_{size}.jpg")
+    _write_synthetic_image(image_path, size)
+    processor = MultimediaProcessor()
+    return lambda: processor.process_image(image_path, "quality_defect")
+
+
+@benchmark("process_video", params=[1], repeat=5)
+def bench_process_video(_: int, workdir: str):
+    """1 MB视频经过 process_video 各分析类型的耗时"""
+    video_path = os.path.join(workdir, "synthetic.mp4")
+    with open(video_path, 'wb') as f:
+        f.write(b"\x00\x00\x00\x18ftypmp42" + os.urandom(MB))
+    processor = MultimediaProcessor()
+
+    def run():
+        for analysis_type in ("operation_sequence", "fault_phenomenon", "assembly_process"):
+            processor.process_video(video_path, analysis_type)
+    return run
+
+
+@benchmark("interview", params=[100, 1000, 10000], quick_params=[100, 1000], repeat=3)
+def bench_interview(question_count: int, workdir: str):
+    """完整问答 question_count 个问题的5W1H访谈"""
+    templates = build_synthetic_templates(question_count)
+
+    def run():
+        interviewer = FiveWInterviewer()
+        interviewer.question_templates = templates
+        result = interviewer.start_interview("空调制冷效果不佳")
+        question = result["next_question"]
+        while question is not None:
+            result = interviewer.process_response(question.question_id, "压缩机启动后立即停止，原因待查")
+            question = result.get("next_question")
+    return run
+
+
+@benchmark("export_conversation", params=[100, 1000], repeat=5)
+def bench_export_conversation(question_count: int, workdir: str):
+    """导出包含 question_count 条回答的访谈记录"""
+    interviewer = FiveWInterviewer()
+    interviewer.question_templates = build_synthetic_templates(question_count)
+    result = interviewer.start_interview("空调制冷效果不佳")
+    question = result["next_question"]
+    while question is not None:
+        result = interviewer.process_response(question.question_id, "压缩机启动后立即停止")
+        question = result.get("next_question")
+    output_path = os.path.join(workdir, "interview_record.json")
+    return lambda: interviewer.export_conversation(output_path)
+
+
+@benchmark("generate_report", params=[1, 100], repeat=5)
+def bench_generate_report(report_count: int, workdir: str):
+    """完整D0-D8报告的信息收集与JSON生成"""
+    inputs = build_full_8d_inputs()
+    output_path = os.path.join(workdir, "8D_report.json")
+
+    def run():
+        for _ in range(report_count):
+            generator = EightDReportGenerator()
+            for phase, data in inputs.items():
+                generator.collect_information(phase, data)
+            generator.generate_report(output_path)
+    return run
+
+
+@benchmark("export_to_word", params=[1, 10], repeat=3)
+def bench_export_to_word(report_count: int, workdir: str):
+    """完整D0-D8报告导出为Word"""
+    try:
+        import docx  # noqa: F401
+    except ImportError:
+        return None
+
+    generator = EightDReportGenerator()
+    for phase, data in build_full_8d_inputs().items():
+        generator.collect_information(phase, data)
+    output_path = os.path.join(workdir, "8D_report.docx")
+
+    def run():
+        for _ in range(report_count):
+            generator.export_to_word(output_path)
+    return run
+
+
+@benchmark("serialize", params=["json", "json-pretty", "json-stdlib-pretty", "msgpack"], repeat=5)
+def bench_serialize(mode: str, workdir: str):
+    """完整8D报告加1000条访谈记录的序列化（json-stdlib-pretty 为原 json.dump(indent=2) 基线）"""
+    generator = EightDReportGenerator()
+    for phase, data in build_full_8d_inputs().items():
+        generator.collect_information(phase, data)
+    interviewer = FiveWInterviewer()
+    interviewer.question_templates = build_synthetic_templates(1000)
+    result = interviewer.start_interview("空调制冷效果不佳")
+    question = result["next_question"]
+    while question is not None:
+        result = interviewer.process_response(question.question_id, "压缩机启动后立即停止")
+        question = result.get("next_question")
+    payload = {
+        "8D分析": {phase: data.to_dict() for phase, data in generator.current_data.items()},
+        "访谈记录": [response.to_dict() for response in interviewer.responses.values()]
+    }
+
+    if mode == "json-stdlib-pretty":
+        return lambda: json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+    if mode == "msgpack" and "msgpack" not in serializers.available_formats():
+        return None
+    fmt = "msgpack" if mode == "msgpack" else "json"
+    pretty = mode == "json-pretty"
+    return lambda: serializers.dumps(payload, fmt, pretty)
+
+
+@benchmark("template_instantiation", params=[100, 1000, 10000], quick_params=[100, 1000], repeat=5)
+def bench_template_instantiation(count: int, workdir: str):
+    """批量实例化访谈器和报告生成器（模板构建）"""
+    def run():
+        for _ in range(count):
+            FiveWInterviewer()
+            EightDReportGenerator()
+    return run
+
+
+def collect_machine_metadata() -> Dict:
+    """收集机器与运行环境信息"""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+
+    return {
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python_version": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "git_commit": commit,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def run_benchmarks(quick: bool = False, name_filter: str = "", repeat: Optional[int] = None) -> Dict:
+    """
+    运行所有已注册的基准测试
+
+    Args:
+        quick: 是否使用快速参数集
+        name_filter: 仅运行名称包含该字符串的基准
+        repeat: 覆盖默认的重复次数
+
+    Returns:
+        Dict: 包含机器信息和每个用例统计数据的结果
+    """
+    results = {"metadata": collect_machine_metadata(), "quick": quick, "benchmarks": {}}
+
+    with tempfile.TemporaryDirectory(prefix="qa_bench_") as workdir:
+        for name, spec in BENCHMARKS.items():
+            if name_filter and name_filter not in name:
+                continue
+            params = spec["quick_params"] if quick else spec["params"]
+            for param in params:
+                key = f"{name}[{param}]"
+                run = spec["func"](param, workdir)
+                if run is None:
+                    results["benchmarks"][key] = {"skipped": True}
+                    print(f"{key:<40} 跳过（环境不支持）")
+                    continue
+
+                run()  # 预热
+                timings = []
+                for _ in range(repeat or spec["repeat"]):
+                    start = time.perf_counter()
+                    run()
+                    timings.append(time.perf_counter() - start)
+
+                results["benchmarks"][key] = {
+                    "min": min(timings),
+                    "median": statistics.median(timings),
+                    "mean": statistics.mean(timings),
+                    "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+                    "repeat": len(timings)
+                }
+                print(f"{key:<40} median {statistics.median(timings) * 1000:10.3f} ms")
+
+    return results
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.10) -> List[Dict]:
+    """
+    对比两次基准结果，找出中位数耗时回退超过阈值的用例
+
+    Args:
+        baseline: 基线结果
+        current: 当前结果
+        threshold: 回退阈值（0.10 即 10%）
+
+    Returns:
+        List[Dict]: 所有可比较用例的对比明细，regression为True表示回退
+    """
+    comparisons = []
+    for key, cur in current.get("benchmarks", {}).items():
+        base = baseline.get("benchmarks", {}).get(key)
+        if not base or base.get("skipped") or cur.get("skipped"):
+            continue
+        ratio = cur["median"] / base["median"] if base["median"] else 1.0
+        comparisons.append({
+            "benchmark": key,
+            "baseline": base["median"],
+            "current": cur["median"],
+            "ratio": ratio,
+            "regression": ratio > 1.0 + threshold
+        })
+    return comparisons
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="品质问题处理专家技能 - 性能基准测试")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="结果输出文件")
+    parser.add_argument("--quick", action="store_true", help="使用快速参数集")
+    parser.add_argument("--filter", default="", help="仅运行名称包含该字符串的基准")
+    parser.add_argument("--repeat", type=int, default=None, help="覆盖默认重复次数")
+    parser.add_argument("--compare", default="", help="与指定的基线结果文件对比")
+    parser.add_argument("--threshold", type=float, default=0.10, help="回退判定阈值，默认0.10")
+    args = parser.parse_args()
+
+    results = run_benchmarks(quick=args.quick, name_filter=args.filter, repeat=args.repeat)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"基准结果已保存: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons = compare_results(baseline, results, args.threshold)
+        regressions = [c for c in comparisons if c["regression"]]
+        for c in comparisons:
+            flag = "回退" if c["regression"] else "正常"
+            print(f"{c['benchmark']:<40} {c['ratio']:6.2f}x  {flag}")
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能回退（阈值 {args.threshold:.0%}）")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑数据模型工具
+为 UserResponse、QuestionContext 和 D0Data-D8Data 提供基于 __slots__ 的
+快速 to_dict/from_dict、枚举码驻留和整数时间戳转换，替代深拷贝的 asdict
+"""
+
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Union
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def intern_code(value):
+    """驻留枚举类字符串（信心水平、严重度、状态等），相同取值共享同一对象"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def now_epoch_us() -> int:
+    """当前本地时间的微秒级整数时间戳"""
+    return iso_to_epoch_us(datetime.now())
+
+
+def iso_to_epoch_us(value: Union[str, int, datetime]) -> int:
+    """
+    将ISO时间字符串或datetime转换为微秒级整数时间戳
+
+    按本地挂钟时间做整数运算（不经过浮点和时区换算），与 epoch_us_to_iso 无损往返，
+    1970年以前的时间同样精确；带时区的时间无法在整数中保留偏移，直接拒绝
+
+    Args:
+        value: ISO字符串、datetime，或已是整数的时间戳
+
+    Returns:
+        int: 微秒级时间戳
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        raise ValueError(f"不支持带时区的时间，请使用本地时间: {value.isoformat()}")
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def epoch_us_to_iso(value: int) -> str:
+    """将微秒级整数时间戳转换为本地ISO时间字符串（与 datetime.now().isoformat() 一致）"""
+    return (_EPOCH + timedelta(microseconds=value)).isoformat()
+
+
+class SlotsRecord:
+    """
+    基于 __slots__ 的记录基类
+
+    子类为声明了 __slots__ 的 dataclass；to_dict 只做一层浅拷贝，
+    不再像 asdict 那样递归深拷贝列表和字典
+    """
+
+    __slots__ = ()
+
+    def to_dict(self) -> Dict:
+        """转换为字典（浅拷贝，内部列表/字典与对象共享）"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        """从字典构建，忽略未知字段"""
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+def deep_sizeof(obj, seen=None) -> int:
+    """递归统计对象及其引用的容器、字符串占用的字节数（驻留字符串只计一次）"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(obj.__dict__, seen)
+    if hasattr(type(obj), "__slots__") and not isinstance(obj, (str, bytes, int, float)):
+        size += sum(deep_sizeof(getattr(obj, name), seen)
+                    for name in type(obj).__slots__ if hasattr(obj, name))
+    return size
+
+
+def main():
+    """内存基准：对比普通dataclass与紧凑记录的单对象字节数"""
+    from dataclasses import make_dataclass, fields
+
+    try:
+        from .five_w_interviewer import UserResponse
+        from .eight_d_report_generator import D0Data
+    except ImportError:
+        from five_w_interviewer import UserResponse
+        from eight_d_report_generator import D0Data
+
+    count = 10000
+    for compact_cls, sample in (
+        (UserResponse, lambda i: {
+            "question_id": "what_problem",
+            "answer_text": f"压缩机启动后立即停止 #{i}",
+            "answer_details": ["压缩机有异响"],
+            "confidence_level": "".join(["hi", "gh"]),
+            "supporting_evidence": ["现场照片"],
+            "timestamp": datetime.now().isoformat()
+        }),
+        (D0Data, lambda i: {
+            "problem_description": f"空调制冷效果不佳 #{i}",
+            "discovery_date": "2024-01-20",
+            "discovery_person": "张三",
+            "affected_products": ["AC-2024-001"],
+            "initial_severity": "".join(["中", "等"]),
+            "initial_response": "暂停相关产品出货"
+        })
+    ):
+        legacy_cls = make_dataclass(
+            "Legacy" + compact_cls.__name__,
+            [(f.name, f.type) for f in fields(compact_cls)]
+        )
+        legacy = [legacy_cls(**sample(i)) for i in range(count)]
+        compact = [compact_cls(**sample(i)) for i in range(count)]
+
+        seen = set()
+        legacy_bytes = sum(deep_sizeof(obj, seen) for obj in legacy) / count
+        seen = set()
+        compact_bytes = sum(deep_sizeof(obj, seen) for obj in compact) / count
+        print(f"{compact_cls.__name__:<14} 普通dataclass {legacy_bytes:8.1f} 字节/对象  "
+              f"紧凑记录 {compact_bytes:8.1f} 字节/对象  "
+              f"节省 {1 - compact_bytes / legacy_bytes:.0%}")
+
+
+if __name__ == "__main__":
+    main()
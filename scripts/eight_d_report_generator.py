@@ -5,15 +5,56 @@
 根据收集的信息自动生成专业的8D分析报告
 """
 
-import json
-import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+
+try:
+    from .tracing import traced, span
+    from .compact_models import SlotsRecord, intern_code
+    from . import serializers
+except ImportError:
+    from tracing import traced, span
+    from compact_models import SlotsRecord, intern_code
+    import serializers
+
+PHASE_ORDER = tuple(f"D{i}" for i in range(9))
+
+# 各阶段自问题发现起的完成期限（天）：D0-D3快速响应遏制，D4之后按计划推进
+PHASE_SLA_DAYS = {
+    "D0": 1, "D1": 1, "D2": 2, "D3": 2, "D4": 14,
+    "D5": 30, "D6": 60, "D7": 75, "D8": 90
+}
+
+# 初始严重程度对期限的缩放系数
+SEVERITY_SLA_FACTOR = {"严重": 0.5, "高": 0.5, "中等": 1.0, "中": 1.0, "低": 1.5}
+
+
+def compute_phase_deadlines(discovery_date: str, severity: str,
+                            sla_days: Optional[Dict[str, float]] = None) -> Dict[str, datetime]:
+    """
+    根据发现日期和初始严重程度计算各阶段期限
+
+    Args:
+        discovery_date: D0发现日期（ISO格式）
+        severity: 初始严重程度
+        sla_days: 自定义各阶段期限（天），默认 PHASE_SLA_DAYS
+
+    Returns:
+        Dict[str, datetime]: 阶段 -> 期限
+    """
+    start = datetime.fromisoformat(discovery_date)
+    factor = SEVERITY_SLA_FACTOR.get(severity, 1.0)
+    sla_days = sla_days or PHASE_SLA_DAYS
+    return {phase: start + timedelta(days=sla_days[phase] * factor)
+            for phase in PHASE_ORDER if phase in sla_days}
 
 @dataclass
-class D0Data:
+class D0Data(SlotsRecord):
     """D0阶段数据：问题发现和初步响应"""
+    __slots__ = ("problem_description", "discovery_date", "discovery_person",
+                 "affected_products", "initial_severity", "initial_response")
+
     problem_description: str
     discovery_date: str
     discovery_person: str
@@ -21,17 +62,25 @@ class D0Data:
     initial_severity: str
     initial_response: str
 
+    def __post_init__(self):
+        self.initial_severity = intern_code(self.initial_severity)
+
 @dataclass
-class D1Data:
+class D1Data(SlotsRecord):
     """D1阶段数据：组建跨功能团队"""
+    __slots__ = ("team_leader", "team_members", "team_roles", "communication_plan")
+
     team_leader: str
     team_members: List[str]
     team_roles: Dict[str, str]
     communication_plan: str
 
 @dataclass
-class D2Data:
+class D2Data(SlotsRecord):
     """D2阶段数据：问题定义和描述"""
+    __slots__ = ("problem_statement", "problem_scope", "affected_customers", "customer_impact",
+                 "safety_impact", "legal_impact", "financial_impact")
+
     problem_statement: str
     problem_scope: str
     affected_customers: int
@@ -41,8 +90,11 @@ class D2Data:
     financial_impact: str
 
 @dataclass
-class D3Data:
+class D3Data(SlotsRecord):
     """D3阶段数据：临时遏制措施"""
+    __slots__ = ("containment_actions", "implementation_date", "responsible_person",
+                 "effectiveness_verification", "customer_notification")
+
     containment_actions: List[str]
     implementation_date: str
     responsible_person: str
@@ -50,8 +102,11 @@ class D3Data:
     customer_notification: bool
 
 @dataclass
-class D4Data:
+class D4Data(SlotsRecord):
     """D4阶段数据：根因分析"""
+    __slots__ = ("root_cause_analysis", "fishbone_diagram", "five_whys", "data_analysis",
+                 "potential_causes", "verified_root_cause")
+
     root_cause_analysis: str
     fishbone_diagram: Dict
     five_whys: List[str]
@@ -60,8 +115,11 @@ class D4Data:
     verified_root_cause: str
 
 @dataclass
-class D5Data:
+class D5Data(SlotsRecord):
     """D5阶段数据：永久纠正措施"""
+    __slots__ = ("corrective_actions", "implementation_plan", "responsible_person",
+                 "target_date", "resource_requirements")
+
     corrective_actions: List[Dict]
     implementation_plan: str
     responsible_person: str
@@ -69,16 +127,25 @@ class D5Data:
     resource_requirements: str
 
 @dataclass
-class D6Data:
+class D6Data(SlotsRecord):
     """D6阶段数据：实施和验证纠正措施"""
+    __slots__ = ("implementation_status", "verification_results", "effectiveness_assessment",
+                 "side_effects")
+
     implementation_status: str
     verification_results: Dict
     effectiveness_assessment: str
     side_effects: str
 
+    def __post_init__(self):
+        self.implementation_status = intern_code(self.implementation_status)
+
 @dataclass
-class D7Data:
+class D7Data(SlotsRecord):
     """D7阶段数据：预防再发生"""
+    __slots__ = ("prevention_measures", "process_improvements", "training_requirements",
+                 "system_updates", "documentation_changes")
+
     prevention_measures: List[str]
     process_improvements: List[str]
     training_requirements: List[str]
@@ -86,8 +153,11 @@ class D7Data:
     documentation_changes: List[str]
 
 @dataclass
-class D8Data:
+class D8Data(SlotsRecord):
     """D8阶段数据：团队总结和认可"""
+    __slots__ = ("lessons_learned", "team_recognition", "process_improvements",
+                 "knowledge_sharing")
+
     lessons_learned: List[str]
     team_recognition: str
     process_improvements: str
@@ -96,10 +166,36 @@ class D8Data:
 class EightDReportGenerator:
     """8D报告生成器"""
 
+    # freeze_template() 之后所有实例共享的只读报告模板
+    _frozen_template = None
+
     def __init__(self):
-        self.report_template = self._load_template()
+        self.report_template = self._frozen_template or self._load_template()
         self.current_data = {}
 
+    @classmethod
+    def freeze_template(cls) -> Dict:
+        """预加载报告模板，此后新建的实例直接共享（模板视为只读）"""
+        if cls._frozen_template is None:
+            cls._frozen_template = cls()._load_template()
+        return cls._frozen_template
+
+    @classmethod
+    def from_report_data(cls, report_data: Dict) -> "EightDReportGenerator":
+        """
+        由 generate_report / to_report_data 输出的报告数据恢复生成器
+
+        Args:
+            report_data: 报告数据
+
+        Returns:
+            EightDReportGenerator: 已填充各阶段数据的生成器
+        """
+        generator = cls()
+        for phase, data in report_data.get("8D分析", {}).items():
+            generator.collect_information(phase, data)
+        return generator
+
     def _load_template(self) -> Dict:
         """加载8D报告模板"""
         return {
@@ -205,6 +301,7 @@ class EightDReportGenerator:
             }
         }
 
+    @traced("eight_d.collect_information")
     def collect_information(self, phase: str, user_input: Dict) -> bool:
         """
         收集特定阶段的信息
@@ -329,16 +426,54 @@ class EightDReportGenerator:
         status["完成度"] = f"{len(self.current_data)}/{total_phases}"
         return status
 
-    def generate_report(self, output_path: str = "8D_report.json") -> str:
+    def get_current_phase(self) -> Optional[str]:
+        """获取第一个尚未完成的阶段，全部完成时返回None"""
+        for phase in PHASE_ORDER:
+            if phase not in self.current_data:
+                return phase
+        return None
+
+    def get_phase_deadlines(self, sla_days: Optional[Dict[str, float]] = None) -> Dict[str, datetime]:
+        """
+        计算各阶段期限（需先完成D0）
+
+        Returns:
+            Dict[str, datetime]: 阶段 -> 期限，D0未收集时为空
+        """
+        d0 = self.current_data.get("D0")
+        if d0 is None:
+            return {}
+        return compute_phase_deadlines(d0.discovery_date, d0.initial_severity, sla_days)
+
+    @traced("eight_d.generate_report")
+    def generate_report(self, output_path: str = "8D_report.json",
+                        fmt: Optional[str] = None, pretty: bool = False) -> str:
         """
         生成完整的8D报告
 
         Args:
             output_path: 输出文件路径
+            fmt: 序列化格式 (json, msgpack)，默认按扩展名或全局配置
+            pretty: 是否美化输出（供人工阅读）
 
         Returns:
             str: 报告文件路径
         """
+        report_data = self.to_report_data()
+
+        # 保存报告
+        with span("eight_d.serialize"):
+            serializers.write_file(report_data, output_path, fmt, pretty)
+
+        return output_path
+
+    def to_report_data(self) -> Dict:
+        """
+        构建报告数据（generate_report 写出的内容）
+
+        Returns:
+            Dict: 报告数据
+        """
         report_data = {
             "报告信息": {
                 "生成时间": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -349,20 +484,16 @@ class EightDReportGenerator:
         }
 
         # 转换数据并添加到报告中
-        for phase, data in self.current_data.items():
-            report_data["8D分析"][phase] = asdict(data)
+        with span("eight_d.to_dict"):
+            for phase, data in self.current_data.items():
+                report_data["8D分析"][phase] = data.to_dict()
 
         # 添加完成状态
         completion_status = self.check_completion_status()
         report_data["完成状态"] = completion_status
+        return report_data
 
-        # 保存报告
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
-
-        return output_path
-
+    @traced("eight_d.export_to_word")
     def export_to_word(self, output_path: str = "8D_report.docx") -> str:
         """
         导出为Word文档格式（需要python-docx库）
@@ -396,8 +527,8 @@ class EightDReportGenerator:
             # 添加8D内容
             for phase, data in self.current_data.items():
                 doc.add_heading(f'{phase}阶段', level=1)
-                if hasattr(data, '__dict__'):
-                    for field, value in asdict(data).items():
+                if hasattr(data, 'to_dict'):
+                    for field, value in data.to_dict().items():
                         if isinstance(value, (list, dict)):
                             p = doc.add_paragraph()
                             p.add_run(f'{field}: ').bold = True
@@ -407,7 +538,8 @@ class EightDReportGenerator:
                             p.add_run(f'{field}: ').bold = True
                             p.add_run(str(value))
 
-            doc.save(output_path)
+            with span("eight_d.docx_save"):
+                doc.save(output_path)
             return output_path
 
         except ImportError:
@@ -444,7 +576,7 @@ def main():
     print("完成状态:", status)
 
     # 生成报告
-    report_file = generator.generate_report("test_8D_report.json")
+    report_file = generator.generate_report("test_8D_report.json", pretty=True)
     print(f"报告已生成: {report_file}")
 
 if __name__ == "__main__":
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+访谈证据分析流水线
+将回答中的支持证据条目（如"现场照片"、"IMG_0012.jpg"）解析为证据目录中的实际文件，
+在后台通过 MultimediaProcessor 分析，完成后附加到对应回答的 evidence_analysis；
+访谈线程只做一次入队，同一内容的文件只分析一次
+"""
+
+import os
+import re
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .multimedia_processor import MultimediaProcessor
+    from .five_w_interviewer import FiveWInterviewer, UserResponse
+    from . import serializers
+except ImportError:
+    from multimedia_processor import MultimediaProcessor
+    from five_w_interviewer import FiveWInterviewer, UserResponse
+    import serializers
+
+# 证据条目中的媒体类型关键词
+IMAGE_TERMS = ("照片", "图片", "截图", "相片", "图像")
+VIDEO_TERMS = ("视频", "录像", "监控", "录屏")
+
+# 条目中直接写出的文件名
+FILE_NAME_PATTERN = re.compile(r"[\w\-.]+\.(?:jpe?g|png|bmp|tiff?|mp4|avi|mov|wmv|flv)", re.IGNORECASE)
+
+# 去掉媒体类型关键词后的剩余描述（如"现场"），用于匹配文件名
+DESCRIPTION_STRIP = re.compile("|".join(IMAGE_TERMS + VIDEO_TERMS + ("和", "及", "的", "、", "，", ",", r"\s")))
+
+
+class EvidenceResolver:
+    """证据条目到文件的解析器，证据目录只扫描一次"""
+
+    def __init__(self, roots: Iterable[str], processor: MultimediaProcessor, max_files_per_entry: int = 20):
+        """
+        Args:
+            roots: 证据目录（现场照片、视频等的存放位置）
+            processor: 用于判断支持的图片/视频格式
+            max_files_per_entry: 每个证据条目最多匹配的文件数
+        """
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.image_formats = set(processor.supported_image_formats)
+        self.video_formats = set(processor.supported_video_formats)
+        self.max_files_per_entry = max_files_per_entry
+        self._files = []
+        self._by_name = {}
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """重新扫描证据目录"""
+        files, by_name = [], {}
+        for root in self.roots:
+            for directory, _, names in os.walk(root):
+                for name in sorted(names):
+                    kind = self._kind(name)
+                    if kind is None:
+                        continue
+                    path = os.path.join(directory, name)
+                    files.append((os.path.splitext(name)[0].lower(), kind, path))
+                    by_name.setdefault(name.lower(), path)
+        with self._lock:
+            self._files, self._by_name = files, by_name
+
+    def _kind(self, name: str) -> Optional[str]:
+        extension = os.path.splitext(name)[1].lower()
+        if extension in self.image_formats:
+            return "image"
+        if extension in self.video_formats:
+            return "video"
+        return None
+
+    def resolve(self, entry: str) -> List[Tuple[str, str]]:
+        """
+        解析一个证据条目
+
+        依次尝试：条目本身是文件路径；条目中写出的文件名；按媒体类型关键词和剩余描述匹配文件名
+        （"现场照片" 匹配名称含"现场"的图片）
+
+        Args:
+            entry: 证据条目
+
+        Returns:
+            List[Tuple[str, str]]: (媒体类型, 文件路径)
+        """
+        candidates = [entry] + [os.path.join(root, entry) for root in self.roots]
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                kind = self._kind(candidate)
+                return [(kind, os.path.abspath(candidate))] if kind else []
+
+        with self._lock:
+            files, by_name = self._files, self._by_name
+
+        named = [by_name[name.lower()] for name in FILE_NAME_PATTERN.findall(entry) if name.lower() in by_name]
+        if named:
+            return [(self._kind(path), path) for path in named[:self.max_files_per_entry]]
+
+        wants_image = any(term in entry for term in IMAGE_TERMS)
+        wants_video = any(term in entry for term in VIDEO_TERMS)
+        description = DESCRIPTION_STRIP.sub("", entry).lower()
+        if not description or not (wants_image or wants_video):
+            return []
+
+        matches = []
+        for stem, kind, path in files:
+            if (kind == "image" and not wants_image) or (kind == "video" and not wants_video):
+                continue
+            if description in stem:
+                matches.append((kind, path))
+                if len(matches) >= self.max_files_per_entry:
+                    break
+        return matches
+
+
+class EvidencePipeline:
+    """后台证据分析流水线"""
+
+    def __init__(self, roots: Iterable[str], processor: Optional[MultimediaProcessor] = None,
+                 max_workers: int = 2, image_analysis: str = "quality_defect",
+                 video_analysis: str = "fault_phenomenon", cache_dir: Optional[str] = None):
+        """
+        Args:
+            roots: 证据目录
+            processor: 多媒体处理器，可传入以 ModelRequestScheduler.client("batch") 为 model_client 的实例，
+                       使证据分析不挤占交互请求的配额
+            max_workers: 后台分析线程数
+            image_analysis: 图片证据的分析类型
+            video_analysis: 视频证据的分析类型
+            cache_dir: 分析结果缓存目录，提供时按内容哈希持久化，跨访谈复用
+        """
+        self.processor = processor or MultimediaProcessor()
+        self.resolver = EvidenceResolver(roots, self.processor)
+        self.analysis_types = {"image": image_analysis, "video": video_analysis}
+        self.cache_dir = cache_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evidence")
+        self._lock = threading.Lock()
+        # (内容哈希, 分析类型) -> Future，同一内容只分析一次（包括正在分析中的）
+        self._results = {}
+        # (路径, 大小, 修改时间) -> 内容哈希，未变化的文件不重复计算哈希
+        self._hashes = {}
+        self._pending = set()
+        self.stats = {"entries": 0, "files": 0, "analyzed": 0, "cache_hits": 0, "unresolved": 0}
+
+    def attach(self, interviewer: FiveWInterviewer) -> "EvidencePipeline":
+        """注册为访谈的回答监听器"""
+        interviewer.add_response_listener(self.on_response)
+        return self
+
+    def on_response(self, response: UserResponse):
+        """
+        回答监听器：有支持证据时提交后台任务后立即返回，不阻塞访谈
+
+        Args:
+            response: 用户回答
+        """
+        if not response.supporting_evidence:
+            return
+        future = self._executor.submit(self._process_response, response)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _process_response(self, response: UserResponse):
+        for entry in list(response.supporting_evidence):
+            files = self.resolver.resolve(entry)
+            with self._lock:
+                self.stats["entries"] += 1
+                self.stats["files"] += len(files)
+                if not files:
+                    self.stats["unresolved"] += 1
+            results = []
+            for kind, path in files:
+                try:
+                    result = self.analyze(path, kind)
+                except Exception as e:
+                    result = {"status": "error", "error_message": str(e)}
+                results.append(dict(result, 文件=path))
+            # 整体替换单个条目的结果，读取方不会看到一半的列表
+            response.evidence_analysis[entry] = results
+
+    def _content_hash(self, path: str) -> str:
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            content_hash = self._hashes.get(key)
+        if content_hash is None:
+            with self.processor.open_media(path) as media:
+                content_hash = media.sha256()
+            with self._lock:
+                self._hashes[key] = content_hash
+        return content_hash
+
+    def analyze(self, path: str, kind: str) -> Dict:
+        """
+        分析单个证据文件，相同内容（含其他路径下的副本）只分析一次
+
+        Args:
+            path: 文件路径
+            kind: image 或 video
+
+        Returns:
+            Dict: 分析结果
+        """
+        analysis_type = self.analysis_types[kind]
+        key = (self._content_hash(path), analysis_type)
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = self._results[key] = Future()
+            else:
+                self.stats["cache_hits"] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = self._load_cached(key)
+            if result is None:
+                if kind == "video":
+                    result = self.processor.process_video(path, analysis_type)
+                else:
+                    result = self.processor.process_image(path, analysis_type)
+                with self._lock:
+                    self.stats["analyzed"] += 1
+                if result.get("status") == "success":
+                    self._store_cached(key, result)
+                else:
+                    # 失败结果不缓存，下次出现时重试
+                    with self._lock:
+                        self._results.pop(key, None)
+            else:
+                with self._lock:
+                    self.stats["cache_hits"] += 1
+        except Exception as e:
+            with self._lock:
+                self._results.pop(key, None)
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def _cache_path(self, key: Tuple[str, str]) -> str:
+        return os.path.join(self.cache_dir, f"{key[0]}_{key[1]}" + serializers.FILE_EXTENSIONS["json"])
+
+    def _load_cached(self, key: Tuple[str, str]) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(key)
+        if not os.path.exists(path):
+            return None
+        return serializers.read_file(path, "json")
+
+    def _store_cached(self, key: Tuple[str, str], result: Dict):
+        if self.cache_dir:
+            serializers.write_file(result, self._cache_path(key), "json")
+
+    def pending(self) -> int:
+        """尚未完成的回答数"""
+        with self._lock:
+            return len(self._pending)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已提交的证据全部分析完成
+
+        Returns:
+            bool: 是否在超时前全部完成
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                return True
+            for future in pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                try:
+                    future.result(remaining)
+                except Exception:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        return False
+
+    def close(self, wait: bool = True):
+        """关闭后台线程"""
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    """命令行入口：模拟访谈过程中引用现场照片和视频，后台分析并附加到回答"""
+    parser = argparse.ArgumentParser(description="访谈证据分析流水线")
+    parser.add_argument("--evidence-dir", default="", help="证据目录，缺省时生成演示文件")
+    parser.add_argument("--cache-dir", default="", help="分析结果缓存目录")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="evidence_demo_") as demo_dir:
+        evidence_dir = args.evidence_dir or demo_dir
+        if not args.evidence_dir:
+            photo = b"\x89PNG\r\n\x1a\n" + os.urandom(4096)
+            for i in range(3):
+                with open(os.path.join(demo_dir, f"现场_{i:02d}.png"), "wb") as f:
+                    f.write(photo if i < 2 else photo[:-1] + b"\x00")
+            with open(os.path.join(demo_dir, "IMG_0012.jpg"), "wb") as f:
+                f.write(photo)
+            with open(os.path.join(demo_dir, "产线监控_01.mp4"), "wb") as f:
+                f.write(b"\x00\x00\x00\x18ftypmp42" + os.urandom(4096))
+
+        interviewer = FiveWInterviewer()
+        with EvidencePipeline([evidence_dir], cache_dir=args.cache_dir or None) as pipeline:
+            pipeline.attach(interviewer)
+            interviewer.start_interview("空调外机运行时异响，部分机组压缩机异常停机")
+
+            answers = [
+                ("what_phenomenon", "压缩机启动后立即停止，外壳表面有划痕", ["现场照片", "IMG_0012.jpg"]),
+                ("when_occurred", "2024年1月15日上午10点首次发现", ["产线监控视频"]),
+                ("where_occurred", "总装车间第三条产线", ["现场照片"]),
+            ]
+            for question_id, answer, evidence in answers:
+                began = time.perf_counter()
+                interviewer.process_response(question_id, answer, supporting_evidence=evidence)
+                print(f"回答 {question_id}: 处理耗时 {(time.perf_counter() - began) * 1000:.2f}ms，"
+                      f"后台待分析 {pipeline.pending()}")
+
+            pipeline.wait()
+            print("统计:", pipeline.stats)
+            for question_id, response in interviewer.responses.items():
+                for entry, results in response.evidence_analysis.items():
+                    files = ", ".join(os.path.basename(r["文件"]) for r in results) or "未找到文件"
+                    print(f"  {question_id} / {entry}: {files}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,32 @@
 系统性引导用户进行深度问题挖掘，找到根本原因
 """
 
-import json
-import os
+import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+try:
+    from .tracing import traced, span
+    from .compact_models import SlotsRecord, intern_code, now_epoch_us, iso_to_epoch_us, epoch_us_to_iso
+    from . import serializers
+    from .question_scheduler import AdaptiveQuestionScheduler
+    from .answer_validator import AnswerValidator
+except ImportError:
+    from tracing import traced, span
+    from compact_models import SlotsRecord, intern_code, now_epoch_us, iso_to_epoch_us, epoch_us_to_iso
+    import serializers
+    from question_scheduler import AdaptiveQuestionScheduler
+    from answer_validator import AnswerValidator
+
+logger = logging.getLogger(__name__)
 
 @dataclass
-class QuestionContext:
+class QuestionContext(SlotsRecord):
     """问题上下文"""
+    __slots__ = ("question_id", "question_text", "category", "purpose",
+                 "follow_up_questions", "expected_answer_type", "validation_criteria")
+
     question_id: str
     question_text: str
     category: str
@@ -23,24 +40,113 @@ class QuestionContext:
     validation_criteria: List[str]
 
 @dataclass
-class UserResponse:
-    """用户回答"""
+class UserResponse(SlotsRecord):
+    """
+    用户回答（timestamp 以微秒级整数存储，接受ISO字符串输入）
+
+    evidence_analysis 不是构造参数，由证据分析流水线在后台分析完成后填入：证据条目 -> 分析结果列表
+    """
+    __slots__ = ("question_id", "answer_text", "answer_details",
+                 "confidence_level", "supporting_evidence", "timestamp", "evidence_analysis")
+
     question_id: str
     answer_text: str
     answer_details: List[str]
     confidence_level: str
     supporting_evidence: List[str]
-    timestamp: str
+    timestamp: int
+
+    def __post_init__(self):
+        self.confidence_level = intern_code(self.confidence_level)
+        self.timestamp = iso_to_epoch_us(self.timestamp)
+        self.evidence_analysis = {}
+
+    @property
+    def timestamp_iso(self) -> str:
+        """ISO格式时间"""
+        return epoch_us_to_iso(self.timestamp)
+
+    def to_dict(self) -> Dict:
+        """转换为字典，时间输出为ISO字符串以保持导出格式不变（有证据分析结果时附加）"""
+        data = {
+            "question_id": self.question_id,
+            "answer_text": self.answer_text,
+            "answer_details": self.answer_details,
+            "confidence_level": self.confidence_level,
+            "supporting_evidence": self.supporting_evidence,
+            "timestamp": self.timestamp_iso
+        }
+        if self.evidence_analysis:
+            data["evidence_analysis"] = dict(self.evidence_analysis)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "UserResponse":
+        """从字典构建，恢复证据分析结果"""
+        response = cls(**{name: data[name] for name in cls.__dataclass_fields__ if name in data})
+        response.evidence_analysis = dict(data.get("evidence_analysis") or {})
+        return response
 
 class FiveWInterviewer:
     """5W1H问题追问引导器"""
 
-    def __init__(self):
+    # freeze_templates() 之后所有实例共享的只读模板和已编译验证规则
+    _frozen_templates = None
+    _frozen_validator = None
+
+    @classmethod
+    def freeze_templates(cls) -> Dict:
+        """
+        预加载问题模板并编译全部验证规则，此后新建的实例直接共享（模板视为只读）
+
+        Returns:
+            Dict: 共享的问题模板
+        """
+        if cls._frozen_templates is None:
+            templates = cls()._load_question_templates()
+            validator = AnswerValidator(templates)
+            for phase_data in templates.values():
+                for question in phase_data["questions"]:
+                    validator.compile(question["id"])
+            cls._frozen_templates, cls._frozen_validator = templates, validator
+        return cls._frozen_templates
+
+    def __init__(self, adaptive: bool = False, scheduler: Optional[AdaptiveQuestionScheduler] = None):
+        """
+        Args:
+            adaptive: 是否根据回答内容自适应调度问题、跳过冗余问题
+            scheduler: 自定义调度器，提供时自动启用自适应模式
+        """
         self.conversation_history = []
-        self.question_templates = self._load_question_templates()
+        if self._frozen_templates is not None:
+            self.question_templates = self._frozen_templates
+        else:
+            self.question_templates = self._load_question_templates()
         self.current_phase = "initial"
         self.questions_asked = []
+        self._asked_ids = set()
+        self.questions_skipped = {}
         self.responses = {}
+        self.scheduler = scheduler or (AdaptiveQuestionScheduler() if adaptive else None)
+        self.answer_validator = self._frozen_validator or AnswerValidator(self.question_templates)
+        self.validation_results = {}
+        self.response_listeners = []
+
+    def add_response_listener(self, listener: Callable[[UserResponse], None]):
+        """
+        注册回答监听器，每条回答（含初始问题）保存并完成调度、验证后调用，监听器异常只记录日志
+
+        Args:
+            listener: 接收 UserResponse 的回调
+        """
+        self.response_listeners.append(listener)
+
+    def _notify_listeners(self, response: UserResponse):
+        for listener in self.response_listeners:
+            try:
+                listener(response)
+            except Exception:
+                logger.exception("回答监听器执行失败: %s", response.question_id)
 
     def _load_question_templates(self) -> Dict:
         """加载问题模板"""
@@ -192,7 +298,15 @@ class FiveWInterviewer:
         self.conversation_history = []
         self.current_phase = "initial"
         self.questions_asked = []
+        self._asked_ids = set()
+        self.questions_skipped = {}
         self.responses = {}
+        self.validation_results = {}
+        if self.answer_validator is self._frozen_validator and self.question_templates is not self._frozen_templates:
+            # 替换过模板的实例使用自己的验证器，不改动所有实例共享的已编译规则
+            self.answer_validator = AnswerValidator(self.question_templates)
+        else:
+            self.answer_validator.load_templates(self.question_templates)
 
         # 记录初始问题
         initial_response = UserResponse(
@@ -201,12 +315,17 @@ class FiveWInterviewer:
             answer_details=[],
             confidence_level="initial",
             supporting_evidence=[],
-            timestamp=datetime.now().isoformat()
+            timestamp=now_epoch_us()
         )
         self.responses["initial_problem"] = initial_response
 
-        # 返回初始问题
-        first_question = self.get_next_question()
+        if self.scheduler is not None:
+            self.scheduler.reset(self.question_templates)
+            self._mark_skipped(self.scheduler.observe(None, problem_description))
+        self._notify_listeners(initial_response)
+
+        # 返回初始问题（初始描述已覆盖的阶段直接跳过）
+        first_question = self._next_question_advancing()
         return {
             "status": "started",
             "current_phase": self.current_phase,
@@ -219,23 +338,50 @@ class FiveWInterviewer:
         if self.current_phase not in self.question_templates:
             return None
 
+        # 自适应模式：取信息增益最高的问题
+        if self.scheduler is not None:
+            question = self.scheduler.next_question(self.current_phase)
+            return self._build_question_context(question) if question else None
+
         phase_questions = self.question_templates[self.current_phase]["questions"]
 
         # 找到下一个未提问的问题
         for question in phase_questions:
-            if question["id"] not in self.questions_asked:
-                return QuestionContext(
-                    question_id=question["id"],
-                    question_text=question["question"],
-                    category=question["category"],
-                    purpose=question["purpose"],
-                    follow_up_questions=question["follow_up"],
-                    expected_answer_type=question["answer_type"],
-                    validation_criteria=question["validation"]
-                )
+            if question["id"] not in self._asked_ids:
+                return self._build_question_context(question)
 
         return None
 
+    def _next_question_advancing(self) -> Optional[QuestionContext]:
+        """获取下一个问题；当前阶段已无可问的问题（如全部被自适应调度跳过）时依次进入后续阶段"""
+        question = self.get_next_question()
+        while question is None:
+            next_phase = self._get_next_phase()
+            if not next_phase:
+                return None
+            self.current_phase = next_phase
+            question = self.get_next_question()
+        return question
+
+    def _build_question_context(self, question: Dict) -> QuestionContext:
+        """由问题模板构建问题上下文"""
+        return QuestionContext(
+            question_id=question["id"],
+            question_text=question["question"],
+            category=question["category"],
+            purpose=question["purpose"],
+            follow_up_questions=question["follow_up"],
+            expected_answer_type=question["answer_type"],
+            validation_criteria=question["validation"]
+        )
+
+    def _mark_skipped(self, question_ids: List[str]):
+        """记录因答案已隐含而跳过的问题"""
+        for question_id in question_ids:
+            self._asked_ids.add(question_id)
+            self.questions_skipped[question_id] = self.scheduler.skipped[question_id]
+
+    @traced("five_w.process_response")
     def process_response(self, question_id: str, answer_text: str,
                        answer_details: List[str] = None,
                        confidence_level: str = "medium",
@@ -260,40 +406,55 @@ class FiveWInterviewer:
             answer_details=answer_details or [],
             confidence_level=confidence_level,
             supporting_evidence=supporting_evidence or [],
-            timestamp=datetime.now().isoformat()
+            timestamp=now_epoch_us()
         )
 
         # 保存回答
         self.responses[question_id] = user_response
         self.questions_asked.append(question_id)
+        self._asked_ids.add(question_id)
+
+        if self.scheduler is not None:
+            self._mark_skipped(self.scheduler.observe(
+                question_id, " ".join([answer_text] + user_response.answer_details)))
+
+        # 按问题模板的验证标准即时检查回答
+        validation = self.answer_validator.validate(
+            question_id, answer_text, user_response.answer_details, user_response.supporting_evidence)
+        self.validation_results[question_id] = validation
+        self._notify_listeners(user_response)
 
         # 检查是否可以进入下一阶段
         phase_completion = self._check_phase_completion()
-
+        previous_phase = self.current_phase
         if phase_completion["is_complete"]:
             next_phase = self._get_next_phase()
             if next_phase:
                 self.current_phase = next_phase
-                return {
-                    "status": "phase_complete",
-                    "phase_summary": phase_completion["summary"],
-                    "next_phase": self.current_phase,
-                    "next_question": self.get_next_question(),
-                    "progress": f"{phase_completion['summary']}，准备进入{next_phase}阶段"
-                }
-
-        # 返回下一个问题
-        next_question = self.get_next_question()
+
+        # 返回下一个问题（阶段内已无可问问题时继续进入后续阶段）
+        next_question = self._next_question_advancing()
+        if next_question and self.current_phase != previous_phase:
+            return {
+                "status": "phase_complete",
+                "phase_summary": phase_completion.get("summary", ""),
+                "next_phase": self.current_phase,
+                "next_question": next_question,
+                "validation": validation,
+                "progress": f"{phase_completion.get('summary', '')}，准备进入{self.current_phase}阶段"
+            }
         if next_question:
             return {
                 "status": "question_answered",
                 "next_question": next_question,
+                "validation": validation,
                 "progress": f"问题{question_id}已回答，准备下一个问题"
             }
         else:
             return {
                 "status": "interview_complete",
                 "summary": self.generate_interview_summary(),
+                "validation": validation,
                 "progress": "所有阶段的问题都已完成"
             }
 
@@ -305,7 +466,7 @@ class FiveWInterviewer:
         phase_questions = self.question_templates[self.current_phase]["questions"]
         phase_question_ids = [q["id"] for q in phase_questions]
 
-        answered_count = len([qid for qid in phase_question_ids if qid in self.questions_asked])
+        answered_count = len([qid for qid in phase_question_ids if qid in self._asked_ids])
         total_count = len(phase_question_ids)
 
         is_complete = answered_count >= total_count * 0.8  # 80%完成度即认为完成
@@ -357,11 +518,36 @@ class FiveWInterviewer:
 
         return summary
 
-    def export_conversation(self, output_path: str) -> str:
-        """导出对话记录"""
+    def export_conversation(self, output_path: str, fmt: Optional[str] = None, pretty: bool = False) -> str:
+        """
+        导出对话记录
+
+        Args:
+            output_path: 输出文件路径
+            fmt: 序列化格式 (json, msgpack)，默认按扩展名或全局配置
+            pretty: 是否美化输出（供人工阅读）
+
+        Returns:
+            str: 输出文件路径
+        """
+        export_data = self.to_export_data()
+
+        # 保存文件
+        with span("five_w.serialize"):
+            serializers.write_file(export_data, output_path, fmt, pretty)
+
+        return output_path
+
+    def to_export_data(self) -> Dict:
+        """
+        构建对话记录数据（export_conversation 写出的内容）
+
+        Returns:
+            Dict: 对话记录数据
+        """
         export_data = {
             "访谈记录": {
-                "开始时间": self.responses.get("initial_problem", {}).timestamp if hasattr(self, 'responses') else "",
+                "开始时间": self.responses["initial_problem"].timestamp_iso if "initial_problem" in self.responses else "",
                 "完成时间": datetime.now().isoformat(),
                 "当前阶段": self.current_phase,
                 "对话历史": []
@@ -369,21 +555,19 @@ class FiveWInterviewer:
         }
 
         # 添加所有问题和回答
-        for question_id, response in self.responses.items():
-            export_data["访谈记录"]["对话历史"].append({
-                "问题ID": question_id,
-                "回答": asdict(response)
-            })
+        with span("five_w.to_dict"):
+            for question_id, response in self.responses.items():
+                export_data["访谈记录"]["对话历史"].append({
+                    "问题ID": question_id,
+                    "回答": response.to_dict()
+                })
+
+        if self.questions_skipped:
+            export_data["访谈记录"]["跳过问题"] = self.questions_skipped
 
         # 添加总结
         export_data["访谈总结"] = self.generate_interview_summary()
-
-        # 保存文件
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
-
-        return output_path
+        return export_data
 
     def get_remaining_questions(self) -> List[str]:
         """获取剩余未问的问题"""
@@ -391,7 +575,7 @@ class FiveWInterviewer:
         if self.current_phase in self.question_templates:
             phase_questions = self.question_templates[self.current_phase]["questions"]
             for question in phase_questions:
-                if question["id"] not in self.questions_asked:
+                if question["id"] not in self._asked_ids:
                     remaining.append(question["question"])
 
         return remaining
@@ -420,8 +604,18 @@ def main():
         print("回答处理结果:", response)
 
     # 导出对话记录
-    export_file = interviewer.export_conversation("interview_record.json")
+    export_file = interviewer.export_conversation("interview_record.json", pretty=True)
     print(f"对话记录已导出: {export_file}")
 
+    # 自适应模式：回答已覆盖的问题被跳过
+    adaptive = FiveWInterviewer(adaptive=True)
+    result = adaptive.start_interview("空调制冷效果不佳，2024年1月批次在北美安装现场出现")
+    asked = []
+    while result.get("next_question") is not None:
+        question_id = result["next_question"].question_id
+        asked.append(question_id)
+        result = adaptive.process_response(question_id, "电容供应商来料批次不良，作业标准缺失，需增加来料检验和培训")
+    print(f"自适应访谈: 提问 {asked}，跳过 {list(adaptive.questions_skipped)}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片预处理（缩略/降采样）模块
+在提交AI模型前按分析类型对图片解码、降采样并重新压缩，
+按内容哈希缓存结果；缺陷检测保持原始分辨率
+需要Pillow库（pip install Pillow），未安装时原样透传
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# 各分析类型的预处理配置；None 表示保持原始分辨率
+DEFAULT_PROFILES = {
+    "quality_defect": None,
+    "operation_flow": {"max_side": 1024, "quality": 80},
+    "product_status": {"max_side": 768, "quality": 75}
+}
+
+
+def _downscale(image_path: str, max_side: int, quality: int) -> Tuple[bytes, Dict]:
+    """
+    解码、降采样并重新压缩为JPEG
+
+    JPEG使用draft模式在DCT域直接按2的幂缩小，再用Pillow的C实现做精确缩放
+
+    Returns:
+        Tuple[bytes, Dict]: JPEG字节和尺寸信息
+    """
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        original_size = image.size
+        if image.format == "JPEG":
+            image.draft("RGB", (max_side, max_side))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.BILINEAR)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+        return buffer.getvalue(), {
+            "original_size": list(original_size),
+            "output_size": list(image.size)
+        }
+
+
+def _downscale_task(args) -> Tuple[str, Optional[bytes], Dict]:
+    """进程池任务"""
+    image_path, max_side, quality = args
+    try:
+        data, info = _downscale(image_path, max_side, quality)
+        return image_path, data, info
+    except Exception as e:
+        return image_path, None, {"error": str(e)}
+
+
+class ImagePreprocessor:
+    """按分析类型配置的图片预处理器，带内容哈希LRU缓存"""
+
+    def __init__(self, profiles: Optional[Dict] = None, cache_size: int = 256):
+        self.profiles = dict(DEFAULT_PROFILES)
+        if profiles:
+            self.profiles.update(profiles)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._available = None
+
+    @property
+    def available(self) -> bool:
+        """是否安装了Pillow"""
+        if self._available is None:
+            try:
+                import PIL  # noqa: F401
+                self._available = True
+            except ImportError:
+                self._available = False
+        return self._available
+
+    def get_profile(self, analysis_type: str) -> Optional[Dict]:
+        """获取分析类型对应的预处理配置，None表示不做预处理"""
+        return self.profiles.get(analysis_type)
+
+    def _cache_key(self, content_hash: str, profile: Dict) -> str:
+        return f"{content_hash}:{profile['max_side']}:{profile['quality']}"
+
+    def _cache_get(self, key: str):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key: str, entry):
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def prepare(self, image_path: str, content_hash: str, analysis_type: str) -> Optional[Tuple[bytes, Dict]]:
+        """
+        按分析类型预处理单张图片
+
+        Args:
+            image_path: 图片路径
+            content_hash: 图片内容哈希（缓存键）
+            analysis_type: 分析类型
+
+        Returns:
+            Optional[Tuple[bytes, Dict]]: 预处理后的JPEG字节和信息；
+            无需预处理、Pillow未安装或解码失败时返回None，调用方应使用原图
+        """
+        profile = self.get_profile(analysis_type)
+        if profile is None or not self.available:
+            return None
+
+        key = self._cache_key(content_hash, profile)
+        cached = self._cache_get(key)
+        if cached is not None:
+            data, info = cached
+            return data, dict(info, cache_hit=True)
+
+        try:
+            data, info = _downscale(image_path, profile["max_side"], profile["quality"])
+        except Exception:
+            return None
+
+        if len(data) >= os.path.getsize(image_path):
+            # 重新压缩后反而更大（如原图已很小），使用原图
+            return None
+
+        self._cache_put(key, (data, info))
+        return data, dict(info, cache_hit=False)
+
+    def prepare_batch(self, images: List[Tuple[str, str]], analysis_type: str,
+                      max_workers: Optional[int] = None) -> Dict[str, Optional[Tuple[bytes, Dict]]]:
+        """
+        在进程池中批量预处理图片
+
+        Args:
+            images: (图片路径, 内容哈希) 列表
+            analysis_type: 分析类型
+            max_workers: 进程数，默认CPU核数
+
+        Returns:
+            Dict[str, Optional[Tuple[bytes, Dict]]]: 图片路径 -> 预处理结果（None表示使用原图）
+        """
+        profile = self.get_profile(analysis_type)
+        results = {path: None for path, _ in images}
+        if profile is None or not self.available:
+            return results
+
+        pending = []
+        hashes = {}
+        for path, content_hash in images:
+            cached = self._cache_get(self._cache_key(content_hash, profile))
+            if cached is not None:
+                results[path] = (cached[0], dict(cached[1], cache_hit=True))
+            else:
+                hashes[path] = content_hash
+                pending.append((path, profile["max_side"], profile["quality"]))
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                for path, data, info in pool.map(_downscale_task, pending):
+                    if data is None or len(data) >= os.path.getsize(path):
+                        continue
+                    self._cache_put(self._cache_key(hashes[path], profile), (data, info))
+                    results[path] = (data, dict(info, cache_hit=False))
+
+        return results
+
+
+def main():
+    """主函数，用于测试"""
+    preprocessor = ImagePreprocessor()
+    print("Pillow可用:", preprocessor.available)
+    for analysis_type in ("quality_defect", "operation_flow", "product_status"):
+        print(analysis_type, "->", preprocessor.get_profile(analysis_type))
+
+
+if __name__ == "__main__":
+    main()
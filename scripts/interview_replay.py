@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+5W1H访谈回放与压测引擎
+回放 export_conversation 导出的访谈记录或生成合成回答流，
+以多进程方式驱动大量 FiveWInterviewer 会话，统计吞吐量、各阶段延迟和单会话内存
+"""
+
+import os
+import json
+import math
+import time
+import random
+import argparse
+import tracemalloc
+from multiprocessing import Pool
+from typing import Dict, Iterable, List
+
+try:
+    from .five_w_interviewer import FiveWInterviewer
+    from . import serializers
+except ImportError:
+    from five_w_interviewer import FiveWInterviewer
+    import serializers
+
+# 计时的会话阶段
+PHASES = ("start_interview", "process_response", "generate_interview_summary")
+
+SYNTHETIC_PROBLEMS = [
+    "空调制冷效果不佳，客户投诉频繁",
+    "室外机运行噪音异常",
+    "压缩机启动后立即停止",
+    "室内机漏水",
+    "遥控器无法控制温度设定"
+]
+
+SYNTHETIC_FRAGMENTS = [
+    "压缩机启动后立即停止工作",
+    "2024年1月批次开始出现",
+    "北美东部安装现场",
+    "供应商A提供的启动电容",
+    "原因是电容容值偏低导致启动失败",
+    "来料检验未覆盖该参数",
+    "增加来料全检并更新控制计划"
+]
+
+
+def load_recording(path: str) -> Dict:
+    """
+    读取 export_conversation 导出的访谈记录，转换为回放脚本
+
+    Args:
+        path: 访谈记录文件路径（JSON或msgpack）
+
+    Returns:
+        Dict: {"problem": 初始问题, "answers": {question_id: 回答参数}}
+    """
+    data = serializers.read_file(path)
+
+    script = {"problem": "", "answers": {}}
+    for entry in data.get("访谈记录", {}).get("对话历史", []):
+        answer = entry.get("回答", {})
+        question_id = entry.get("问题ID") or answer.get("question_id")
+        if question_id == "initial_problem":
+            script["problem"] = answer.get("answer_text", "")
+            continue
+        script["answers"][question_id] = {
+            "answer_text": answer.get("answer_text", ""),
+            "answer_details": answer.get("answer_details", []),
+            "confidence_level": answer.get("confidence_level", "medium"),
+            "supporting_evidence": answer.get("supporting_evidence", [])
+        }
+    return script
+
+
+def generate_synthetic_scripts(count: int, seed: int = 0) -> List[Dict]:
+    """
+    按问题模板生成合成回答流
+
+    Args:
+        count: 会话数量
+        seed: 随机种子，保证结果可复现
+
+    Returns:
+        List[Dict]: 回放脚本列表
+    """
+    rng = random.Random(seed)
+    templates = FiveWInterviewer().question_templates
+    question_ids = [q["id"] for phase in templates.values() for q in phase["questions"]]
+
+    scripts = []
+    for _ in range(count):
+        answers = {}
+        for question_id in question_ids:
+            answers[question_id] = {
+                "answer_text": "，".join(rng.sample(SYNTHETIC_FRAGMENTS, 2)),
+                "answer_details": rng.sample(SYNTHETIC_FRAGMENTS, rng.randint(0, 3)),
+                "confidence_level": rng.choice(["high", "medium", "low"]),
+                "supporting_evidence": rng.sample(["现场照片", "维修记录", "检验报告"], rng.randint(0, 2))
+            }
+        scripts.append({"problem": rng.choice(SYNTHETIC_PROBLEMS), "answers": answers})
+    return scripts
+
+
+def replay_session(script: Dict, measure_memory: bool = False, adaptive: bool = False,
+                   think_time: float = 0.0) -> Dict:
+    """
+    回放单个访谈会话
+
+    Args:
+        script: 回放脚本
+        measure_memory: 是否用tracemalloc统计会话内存峰值
+        adaptive: 是否启用自适应问题调度
+        think_time: 每个问题模拟的操作员作答时间（秒），计入会话耗时
+
+    Returns:
+        Dict: 各阶段耗时列表、回答数和内存峰值
+    """
+    timings = {phase: [] for phase in PHASES}
+    # 调用方已在跟踪内存时不启停tracemalloc，只重置峰值（Python 3.9+）并扣除已有的内存占用
+    owns_tracing = measure_memory and not tracemalloc.is_tracing()
+    memory_baseline = 0
+    if owns_tracing:
+        tracemalloc.start()
+    elif measure_memory:
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        memory_baseline = tracemalloc.get_traced_memory()[0]
+
+    interviewer = FiveWInterviewer(adaptive=adaptive)
+    session_start = start = time.perf_counter()
+    result = interviewer.start_interview(script.get("problem", ""))
+    timings["start_interview"].append(time.perf_counter() - start)
+
+    answers = script.get("answers", {})
+    question = result["next_question"]
+    answered = 0
+    while question is not None:
+        answer = answers.get(question.question_id, {"answer_text": ""})
+        if think_time:
+            time.sleep(think_time)
+        start = time.perf_counter()
+        result = interviewer.process_response(question.question_id, **answer)
+        timings["process_response"].append(time.perf_counter() - start)
+        answered += 1
+        question = result.get("next_question")
+
+    start = time.perf_counter()
+    interviewer.generate_interview_summary()
+    timings["generate_interview_summary"].append(time.perf_counter() - start)
+    session_time = time.perf_counter() - session_start
+
+    memory_peak = 0
+    if measure_memory:
+        memory_peak = max(0, tracemalloc.get_traced_memory()[1] - memory_baseline)
+        if owns_tracing:
+            tracemalloc.stop()
+
+    return {"timings": timings, "answered": answered, "session_time": session_time, "memory_peak": memory_peak}
+
+
+def _replay_chunk(args) -> Dict:
+    """进程池任务：回放一组会话并合并结果"""
+    scripts, measure_memory, adaptive, think_time = args
+    merged = {"timings": {phase: [] for phase in PHASES}, "answered": 0,
+              "session_times": [], "memory_peaks": []}
+    for script in scripts:
+        session = replay_session(script, measure_memory, adaptive, think_time)
+        for phase in PHASES:
+            merged["timings"][phase].extend(session["timings"][phase])
+        merged["answered"] += session["answered"]
+        merged["session_times"].append(session["session_time"])
+        if measure_memory:
+            merged["memory_peaks"].append(session["memory_peak"])
+    return merged
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """计算分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct * len(ordered) / 100.0) - 1))
+    return ordered[index]
+
+
+def run_load_test(scripts: Iterable[Dict], sessions: int, workers: int = 0,
+                  chunk_size: int = 50, measure_memory: bool = False, adaptive: bool = False,
+                  think_time: float = 0.0) -> Dict:
+    """
+    并行回放访谈会话
+
+    Args:
+        scripts: 回放脚本，数量不足 sessions 时循环使用
+        sessions: 总会话数
+        workers: 进程数，0表示使用CPU核数，1表示在当前进程执行
+        chunk_size: 每个进程任务包含的会话数
+        measure_memory: 是否统计单会话内存峰值
+        adaptive: 是否启用自适应问题调度
+        think_time: 每个问题模拟的操作员作答时间（秒）
+
+    Returns:
+        Dict: 吞吐量、各阶段延迟分位数和内存统计
+    """
+    scripts = list(scripts)
+    if not scripts:
+        raise ValueError("没有可回放的访谈脚本")
+
+    session_scripts = [scripts[i % len(scripts)] for i in range(sessions)]
+    chunks = [(session_scripts[i:i + chunk_size], measure_memory, adaptive, think_time)
+              for i in range(0, len(session_scripts), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if workers == 1:
+        chunk_results = [_replay_chunk(chunk) for chunk in chunks]
+    else:
+        with Pool(processes=workers) as pool:
+            chunk_results = pool.map(_replay_chunk, chunks)
+    elapsed = time.perf_counter() - start
+
+    timings = {phase: [] for phase in PHASES}
+    answered = 0
+    session_times = []
+    memory_peaks = []
+    for chunk in chunk_results:
+        for phase in PHASES:
+            timings[phase].extend(chunk["timings"][phase])
+        answered += chunk["answered"]
+        session_times.extend(chunk["session_times"])
+        memory_peaks.extend(chunk["memory_peaks"])
+
+    report = {
+        "sessions": sessions,
+        "workers": workers,
+        "elapsed_seconds": elapsed,
+        "sessions_per_second": sessions / elapsed if elapsed else 0.0,
+        "adaptive": adaptive,
+        "responses_processed": answered,
+        "questions_per_session": answered / sessions if sessions else 0.0,
+        "session_time_ms": sum(session_times) / len(session_times) * 1000 if session_times else 0.0,
+        "phase_latency_ms": {}
+    }
+    for phase in PHASES:
+        values = timings[phase]
+        report["phase_latency_ms"][phase] = {
+            "count": len(values),
+            "mean": sum(values) / len(values) * 1000 if values else 0.0,
+            "p50": _percentile(values, 50) * 1000,
+            "p95": _percentile(values, 95) * 1000,
+            "p99": _percentile(values, 99) * 1000
+        }
+    if memory_peaks:
+        report["memory_per_session_bytes"] = {
+            "mean": sum(memory_peaks) / len(memory_peaks),
+            "max": max(memory_peaks)
+        }
+    return report
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="5W1H访谈回放与压测")
+    parser.add_argument("recordings", nargs="*", help="export_conversation 导出的访谈记录文件")
+    parser.add_argument("--sessions", type=int, default=1000, help="总会话数")
+    parser.add_argument("--synthetic", type=int, default=100, help="未提供记录时生成的合成脚本数量")
+    parser.add_argument("--workers", type=int, default=0, help="进程数，默认CPU核数")
+    parser.add_argument("--memory", action="store_true", help="统计单会话内存峰值")
+    parser.add_argument("--adaptive", action="store_true", help="启用自适应问题调度")
+    parser.add_argument("--think-time", type=float, default=0.0, help="每个问题模拟的作答时间（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="合成回答随机种子")
+    parser.add_argument("-o", "--output", default="", help="将压测报告保存为JSON")
+    args = parser.parse_args()
+
+    if args.recordings:
+        scripts = [load_recording(path) for path in args.recordings]
+    else:
+        scripts = generate_synthetic_scripts(args.synthetic, args.seed)
+
+    report = run_load_test(scripts, args.sessions, args.workers,
+                           measure_memory=args.memory, adaptive=args.adaptive,
+                           think_time=args.think_time)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+5W1H访谈到8D报告的自动映射
+将 FiveWInterviewer 的访谈回答（实时会话或导出记录）转换为 D2/D4/D7 阶段草稿，
+随回答到达增量更新；支持并行批量将访谈归档转换为8D报告草稿
+"""
+
+import os
+import re
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    from .eight_d_report_generator import EightDReportGenerator, D2Data, D4Data, D7Data
+    from .answer_validator import FISHBONE_TERMS
+    from . import serializers
+except ImportError:
+    from eight_d_report_generator import EightDReportGenerator, D2Data, D4Data, D7Data
+    from answer_validator import FISHBONE_TERMS
+    import serializers
+
+SENTENCE_SPLIT = re.compile(r"[，,；;。、\n]+")
+CUSTOMER_COUNT_PATTERN = re.compile(r"(\d+)\s*(?:个|家|位|名)?客户|客户[^\d，,；;。]{0,6}(\d+)\s*(?:起|个|家|位|名)")
+CUSTOMER_IMPACT_PATTERN = re.compile(r"客户|投诉|影响")
+FINANCIAL_PATTERN = re.compile(r"\d+(\.\d+)?\s*(万元|元|美元|万)|成本|费用|损失|索赔")
+SAFETY_PATTERN = re.compile(r"安全|伤害|火灾|触电|起火|烫伤|漏电")
+LEGAL_PATTERN = re.compile(r"法律|法规|合规|召回|诉讼|UL|ETL|AHRI|DOE|认证")
+PROCESS_PATTERN = re.compile(r"流程|工艺|作业|工序|检验|检查点")
+TRAINING_PATTERN = re.compile(r"培训|技能|资质|上岗")
+SYSTEM_PATTERN = re.compile(r"系统|MES|ERP|监控|防错|自动")
+DOCUMENT_PATTERN = re.compile(r"文件|标准|规范|控制计划|SOP|FMEA|作业指导")
+
+# 问题ID -> 目标阶段
+QUESTION_PHASES = {
+    "initial_problem": ("D2",),
+    "what_problem": ("D2",),
+    "when_problem": ("D2",),
+    "where_problem": ("D2",),
+    "who_involved": ("D2",),
+    "how_severe": ("D2",),
+    "why_immediate": ("D4",),
+    "why_systematic": ("D4",),
+    "why_process": ("D4",),
+    "how_prevent": ("D7",)
+}
+
+D2_QUESTIONS = tuple(qid for qid, phases in QUESTION_PHASES.items() if "D2" in phases)
+
+PENDING = "待补充"
+
+
+def _sentences(text: str) -> List[str]:
+    return [part.strip() for part in SENTENCE_SPLIT.split(text) if part.strip()]
+
+
+def _answer_text(response) -> str:
+    """合并回答文本和详情"""
+    if isinstance(response, dict):
+        text, details = response.get("answer_text", ""), response.get("answer_details", [])
+    else:
+        text, details = response.answer_text, response.answer_details
+    return "，".join([text] + list(details)) if details else text
+
+
+def _evidence(response) -> List[str]:
+    if isinstance(response, dict):
+        return list(response.get("supporting_evidence", []))
+    return list(response.supporting_evidence)
+
+
+class InterviewTo8DMapper:
+    """访谈到8D草稿的增量映射器"""
+
+    def __init__(self):
+        self.answers = {}
+        self.evidence = {}
+        self._dirty = set()
+        self._drafts = {}
+
+    def on_response(self, response):
+        """
+        接收一条回答（UserResponse或导出的回答字典），只标记受影响的阶段
+
+        可直接注册为 FiveWInterviewer 的回答监听器
+        """
+        question_id = response["question_id"] if isinstance(response, dict) else response.question_id
+        phases = QUESTION_PHASES.get(question_id)
+        if phases is None:
+            return
+        self.answers[question_id] = _answer_text(response)
+        self.evidence[question_id] = _evidence(response)
+        self._dirty.update(phases)
+
+    def _get(self, *question_ids: str) -> str:
+        return "；".join(self.answers[qid] for qid in question_ids if self.answers.get(qid))
+
+    def _build_d2(self) -> D2Data:
+        severity = self._get("how_severe")
+        # 80%完成度规则下严重程度问题可能未被提问，影响信息从全部D2回答中提取
+        sentences = _sentences(self._get(*D2_QUESTIONS))
+        affected_customers = 0
+        for sentence in sentences:
+            match = CUSTOMER_COUNT_PATTERN.search(sentence)
+            if match:
+                affected_customers = int(match.group(1) or match.group(2))
+                break
+
+        def impact(pattern) -> str:
+            hits = [s for s in sentences if pattern.search(s)]
+            return "；".join(hits) if hits else PENDING
+
+        return D2Data(
+            problem_statement=self._get("initial_problem", "what_problem") or PENDING,
+            problem_scope=self._get("when_problem", "where_problem", "who_involved") or PENDING,
+            affected_customers=affected_customers,
+            customer_impact=severity or impact(CUSTOMER_IMPACT_PATTERN),
+            safety_impact=impact(SAFETY_PATTERN),
+            legal_impact=impact(LEGAL_PATTERN),
+            financial_impact=impact(FINANCIAL_PATTERN)
+        )
+
+    def _build_d4(self) -> D4Data:
+        why_ids = ("why_immediate", "why_systematic", "why_process")
+        five_whys = [self.answers[qid] for qid in why_ids if self.answers.get(qid)]
+        causes = []
+        for qid in why_ids:
+            causes.extend(_sentences(self.answers.get(qid, "")))
+
+        fishbone = {"问题": self._get("initial_problem", "what_problem")}
+        for category, terms in FISHBONE_TERMS.items():
+            hits = [cause for cause in causes if any(term in cause for term in terms)]
+            if hits:
+                fishbone[category] = {f"原因{i + 1}": hit for i, hit in enumerate(hits)}
+
+        evidence = []
+        for qid in ("what_problem", "how_severe") + why_ids:
+            evidence.extend(self.evidence.get(qid, []))
+
+        return D4Data(
+            root_cause_analysis=self._get(*why_ids) or PENDING,
+            fishbone_diagram=fishbone,
+            five_whys=five_whys,
+            data_analysis={"支持证据": evidence},
+            potential_causes=causes,
+            verified_root_cause=""  # 根因需在D4中验证后确认
+        )
+
+    def _build_d7(self) -> D7Data:
+        measures = _sentences(self.answers.get("how_prevent", ""))
+        return D7Data(
+            prevention_measures=measures,
+            process_improvements=[m for m in measures if PROCESS_PATTERN.search(m)],
+            training_requirements=[m for m in measures if TRAINING_PATTERN.search(m)],
+            system_updates=[m for m in measures if SYSTEM_PATTERN.search(m)],
+            documentation_changes=[m for m in measures if DOCUMENT_PATTERN.search(m)]
+        )
+
+    def drafts(self) -> Dict:
+        """
+        获取当前的阶段草稿，只重建自上次调用后有新回答的阶段
+
+        Returns:
+            Dict: {"D2": D2Data, "D4": D4Data, "D7": D7Data} 中已有回答的阶段
+        """
+        builders = {"D2": self._build_d2, "D4": self._build_d4, "D7": self._build_d7}
+        for phase in sorted(self._dirty):
+            self._drafts[phase] = builders[phase]()
+        self._dirty.clear()
+        return dict(self._drafts)
+
+    def apply_to(self, generator: EightDReportGenerator) -> List[str]:
+        """
+        将草稿写入8D报告生成器
+
+        Returns:
+            List[str]: 成功写入的阶段
+        """
+        applied = []
+        for phase, data in self.drafts().items():
+            if generator.collect_information(phase, data.to_dict()):
+                applied.append(phase)
+        return applied
+
+    @classmethod
+    def from_interviewer(cls, interviewer) -> "InterviewTo8DMapper":
+        """
+        绑定实时访谈：回放已有回答并注册监听器，此后每条回答到达即更新草稿
+        """
+        mapper = cls()
+        for response in interviewer.responses.values():
+            mapper.on_response(response)
+        interviewer.add_response_listener(mapper.on_response)
+        return mapper
+
+    @classmethod
+    def from_export(cls, path: str) -> "InterviewTo8DMapper":
+        """从 export_conversation 导出的记录构建"""
+        mapper = cls()
+        data = serializers.read_file(path)
+        for entry in data.get("访谈记录", {}).get("对话历史", []):
+            mapper.on_response(entry.get("回答", {}))
+        return mapper
+
+
+def convert_export(path: str, output_dir: str, fmt: Optional[str] = None,
+                   name: Optional[str] = None) -> Dict:
+    """
+    将一份访谈导出记录转换为8D报告草稿文件
+
+    Args:
+        path: 访谈导出记录路径
+        output_dir: 草稿输出目录
+        fmt: 输出格式
+        name: 草稿文件名（不含后缀），默认为导出记录的文件名
+
+    Returns:
+        Dict: 转换结果（输出路径或错误）
+    """
+    try:
+        generator = EightDReportGenerator()
+        phases = InterviewTo8DMapper.from_export(path).apply_to(generator)
+        fmt = fmt or serializers.get_default_format()
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        output_path = os.path.join(output_dir, f"{name}_8D_draft{serializers.FILE_EXTENSIONS[fmt]}")
+        generator.generate_report(output_path, fmt)
+        return {"source": path, "output": output_path, "phases": phases}
+    except Exception as e:
+        return {"source": path, "error": str(e)}
+
+
+def _convert_task(args) -> Dict:
+    return convert_export(*args)
+
+
+def _output_names(paths: List[str]) -> List[str]:
+    """
+    各导出记录的草稿文件名：文件名不重复时直接使用，否则使用相对公共目录的路径
+    （如 line1/interview_record 写为 line1__interview_record），避免不同目录下的同名记录互相覆盖
+    """
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    if len(set(stems)) == len(stems):
+        return stems
+    absolute = [os.path.abspath(path) for path in paths]
+    base = os.path.commonpath([os.path.dirname(path) for path in absolute])
+    return [os.path.splitext(os.path.relpath(path, base))[0].replace(os.sep, "__") for path in absolute]
+
+
+def convert_archive(paths: List[str], output_dir: str, fmt: Optional[str] = None,
+                    max_workers: Optional[int] = None) -> List[Dict]:
+    """
+    并行将访谈归档批量转换为8D报告草稿
+
+    Args:
+        paths: 访谈导出记录路径列表
+        output_dir: 草稿输出目录
+        fmt: 输出格式
+        max_workers: 进程数，默认CPU核数
+
+    Returns:
+        List[Dict]: 每份记录的转换结果
+    """
+    tasks = [(path, output_dir, fmt, name) for path, name in zip(paths, _output_names(paths))]
+    if len(tasks) <= 1 or max_workers == 1:
+        return [_convert_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_convert_task, tasks, chunksize=16))
+
+
+def main():
+    """命令行入口：批量转换访谈记录，未提供文件时运行实时示例"""
+    parser = argparse.ArgumentParser(description="5W1H访谈到8D草稿映射")
+    parser.add_argument("exports", nargs="*", help="export_conversation 导出的访谈记录文件")
+    parser.add_argument("-o", "--output-dir", default="8d_drafts", help="草稿输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="进程数")
+    args = parser.parse_args()
+
+    if args.exports:
+        for result in convert_archive(args.exports, args.output_dir, max_workers=args.workers):
+            print(result)
+        return
+
+    try:
+        from .five_w_interviewer import FiveWInterviewer
+    except ImportError:
+        from five_w_interviewer import FiveWInterviewer
+
+    interviewer = FiveWInterviewer()
+    interviewer.start_interview("空调制冷效果不佳，客户投诉频繁")
+    mapper = InterviewTo8DMapper.from_interviewer(interviewer)
+    answers = {
+        "what_problem": "压缩机启动后立即停止工作",
+        "when_problem": "2024年1月批次开始出现",
+        "where_problem": "北美东部安装现场",
+        "who_involved": "供应商A、安装工，已有120个客户投诉，预计损失50万元",
+        "how_severe": "已有300台受影响，120个客户投诉，预计损失50万元，涉及UL认证复审",
+        "why_immediate": "启动电容容值偏低导致压缩机无法启动",
+        "why_systematic": "来料检验未覆盖电容参数，监控系统失效",
+        "why_process": "作业标准缺失，供应商变更流程未执行",
+        "how_prevent": "增加来料全检，更新控制计划，培训检验员，MES增加电容参数防错"
+    }
+    question = interviewer.get_next_question()
+    while question is not None:
+        result = interviewer.process_response(question.question_id, answers.get(question.question_id, ""))
+        question = result.get("next_question")
+
+    for phase, data in mapper.drafts().items():
+        print(phase, data.to_dict())
+
+
+if __name__ == "__main__":
+    main()
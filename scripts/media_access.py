@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于mmap的零拷贝媒体访问模块
+将图片/视频文件映射为memoryview，供格式识别、哈希计算和编码等阶段共享同一映射，
+多阶段处理在一次顺序扫描中完成，每个页面只访问一次
+"""
+
+import os
+import mmap
+import base64
+import hashlib
+from typing import Callable, Iterable, List, Optional
+
+# 扫描分块大小，保持为3的倍数以便分块base64编码后可直接拼接
+SCAN_CHUNK_SIZE = 3 * 1024 * 1024
+
+# 文件头魔数 -> 格式
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"BM", ".bmp"),
+    (b"II*\x00", ".tiff"),
+    (b"MM\x00*", ".tiff"),
+]
+
+VIDEO_SIGNATURES = [
+    (b"FLV", ".flv"),
+    (b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", ".wmv"),
+]
+
+# QuickTime容器中可能出现在文件开头的原子类型
+QUICKTIME_ATOMS = (b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot")
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """
+    根据文件头识别媒体格式
+
+    Args:
+        header: 文件开头至少16字节
+
+    Returns:
+        Optional[str]: 与 supported_*_formats 一致的扩展名，无法识别时返回None
+    """
+    header = bytes(header[:16])
+    for signature, fmt in IMAGE_SIGNATURES + VIDEO_SIGNATURES:
+        if header.startswith(signature):
+            return fmt
+
+    if header[:4] == b"RIFF" and header[8:12] == b"AVI ":
+        return ".avi"
+    if header[4:8] == b"ftyp":
+        return ".mov" if header[8:12] == b"qt  " else ".mp4"
+    if header[4:8] in QUICKTIME_ATOMS:
+        return ".mov"
+    return None
+
+
+class Base64Sink:
+    """分块base64编码器，配合 MappedMedia.scan 使用"""
+
+    def __init__(self):
+        self._parts = []
+
+    def update(self, chunk: memoryview):
+        self._parts.append(base64.b64encode(chunk))
+
+    def getvalue(self) -> str:
+        return b"".join(self._parts).decode()
+
+
+class MappedMedia:
+    """
+    只读内存映射的媒体文件
+
+    用法:
+        with MappedMedia("defect.jpg") as media:
+            fmt = media.format
+            digest = media.sha256()
+            encoded = base64.b64encode(media.view)
+
+    注意：从 view 切出的子视图不能在 with 块之外继续持有
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._file = open(path, 'rb')
+        self._mmap = None
+        if self.size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self._mmap, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+            self.view = memoryview(self._mmap)
+        else:
+            # 空文件无法映射
+            self.view = memoryview(b"")
+        self._format = None
+        self._format_known = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self) -> int:
+        return self.size
+
+    def close(self):
+        """释放视图、映射和文件句柄"""
+        self.view.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # 仍有外部持有的子视图，映射将在其释放后回收
+                pass
+            self._mmap = None
+        self._file.close()
+
+    @property
+    def format(self) -> Optional[str]:
+        """按文件头识别的格式（只读取第一页）"""
+        if not self._format_known:
+            self._format = sniff_format(self.view[:16])
+            self._format_known = True
+        return self._format
+
+    def scan(self, consumers: Iterable[Callable[[memoryview], None]],
+             chunk_size: int = SCAN_CHUNK_SIZE) -> int:
+        """
+        顺序扫描映射，将每个分块依次交给所有消费者
+
+        多个处理阶段（哈希、编码等）共享同一次扫描，每个页面只被访问一次
+
+        Args:
+            consumers: 接受memoryview分块的可调用对象列表
+            chunk_size: 分块大小
+
+        Returns:
+            int: 扫描的字节数
+        """
+        consumers = list(consumers)
+        for offset in range(0, self.size, chunk_size):
+            chunk = self.view[offset:offset + chunk_size]
+            try:
+                for consume in consumers:
+                    consume(chunk)
+            finally:
+                chunk.release()
+        return self.size
+
+    def sha256(self) -> str:
+        """计算内容SHA-256（单次扫描）"""
+        hasher = hashlib.sha256()
+        self.scan([hasher.update])
+        return hasher.hexdigest()
+
+    def hash_and_encode(self) -> List[str]:
+        """
+        一次扫描同时完成SHA-256和base64编码
+
+        Returns:
+            List[str]: [sha256十六进制摘要, base64字符串]
+        """
+        hasher = hashlib.sha256()
+        sink = Base64Sink()
+        self.scan([hasher.update, sink.update])
+        return [hasher.hexdigest(), sink.getvalue()]
+
+
+def main():
+    """主函数，用于测试"""
+    import tempfile
+
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+        f.write(b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + os.urandom(5 * 1024 * 1024))
+        path = f.name
+
+    try:
+        with MappedMedia(path) as media:
+            digest, encoded = media.hash_and_encode()
+            print("格式:", media.format)
+            print("大小:", len(media))
+            print("SHA-256:", digest)
+            print("base64一致:", encoded == base64.b64encode(media.view).decode())
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
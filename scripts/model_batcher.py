@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片分析请求微批处理
+将并发的 process_image 模型请求按分析类型聚合为最多 N 张图片或等待 T 毫秒的批次，
+以一次批量请求发送，再把结果按顺序分发回各调用方的 Future
+"""
+
+import time
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 同一批次内共享的请求字段（也是分批的键），其余字段按图片逐项发送
+BATCH_SHARED_FIELDS = ("analysis_type", "domain", "language")
+
+
+def build_batch_payload(payloads: List[Dict]) -> Dict:
+    """
+    构建批量请求参数
+
+    Args:
+        payloads: 同一分批键下的单图请求参数
+
+    Returns:
+        Dict: 共享字段 + items 列表（每项为单图的其余字段）
+    """
+    batch = {field: payloads[0].get(field) for field in BATCH_SHARED_FIELDS}
+    batch["items"] = [{k: v for k, v in payload.items() if k not in BATCH_SHARED_FIELDS}
+                      for payload in payloads]
+    return batch
+
+
+class _Pending:
+    __slots__ = ("payloads", "futures", "deadline")
+
+    def __init__(self, deadline: float):
+        self.payloads = []
+        self.futures = []
+        self.deadline = deadline
+
+
+class MicroBatcher:
+    """模型请求微批处理器"""
+
+    def __init__(self, batch_backend: Callable[[Dict], List[Dict]], max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0, max_inflight_batches: int = 4):
+        """
+        Args:
+            batch_backend: 批量模型客户端，接收 build_batch_payload 构建的请求，按 items 顺序返回结果列表
+            max_batch_size: 每批最多图片数，凑满立即发送
+            max_wait_ms: 批次中第一张图片最多等待的毫秒数，超时即发送未满的批次
+            max_inflight_batches: 同时在途的批次数
+        """
+        self.batch_backend = batch_backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"items": 0, "batches": 0, "full_batches": 0, "errors": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight_batches)
+        self._flusher = threading.Thread(target=self._flush_loop, name="model-batcher", daemon=True)
+        self._flusher.start()
+
+    def submit(self, payload: Dict) -> Future:
+        """
+        提交单图请求
+
+        Args:
+            payload: process_image 构建的 api_payload
+
+        Returns:
+            Future: 该图片的模型结果
+        """
+        key = tuple(payload.get(field) for field in BATCH_SHARED_FIELDS)
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("微批处理器已关闭")
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _Pending(time.monotonic() + self.max_wait)
+                self._cond.notify()
+            pending.payloads.append(payload)
+            pending.futures.append(future)
+            self.stats["items"] += 1
+            if len(pending.payloads) >= self.max_batch_size:
+                del self._pending[key]
+                self.stats["full_batches"] += 1
+                self._send(pending)
+        return future
+
+    def call(self, payload: Dict, timeout: Optional[float] = None) -> Dict:
+        """同步调用（阻塞直到所在批次返回）"""
+        return self.submit(payload).result(timeout)
+
+    def client(self) -> Callable[[Dict], Dict]:
+        """单图模型客户端，可作为 MultimediaProcessor 的 model_client 或 ModelRequestScheduler 的后端"""
+        return self.call
+
+    def _send(self, pending: _Pending):
+        """提交批次到发送线程（持锁调用）"""
+        self.stats["batches"] += 1
+        self._executor.submit(self._run_batch, pending)
+
+    def _flush_loop(self):
+        """发送等待超时的未满批次"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                expired = [key for key, pending in self._pending.items()
+                           if pending.deadline <= now or self._closed]
+                for key in expired:
+                    self._send(self._pending.pop(key))
+                if self._closed and not self._pending:
+                    return
+                if self._pending:
+                    self._cond.wait(min(p.deadline for p in self._pending.values()) - now)
+                else:
+                    self._cond.wait()
+
+    def _run_batch(self, pending: _Pending):
+        # 发送前把各Future标记为运行中，调用方已取消的图片不再发送，此后也不能再被取消
+        items = [(payload, future) for payload, future in zip(pending.payloads, pending.futures)
+                 if future.set_running_or_notify_cancel()]
+        if not items:
+            return
+        try:
+            results = self.batch_backend(build_batch_payload([payload for payload, _ in items]))
+            if len(results) != len(items):
+                raise ValueError(f"批量结果数量不匹配: 期望{len(items)}，实际{len(results)}")
+        except Exception as e:
+            with self._cond:
+                self.stats["errors"] += 1
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+    def metrics(self) -> Dict:
+        """
+        批处理统计
+
+        Returns:
+            Dict: 图片数、批次数、凑满发送的批次数、平均批大小
+        """
+        with self._cond:
+            report = dict(self.stats)
+        report["avg_batch_size"] = report["items"] / report["batches"] if report["batches"] else 0.0
+        return report
+
+    def close(self, wait: bool = True):
+        """发送剩余批次并关闭"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FakeBatchModelBackend:
+    """本地模拟批量模型后端：每次调用固定开销 + 每张图片的边际开销"""
+
+    def __init__(self, call_overhead: float = 0.02, per_item: float = 0.002):
+        """
+        Args:
+            call_overhead: 每次请求的固定耗时（网络往返、模型调度），秒
+            per_item: 每张图片的额外耗时，秒
+        """
+        self.call_overhead = call_overhead
+        self.per_item = per_item
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, batch: Dict) -> List[Dict]:
+        items = batch["items"]
+        time.sleep(self.call_overhead + self.per_item * len(items))
+        with self._lock:
+            self.calls += 1
+        return [{"status": "success", "analysis_type": batch.get("analysis_type"),
+                 "content_hash": item.get("content_hash"), "batch_size": len(items)}
+                for item in items]
+
+
+def benchmark(max_batch_size: int, max_wait_ms: float, callers: int = 32,
+              requests_per_caller: int = 20) -> Tuple[float, float, float, Dict]:
+    """
+    并发调用方压测
+
+    Returns:
+        (吞吐量 张/秒, p50延迟毫秒, p99延迟毫秒, 批处理统计)
+    """
+    backend = FakeBatchModelBackend()
+    latencies = []
+    lock = threading.Lock()
+
+    with MicroBatcher(backend, max_batch_size, max_wait_ms) as batcher:
+        def caller(index: int):
+            local = []
+            for i in range(requests_per_caller):
+                began = time.monotonic()
+                result = batcher.call({"content_hash": f"{index}-{i}", "image_data": "",
+                                       "analysis_type": "quality_defect"})
+                assert result["content_hash"] == f"{index}-{i}"
+                local.append(time.monotonic() - began)
+            with lock:
+                latencies.extend(local)
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+        stats = batcher.metrics()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+    return len(latencies) / elapsed, p50, p99, stats
+
+
+def main():
+    """命令行入口：对比不同批大小和等待时间下的吞吐量与延迟"""
+    parser = argparse.ArgumentParser(description="图片分析请求微批处理压测")
+    parser.add_argument("--callers", type=int, default=32, help="并发调用方数")
+    parser.add_argument("--requests", type=int, default=20, help="每个调用方的请求数")
+    args = parser.parse_args()
+
+    for max_batch_size, max_wait_ms in ((1, 0), (8, 5), (16, 10), (32, 20)):
+        throughput, p50, p99, stats = benchmark(max_batch_size, max_wait_ms, args.callers, args.requests)
+        print(f"批大小≤{max_batch_size:<3} 等待≤{max_wait_ms:>2}ms: 吞吐 {throughput:7.1f} 张/秒, "
+              f"p50 {p50:6.1f}ms, p99 {p99:6.1f}ms, 平均批大小 {stats['avg_batch_size']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型API请求调度器
+位于模型客户端之前：交互请求与批量请求分队列严格优先，令牌桶限速匹配服务商配额并为交互请求
+预留余量，相同的在途请求合并为一次调用（single-flight），并根据观测延迟自适应调整并发数；
+附带本地模拟后端用于测试
+"""
+
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+PRIORITIES = ("interactive", "batch")
+
+LATENCY_SAMPLES = 10000
+
+
+class RateLimitError(Exception):
+    """后端返回配额超限（相当于HTTP 429）"""
+
+
+class TokenBucket:
+    """令牌桶限速器（线程安全）"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发量），默认等于rate
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, tokens: float = 1.0, reserve: float = 0.0) -> float:
+        """
+        尝试取出令牌
+
+        Args:
+            tokens: 需要的令牌数
+            reserve: 取出后桶内至少保留的令牌数（为更高优先级请求预留）
+
+        Returns:
+            float: 成功返回0，否则返回需等待的秒数
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens - tokens >= reserve:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens + reserve - self.tokens) / self.rate
+
+    def drain(self, seconds: float):
+        """清空令牌并暂停补充约 seconds 秒（收到配额超限时退避）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+def request_key(payload: Dict) -> str:
+    """请求去重键：有内容哈希时按(内容, 分析类型)，否则按完整请求内容"""
+    if payload.get("content_hash"):
+        return f"{payload['content_hash']}:{payload.get('analysis_type', '')}"
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _Request:
+    __slots__ = ("key", "payload", "priority", "future", "submitted", "dispatched", "attempts")
+
+    def __init__(self, key: str, payload: Dict, priority: str):
+        self.key = key
+        self.payload = payload
+        self.priority = priority
+        self.future = Future()
+        self.submitted = time.monotonic()
+        self.dispatched = False
+        self.attempts = 0
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+
+class ModelRequestScheduler:
+    """优先级感知、限速、自适应并发的模型请求调度器"""
+
+    def __init__(self, backend: Callable[[Dict], Dict], rate_per_second: float,
+                 burst: Optional[float] = None, max_concurrency: int = 16, min_concurrency: int = 1,
+                 interactive_reserve: float = 0.2, target_latency: Optional[float] = None,
+                 max_retries: int = 3, retry_backoff: float = 0.5):
+        """
+        Args:
+            backend: 模型客户端，接收请求参数返回结果，配额超限时抛出 RateLimitError
+            rate_per_second: 服务商配额（每秒请求数）
+            burst: 允许的突发请求数，默认为配额的1/10（滑动窗口配额下 突发+每秒补充 不能超过配额）
+            max_concurrency: 并发上限
+            min_concurrency: 自适应调整的并发下限
+            interactive_reserve: 为交互请求预留的并发和令牌比例，批量请求不能占用
+            target_latency: 目标延迟（秒），默认取观测到的最小延迟的2倍
+            max_retries: 配额超限时的最大重试次数
+            retry_backoff: 配额超限后的退避秒数
+        """
+        self.backend = backend
+        self.bucket = TokenBucket(rate_per_second, burst or max(1.0, rate_per_second / 10))
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = max(min_concurrency, max_concurrency // 2)
+        self.interactive_reserve = interactive_reserve
+        self.token_reserve = min(self.bucket.capacity - 1, self.bucket.capacity * interactive_reserve)
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self._inflight = {}
+        self._active = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._aborted = False
+
+        self._ewma = None
+        self._min_latency = None
+        self._window = 0
+        self._saturated = False
+        self._latencies = {priority: deque(maxlen=LATENCY_SAMPLES) for priority in PRIORITIES}
+        self.stats = {"submitted": 0, "coalesced": 0, "completed": 0, "errors": 0, "rate_limited": 0}
+        self._started = time.monotonic()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="model-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, payload: Dict, priority: str = "interactive", key: Optional[str] = None) -> Future:
+        """
+        提交请求
+
+        Args:
+            payload: 模型请求参数
+            priority: interactive（交互，优先）或 batch（批量）
+            key: 去重键，默认由 request_key 计算
+
+        Returns:
+            Future: 模型结果
+        """
+        if priority not in self._queues:
+            raise ValueError(f"无效的优先级: {priority}")
+        key = key or request_key(payload)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("调度器已关闭")
+            self.stats["submitted"] += 1
+            request = self._inflight.get(key)
+            if request is not None:
+                # 相同请求已在途：共享结果，必要时提升为交互优先级
+                self.stats["coalesced"] += 1
+                if priority == "interactive" and request.priority == "batch" and not request.dispatched:
+                    request.priority = "interactive"
+                    self._queues["interactive"].append(request)
+                    self._cond.notify()
+                return request.future
+
+            request = self._inflight[key] = _Request(key, payload, priority)
+            self._queues[priority].append(request)
+            self._cond.notify()
+            return request.future
+
+    def call(self, payload: Dict, priority: str = "interactive", timeout: Optional[float] = None) -> Dict:
+        """同步调用（阻塞直到结果返回）"""
+        return self.submit(payload, priority).result(timeout)
+
+    def client(self, priority: str = "interactive") -> Callable[[Dict], Dict]:
+        """
+        绑定优先级的模型客户端，可作为 MultimediaProcessor 的 model_client
+
+        Args:
+            priority: interactive 或 batch
+        """
+        return lambda payload: self.call(payload, priority)
+
+    def _reserved_slots(self) -> int:
+        # 并发上限大于1时至少预留1个，避免小并发时预留比例向下取整为0
+        return max(1, int(self.limit * self.interactive_reserve)) if self.limit > 1 else 0
+
+    def _next_request(self):
+        """
+        选择下一个可派发的请求（持锁调用）：只看最高优先级的非空队列，
+        被并发或令牌阻塞时不让低优先级请求插队
+
+        Returns:
+            (请求或None, 需等待的秒数或None表示等待通知)
+        """
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            # 丢弃已派发或已提升优先级的过期条目
+            while queue and (queue[0].dispatched or queue[0].priority != priority):
+                queue.popleft()
+            if not queue:
+                continue
+
+            if priority == "batch":
+                if self._active >= self.limit - self._reserved_slots():
+                    return None, None
+                wait = self.bucket.try_take(1.0, self.token_reserve)
+            else:
+                if self._active >= self.limit:
+                    return None, None
+                wait = self.bucket.try_take(1.0)
+            if wait:
+                return None, wait
+            return queue.popleft(), 0.0
+        return None, None
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._aborted:
+                        return
+                    request, wait = self._next_request()
+                    if request is not None:
+                        break
+                    if self._closed and not any(self._queues.values()) and self._active == 0:
+                        return
+                    self._cond.wait(wait if wait is not None else 0.1 if self._closed else None)
+                request.dispatched = True
+                self._active += 1
+            self._executor.submit(self._execute, request)
+
+    def _execute(self, request: _Request):
+        start = time.monotonic()
+        try:
+            result, error = self.backend(request.payload), None
+        except RateLimitError as e:
+            result, error = None, e
+            with self._cond:
+                self.stats["rate_limited"] += 1
+                self.bucket.drain(self.retry_backoff)
+                self.limit = max(self.min_concurrency, self.limit // 2)
+                if request.attempts < self.max_retries and not self._aborted:
+                    request.attempts += 1
+                    request.dispatched = False
+                    self._queues[request.priority].appendleft(request)
+                    self._active -= 1
+                    self._cond.notify()
+                    return
+        except Exception as e:
+            result, error = None, e
+
+        now = time.monotonic()
+        with self._cond:
+            self._active -= 1
+            self._inflight.pop(request.key, None)
+            if error is None:
+                self.stats["completed"] += 1
+                self._adapt(now - start)
+            else:
+                self.stats["errors"] += 1
+            self._latencies[request.priority].append(now - request.submitted)
+            self._cond.notify()
+
+        if error is None:
+            request.future.set_result(result)
+        else:
+            request.future.set_exception(error)
+
+    def _adapt(self, latency: float):
+        """
+        按观测延迟调整并发（持锁调用）：每完成约 limit 个请求评估一次，
+        平滑延迟超过目标时乘性减小，并发打满且延迟正常时加性增大
+        """
+        self._ewma = latency if self._ewma is None else 0.8 * self._ewma + 0.2 * latency
+        self._min_latency = latency if self._min_latency is None else min(self._min_latency, latency)
+        self._saturated = self._saturated or self._active + 1 >= self.limit
+        self._window += 1
+        if self._window < self.limit:
+            return
+        target = self.target_latency or 2 * self._min_latency
+        if self._ewma > target:
+            self.limit = max(self.min_concurrency, int(self.limit * 0.8))
+        elif self._saturated:
+            self.limit = min(self.max_concurrency, self.limit + 1)
+        self._window = 0
+        self._saturated = False
+
+    def metrics(self) -> Dict:
+        """
+        调度统计
+
+        Returns:
+            Dict: 请求计数、当前并发上限、各优先级端到端延迟分位数（毫秒）和吞吐量
+        """
+        with self._cond:
+            elapsed = time.monotonic() - self._started
+            report = dict(self.stats)
+            report["concurrency_limit"] = self.limit
+            report["queued"] = {p: len(q) for p, q in self._queues.items()}
+            report["throughput_per_second"] = self.stats["completed"] / elapsed if elapsed else 0.0
+            report["latency_ms"] = {}
+            for priority, values in self._latencies.items():
+                values = list(values)
+                report["latency_ms"][priority] = {
+                    "count": len(values),
+                    "p50": _percentile(values, 50) * 1000,
+                    "p99": _percentile(values, 99) * 1000
+                }
+        return report
+
+    def close(self, wait: bool = True):
+        """
+        停止接收请求并关闭
+
+        Args:
+            wait: True 时处理完队列中的请求再返回；False 时不再派发排队的请求，
+                  其 Future 以 RuntimeError 结束，已派发的请求在后台完成
+        """
+        abandoned = []
+        with self._cond:
+            self._closed = True
+            if not wait:
+                self._aborted = True
+                for queue in self._queues.values():
+                    for request in queue:
+                        if not request.dispatched and self._inflight.pop(request.key, None) is request:
+                            abandoned.append(request)
+                    queue.clear()
+            self._cond.notify_all()
+        for request in abandoned:
+            request.future.set_exception(RuntimeError("调度器已关闭，请求未发送"))
+        # 先停止派发线程再关闭线程池，避免派发线程向已关闭的线程池提交任务
+        self._dispatcher.join()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FakeModelBackend:
+    """本地模拟模型后端：并发超过容量时延迟线性上升，超过每秒配额时抛出 RateLimitError"""
+
+    def __init__(self, base_latency: float = 0.02, capacity: int = 8,
+                 quota_per_second: Optional[int] = None, seed: int = 0):
+        """
+        Args:
+            base_latency: 无排队时的单次延迟（秒）
+            capacity: 不增加延迟的最大并发
+            quota_per_second: 每秒配额，None表示不限
+            seed: 延迟抖动随机种子
+        """
+        self.base_latency = base_latency
+        self.capacity = capacity
+        self.quota_per_second = quota_per_second
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self.inflight = 0
+        self.calls = 0
+        self.rejected = 0
+
+    def __call__(self, payload: Dict) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            if self.quota_per_second is not None:
+                while self._recent and now - self._recent[0] > 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.quota_per_second:
+                    self.rejected += 1
+                    raise RateLimitError("模型API配额超限")
+                self._recent.append(now)
+            self.inflight += 1
+            load = max(1.0, self.inflight / self.capacity)
+            latency = self.base_latency * load * (1.0 + 0.2 * self._rng.random())
+        try:
+            time.sleep(latency)
+        finally:
+            with self._lock:
+                self.inflight -= 1
+                self.calls += 1
+        return {"status": "success", "analysis_type": payload.get("analysis_type", ""),
+                "model_latency_ms": latency * 1000}
+
+
+def run_mixed_load(scheduler: ModelRequestScheduler, batch_requests: int, interactive_requests: int,
+                   interactive_interval: float, interactive_priority: str = "interactive") -> Dict:
+    """
+    模拟夜间批量任务进行中到达的交互请求
+
+    Returns:
+        Dict: 交互请求延迟分位数、批量完成耗时和调度统计
+    """
+    start = time.monotonic()
+    batch = [scheduler.submit({"content_hash": f"batch-{i}", "analysis_type": "quality_defect"}, "batch")
+             for i in range(batch_requests)]
+
+    interactive_latencies = []
+    for i in range(interactive_requests):
+        time.sleep(interactive_interval)
+        began = time.monotonic()
+        scheduler.call({"content_hash": f"p1-{i}", "analysis_type": "quality_defect"}, interactive_priority)
+        interactive_latencies.append(time.monotonic() - began)
+
+    for future in batch:
+        future.result()
+    return {
+        "interactive_p50_ms": _percentile(interactive_latencies, 50) * 1000,
+        "interactive_p99_ms": _percentile(interactive_latencies, 99) * 1000,
+        "batch_seconds": time.monotonic() - start,
+        "scheduler": scheduler.metrics()
+    }
+
+
+def main():
+    """命令行入口：对比交互请求与批量请求同队列（FIFO）和分优先级调度的延迟"""
+    parser = argparse.ArgumentParser(description="模型API请求调度器演示")
+    parser.add_argument("--rate", type=float, default=200, help="配额（每秒请求数）")
+    parser.add_argument("--batch", type=int, default=600, help="批量请求数")
+    parser.add_argument("--interactive", type=int, default=40, help="交互请求数")
+    args = parser.parse_args()
+
+    for label, interactive_priority in (("同队列FIFO", "batch"), ("优先级调度", "interactive")):
+        backend = FakeModelBackend(base_latency=0.02, capacity=8, quota_per_second=int(args.rate))
+        # 限速留10%余量：突发量 + 每秒补充量 = 配额
+        with ModelRequestScheduler(backend, args.rate * 0.9, burst=args.rate * 0.1,
+                                   max_concurrency=16) as scheduler:
+            result = run_mixed_load(scheduler, args.batch, args.interactive, 0.05, interactive_priority)
+        stats = result["scheduler"]
+        print(f"{label}: 交互 p50={result['interactive_p50_ms']:.1f}ms p99={result['interactive_p99_ms']:.1f}ms, "
+              f"批量完成 {result['batch_seconds']:.2f}s, 并发上限 {stats['concurrency_limit']}, "
+              f"限流 {stats['rate_limited']}, 后端拒绝 {backend.rejected}")
+
+    # single-flight：同一图片的重复请求只调用一次后端
+    backend = FakeModelBackend()
+    with ModelRequestScheduler(backend, args.rate) as scheduler:
+        futures = [scheduler.submit({"content_hash": "same-image", "analysis_type": "quality_defect"})
+                   for _ in range(20)]
+        for future in futures:
+            future.result()
+    print(f"重复请求: 提交20次，后端调用{backend.calls}次")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,78 @@
 import os
 import json
 import base64
-from typing import Dict, List, Optional, Union
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Union
+
+try:
+    from .tracing import traced, span, record_bytes
+    from .media_access import MappedMedia
+    from .image_preprocessor import ImagePreprocessor
+    from . import serializers
+except ImportError:
+    from tracing import traced, span, record_bytes
+    from media_access import MappedMedia
+    from image_preprocessor import ImagePreprocessor
+    import serializers
 
 class MultimediaProcessor:
     """多媒体内容处理器"""
 
-    def __init__(self):
+    def __init__(self, preprocessor: Optional[ImagePreprocessor] = None,
+                 model_client: Optional[Callable[[Dict], Dict]] = None):
+        """
+        Args:
+            preprocessor: 图片预处理器
+            model_client: 模型客户端（如 ModelRequestScheduler.client()），接收请求参数返回模型结果；
+                          None时使用模拟结果
+        """
         self.supported_image_formats = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
         self.supported_video_formats = ['.mp4', '.avi', '.mov', '.wmv', '.flv']
+        # 按分析类型在提交模型前降采样，缺陷检测保持原始分辨率
+        self.preprocessor = preprocessor or ImagePreprocessor()
+        self.model_client = model_client
+
+    def open_media(self, media_path: str) -> MappedMedia:
+        """
+        以只读内存映射方式打开媒体文件，供哈希、格式识别、编码等阶段共享
+
+        Args:
+            media_path: 图片或视频文件路径
+
+        Returns:
+            MappedMedia: 需要在使用后关闭（支持with语句）
+        """
+        return MappedMedia(media_path)
+
+    def detect_media_format(self, media: MappedMedia) -> Optional[str]:
+        """
+        识别媒体格式：优先使用文件头，无法识别时退回扩展名
+
+        Args:
+            media: 已映射的媒体文件
+
+        Returns:
+            Optional[str]: 格式扩展名，不在支持列表中时返回None
+        """
+        supported = self.supported_image_formats + self.supported_video_formats
+        detected = media.format
+        if detected is not None:
+            return detected if detected in supported else None
+
+        extension = os.path.splitext(media.path)[1].lower()
+        return extension if extension in supported else None
+
+    def is_supported_image(self, media: MappedMedia) -> bool:
+        """判断是否为支持的图片格式"""
+        fmt = self.detect_media_format(media)
+        return fmt is not None and fmt in self.supported_image_formats
+
+    def is_supported_video(self, media: MappedMedia) -> bool:
+        """判断是否为支持的视频格式"""
+        fmt = self.detect_media_format(media)
+        return fmt is not None and fmt in self.supported_video_formats
 
+    @traced("multimedia.process_image")
     def process_image(self, image_path: str, analysis_type: str = "quality_defect") -> Dict:
         """
         处理图片内容，识别质量问题和缺陷
@@ -29,33 +92,63 @@ class MultimediaProcessor:
             Dict: 分析结果，包含问题描述、缺陷类型、严重程度等
         """
         try:
-            # 读取图片文件
-            with open(image_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode()
+            # 映射图片文件，格式识别、哈希和编码共享同一映射
+            with span("multimedia.read_file"):
+                media = self.open_media(image_path)
+
+            with media:
+                if not self.is_supported_image(media):
+                    raise ValueError(f"不支持的图片格式: {image_path}")
+
+                prepared = None
+                if self.preprocessor.get_profile(analysis_type) is not None and self.preprocessor.available:
+                    with span("multimedia.hash"):
+                        content_hash = media.sha256()
+                    with span("multimedia.preprocess"):
+                        prepared = self.preprocessor.prepare(image_path, content_hash, analysis_type)
+                    if prepared is None:
+                        image_data = base64.b64encode(media.view).decode()
+                else:
+                    with span("multimedia.hash_and_encode"):
+                        content_hash, image_data = media.hash_and_encode()
+                record_bytes(len(media))
+
+            preprocessing = {"applied": False, "original_bytes": len(media)}
+            if prepared is not None:
+                with span("multimedia.base64"):
+                    image_data = base64.b64encode(prepared[0]).decode()
+                preprocessing.update(prepared[1], applied=True, payload_bytes=len(prepared[0]))
 
             # 构建AI模型API调用参数
             api_payload = {
                 "image_data": image_data,
+                "content_hash": content_hash,
                 "analysis_type": analysis_type,
                 "domain": "hvac_quality_control",
                 "language": "zh-CN"
             }
 
-            # 这里调用实际的AI模型API
-            # result = call_ai_model_api(api_payload)
-
-            # 模拟API响应结果
-            result = {
-                "status": "success",
-                "analysis_type": analysis_type,
-                "defects_detected": [],
-                "quality_issues": [],
-                "severity": "medium",
-                "description": "",
-                "recommendations": []
-            }
+            with span("multimedia.model_call"):
+                # 这里调用实际的AI模型API
+                # result = call_ai_model_api(api_payload)
+
+                # 模拟API响应结果
+                result = {
+                    "status": "success",
+                    "analysis_type": analysis_type,
+                    "content_hash": content_hash,
+                    "preprocessing": preprocessing,
+                    "defects_detected": [],
+                    "quality_issues": [],
+                    "severity": "medium",
+                    "description": "",
+                    "recommendations": []
+                }
+                if self.model_client is not None:
+                    result.update(self.model_client(api_payload))
+                    return result
 
-            # 根据分析类型进行不同处理
+            # 未配置模型客户端时按分析类型填充模拟结果
             if analysis_type == "quality_defect":
                 result = self._analyze_quality_defects(result)
             elif analysis_type == "operation_flow":
@@ -72,6 +165,7 @@ class MultimediaProcessor:
                 "suggestion": "请检查图片格式和文件路径"
             }
 
+    @traced("multimedia.process_video")
     def process_video(self, video_path: str, analysis_type: str = "operation_sequence") -> Dict:
         """
         处理视频内容，分析操作序列和故障现象
@@ -84,19 +178,44 @@ class MultimediaProcessor:
             Dict: 视频分析结果
         """
         try:
-            # 这里调用视频分析AI模型API
-            # 模拟API响应
-            result = {
-                "status": "success",
+            with span("multimedia.read_file"):
+                media = self.open_media(video_path)
+
+            with media:
+                if not self.is_supported_video(media):
+                    raise ValueError(f"不支持的视频格式: {video_path}")
+
+                with span("multimedia.hash"):
+                    content_hash = media.sha256()
+                    record_bytes(len(media))
+
+            # 构建视频分析模型API调用参数（视频体积大，按路径和内容哈希引用，不内联编码）
+            api_payload = {
+                "video_path": video_path,
+                "content_hash": content_hash,
                 "analysis_type": analysis_type,
-                "duration": 0,
-                "key_frames": [],
-                "issues_detected": [],
-                "operation_flow": [],
-                "fault_phenomena": [],
-                "summary": ""
+                "domain": "hvac_quality_control",
+                "language": "zh-CN"
             }
 
+            with span("multimedia.model_call"):
+                # 模拟API响应结果
+                result = {
+                    "status": "success",
+                    "analysis_type": analysis_type,
+                    "content_hash": content_hash,
+                    "duration": 0,
+                    "key_frames": [],
+                    "issues_detected": [],
+                    "operation_flow": [],
+                    "fault_phenomena": [],
+                    "summary": ""
+                }
+                if self.model_client is not None:
+                    result.update(self.model_client(api_payload))
+                    return result
+
+            # 未配置模型客户端时按分析类型填充模拟结果
             if analysis_type == "operation_sequence":
                 result = self._analyze_operation_sequence(result)
             elif analysis_type == "fault_phenomenon":
@@ -241,20 +360,23 @@ class MultimediaProcessor:
         # 模拟提取结果
         return keyframes
 
-    def generate_report(self, analysis_results: Dict, output_path: str) -> str:
+    def generate_report(self, analysis_results: Dict, output_path: str,
+                        fmt: Optional[str] = None, pretty: bool = False) -> str:
         """
         生成多媒体分析报告
 
         Args:
             analysis_results: 分析结果
-            output_path: 输出文件路径
+            output_path: 输出目录
+            fmt: 序列化格式 (json, msgpack)，默认使用全局配置
+            pretty: 是否美化输出（供人工阅读）
 
         Returns:
             str: 报告文件路径
         """
         report_content = {
             "多媒体分析报告": {
-                "分析时间": "2024-01-21",
+                "分析时间": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 "分析类型": analysis_results.get("analysis_type", ""),
                 "检测到的问题": analysis_results.get("defects_detected", []),
                 "质量评估": analysis_results.get("quality_issues", []),
@@ -262,10 +384,10 @@ class MultimediaProcessor:
             }
         }
 
-        # 保存为JSON格式
-        report_file = os.path.join(output_path, "multimedia_analysis_report.json")
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(report_content, f, ensure_ascii=False, indent=2)
+        # 按所选格式保存
+        fmt = fmt or serializers.get_default_format()
+        report_file = os.path.join(output_path, "multimedia_analysis_report" + serializers.FILE_EXTENSIONS[fmt])
+        serializers.write_file(report_content, report_file, fmt, pretty)
 
         return report_file
 
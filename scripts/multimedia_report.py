@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式多媒体分析报告
+一次调查对应一份报告：每个文件的分析结果完成后立即追加写入，同时维护常量内存的汇总
+（按类型和严重度的缺陷计数、高频建议措施），结束时一次写出汇总，无需保留全部结果或重写文件
+"""
+
+import os
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .multimedia_processor import MultimediaProcessor
+    from . import serializers
+except ImportError:
+    from multimedia_processor import MultimediaProcessor
+    import serializers
+
+UNGRADED = "未分级"
+
+# 严重度排序，用于汇总最高严重度
+SEVERITY_RANK = {UNGRADED: 0, "low": 1, "minor": 1, "medium": 2, "major": 3, "high": 3, "critical": 4}
+
+# 最多保留的失败文件样本数
+MAX_ERROR_SAMPLES = 20
+
+
+def iter_findings(result: Dict) -> Iterator[Tuple[str, str]]:
+    """
+    从单个分析结果中提取发现的问题
+
+    Args:
+        result: process_image / process_video 返回的结果
+
+    Yields:
+        (问题类型, 严重度)
+    """
+    fallback = result.get("severity") or UNGRADED
+    for defect in result.get("defects_detected", []):
+        yield defect.get("type", "未知缺陷"), defect.get("severity") or fallback
+    for issue in result.get("issues_detected", []):
+        yield issue.get("issue", "未知问题"), issue.get("severity") or fallback
+    for point in result.get("abnormal_points", []):
+        yield point.get("event", "异常点"), fallback
+    for phenomenon in result.get("fault_phenomena", []):
+        yield phenomenon.get("description", "故障现象"), fallback
+    for checkpoint in result.get("quality_checkpoints", []):
+        if checkpoint.get("result") == "fail":
+            yield checkpoint.get("issue") or checkpoint.get("step", "检查点不合格"), fallback
+    for issue in result.get("issues", []):
+        yield str(issue), fallback
+
+
+class HeavyHitters:
+    """
+    高频项统计（Space-Saving算法）：最多跟踪 capacity 个不同项，内存不随输入增长，
+    频次足够高的项一定保留，计数最多高估被替换项的计数
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, item: str):
+        if item in self.counts:
+            self.counts[item] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = 1
+        else:
+            evicted = min(self.counts, key=self.counts.get)
+            self.counts[item] = self.counts.pop(evicted) + 1
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+
+
+class StreamingReportWriter:
+    """流式多媒体分析报告写入器（线程安全）"""
+
+    def __init__(self, output_path: str, investigation_id: str = "", top_k: int = 10,
+                 tracked_recommendations: int = 200, tracked_findings: int = 500):
+        """
+        Args:
+            output_path: 输出目录
+            investigation_id: 调查编号，同时用于报告文件名
+            top_k: 汇总中列出的高频建议措施数
+            tracked_recommendations: 高频统计最多跟踪的不同建议数
+            tracked_findings: 高频统计最多跟踪的不同问题类型数（问题描述为模型返回的自由文本）
+        """
+        name = f"multimedia_analysis_report_{investigation_id}" if investigation_id else "multimedia_analysis_report"
+        self.report_file = os.path.join(output_path, name + serializers.FILE_EXTENSIONS["json"])
+        # 写入过程中使用临时文件名，完成后原子改名，中断时不会留下不完整的报告
+        self._partial_file = self.report_file + ".partial"
+        self.investigation_id = investigation_id
+        self.top_k = top_k
+        self.started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        self.files = 0
+        self.status_counts = Counter()
+        self.analysis_types = Counter()
+        self.media_types = Counter()
+        self.defect_types = HeavyHitters(tracked_findings)
+        self.severity_counts = Counter()
+        self.max_severity = UNGRADED
+        self.recommendations = HeavyHitters(tracked_recommendations)
+        self.errors = []
+
+        self._lock = threading.Lock()
+        serializers.ensure_parent_dir(self._partial_file)
+        self._file = open(self._partial_file, "wb")
+        header = serializers.dumps({"调查编号": investigation_id, "开始时间": self.started}, "json")
+        self._file.write('{"多媒体分析报告":'.encode("utf-8") + header[:-1] + ',"文件结果":['.encode("utf-8"))
+
+    def add(self, source: str, result: Dict, media_type: Optional[str] = None):
+        """
+        追加一个文件的分析结果并更新汇总
+
+        Args:
+            source: 媒体文件路径
+            result: 分析结果
+            media_type: image 或 video
+        """
+        entry = dict(result, 文件=source)
+        if media_type:
+            entry["媒体类型"] = media_type
+        record = serializers.dumps(entry, "json")
+
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("报告已完成，不能继续追加")
+            if self.files:
+                self._file.write(b",\n")
+            else:
+                self._file.write(b"\n")
+            self._file.write(record)
+            self._update(source, result, media_type)
+
+    def _update(self, source: str, result: Dict, media_type: Optional[str]):
+        self.files += 1
+        status = result.get("status", "unknown")
+        self.status_counts[status] += 1
+        if status != "success":
+            if len(self.errors) < MAX_ERROR_SAMPLES:
+                self.errors.append({"文件": source, "错误": result.get("error_message", "")})
+            return
+
+        self.analysis_types[result.get("analysis_type", "")] += 1
+        if media_type:
+            self.media_types[media_type] += 1
+        for finding, severity in iter_findings(result):
+            self.defect_types.add(finding)
+            self.severity_counts[severity] += 1
+            if SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(self.max_severity, 0):
+                self.max_severity = severity
+        for recommendation in result.get("recommendations", []):
+            self.recommendations.add(recommendation)
+
+    def summary(self) -> Dict:
+        """
+        当前汇总
+
+        Returns:
+            Dict: 文件数、状态分布、缺陷按类型和严重度计数、最高严重度、高频建议措施
+        """
+        with self._lock:
+            return {
+                "文件数": self.files,
+                "状态": dict(self.status_counts),
+                "分析类型": dict(self.analysis_types),
+                "媒体类型": dict(self.media_types),
+                "检测到的问题": dict(self.defect_types.top(self.defect_types.capacity)),
+                "严重度分布": dict(self.severity_counts),
+                "最高严重度": self.max_severity,
+                "建议措施": [{"建议": text, "次数": count} for text, count in self.recommendations.top(self.top_k)],
+                "失败文件": list(self.errors)
+            }
+
+    def finish(self) -> str:
+        """
+        写出汇总并完成报告
+
+        Returns:
+            str: 报告文件路径
+        """
+        summary = self.summary()
+        tail = serializers.dumps({"汇总": summary,
+                                  "分析时间": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, "json")
+        with self._lock:
+            if self._file is None:
+                return self.report_file
+            self._file.write(b"\n]," + tail[1:] + b"}")
+            self._file.close()
+            self._file = None
+        os.replace(self._partial_file, self.report_file)
+        return self.report_file
+
+    def abort(self):
+        """放弃报告，保留 .partial 文件供排查"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.abort()
+
+
+def analyze_to_report(processor: MultimediaProcessor, paths: Iterable[str], writer: StreamingReportWriter,
+                      image_analysis: str = "quality_defect", video_analysis: str = "operation_sequence",
+                      max_workers: int = 4) -> Dict:
+    """
+    并发分析媒体文件，每个文件完成后立即写入流式报告
+
+    Args:
+        processor: 多媒体处理器
+        paths: 媒体文件路径
+        writer: 流式报告写入器
+        image_analysis: 图片分析类型
+        video_analysis: 视频分析类型
+        max_workers: 并发分析数
+
+    Returns:
+        Dict: 报告汇总
+    """
+    def analyze(path: str):
+        extension = os.path.splitext(path)[1].lower()
+        if extension in processor.supported_video_formats:
+            return "video", processor.process_video(path, video_analysis)
+        return "image", processor.process_image(path, image_analysis)
+
+    def drain(pending: Dict):
+        """写入至少一个已完成的结果并释放其 Future"""
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            media_type, result = future.result()
+            writer.add(pending.pop(future), result, media_type)
+
+    # 在途任务数有上限，结果写入后立即丢弃，内存与文件总数无关
+    window = max_workers * 2
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for path in paths:
+            if len(pending) >= window:
+                drain(pending)
+            pending[executor.submit(analyze, path)] = path
+        while pending:
+            drain(pending)
+    return writer.summary()
+
+
+def create_demo_files(directory: str) -> List[str]:
+    """生成演示用的图片、视频和一个不支持的文件"""
+    for i in range(300):
+        with open(os.path.join(directory, f"img_{i:03d}.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + os.urandom(256))
+    for i in range(20):
+        with open(os.path.join(directory, f"clip_{i:02d}.mp4"), "wb") as f:
+            f.write(b"\x00\x00\x00\x18ftypmp42" + os.urandom(256))
+    with open(os.path.join(directory, "notes.gif"), "wb") as f:
+        f.write(b"not an image")
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+
+def main():
+    """命令行入口：分析媒体文件并生成一份流式报告"""
+    parser = argparse.ArgumentParser(description="流式多媒体分析报告")
+    parser.add_argument("paths", nargs="*", help="图片或视频文件，缺省时生成演示文件")
+    parser.add_argument("--output", default=".", help="输出目录")
+    parser.add_argument("--investigation", default="DEMO-001", help="调查编号")
+    parser.add_argument("--workers", type=int, default=4, help="并发分析数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="multimedia_demo_") as demo_dir:
+        paths = args.paths or create_demo_files(demo_dir)
+        processor = MultimediaProcessor()
+        with StreamingReportWriter(args.output, args.investigation) as writer:
+            summary = analyze_to_report(processor, paths, writer, max_workers=args.workers)
+
+    print(f"报告已生成: {writer.report_file}")
+    print(f"文件数: {summary['文件数']}, 状态: {summary['状态']}, 最高严重度: {summary['最高严重度']}")
+    print("严重度分布:", summary["严重度分布"])
+    for item in summary["建议措施"][:3]:
+        print(f"  {item['建议']} ×{item['次数']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应问题调度器
+根据已有回答的内容为剩余问题打分（信息增益），跳过答案已隐含的冗余问题，
+并通过优先队列以 O(log n) 选出下一个最有价值的问题
+"""
+
+import re
+import heapq
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+# 回答内容信号
+SIGNAL_PATTERNS = {
+    "description": re.compile(r"表现|现象|异响|停止|停机|不制冷|制冷效果|漏水|噪音|故障|异常"),
+    "time": re.compile(r"\d{4}[年\-/]|\d{1,2}月|\d{1,2}[日号]|昨天|今天|上周|本周|上个?月|凌晨|早上|晚上|\d{1,2}:\d{2}|批次"),
+    "location": re.compile(r"工厂|产线|生产线|车间|工位|现场|仓库|门店|地区|北美|安装|部位|环节"),
+    "person": re.compile(r"供应商|操作员|操作工|工程师|技术员|班组|人员|安装工|检验员"),
+    "impact": re.compile(r"\d+(\.\d+)?\s*(%|％|台|件|起|万元|元|美元|小时|天)|投诉|召回|停线|影响"),
+    "cause": re.compile(r"原因|导致|因为|由于|造成|引起"),
+    # 不含单独的"系统"：产品部件（控制系统、制冷系统）同样使用该词，不能说明已分析管理体系
+    "system": re.compile(r"体系|管理系统|监控系统|控制措施|监控|漏检|未覆盖"),
+    "process": re.compile(r"流程|标准|作业|程序|工艺|规范|SOP"),
+    "prevention": re.compile(r"预防|防止|避免|培训|检查点|防错|控制计划")
+}
+
+# 按 answer_type 确定问题的主信号（全部被覆盖时问题视为冗余）
+ANSWER_TYPE_SIGNALS = {
+    "详细描述": ("description",),
+    "时间描述": ("time",),
+    "位置描述": ("location",),
+    "人员列表": ("person",),
+    "影响评估": ("impact",),
+    "原因分析": ("cause",),
+    "系统分析": ("system",),
+    "流程分析": ("process",),
+    "措施建议": ("prevention",)
+}
+
+PRIMARY_WEIGHT = 1.0
+SECONDARY_WEIGHT = 0.3
+ORDER_BIAS = 1e-3
+
+
+# 所有信号合并为一个正则，单次扫描文本
+_COMBINED_PATTERN = re.compile("|".join(
+    f"(?P<{name}>{pattern.pattern})" for name, pattern in SIGNAL_PATTERNS.items()
+))
+
+
+def extract_signals(text: str) -> Set[str]:
+    """提取文本中出现的信号"""
+    return {match.lastgroup for match in _COMBINED_PATTERN.finditer(text)}
+
+
+def _question_signals(answer_type: str, metadata: Tuple[str, ...]) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """问题的主信号和次信号"""
+    primary = frozenset(ANSWER_TYPE_SIGNALS.get(answer_type, ()))
+    secondary = frozenset(extract_signals(" ".join(metadata))) - primary
+    return primary, secondary
+
+
+@lru_cache(maxsize=64)
+def _build_plan(fingerprint: Tuple) -> Dict:
+    """
+    由模板指纹构建只读调度计划（各会话共享，避免重复解析模板元数据）
+
+    Args:
+        fingerprint: ((phase, ((id, answer_type, metadata), ...)), ...)
+    """
+    plan = {"phase_of": {}, "order": {}, "primary": {}, "secondary": {},
+            "signal_index": {}, "heaps": {}}
+    for phase, questions in fingerprint:
+        heap = plan["heaps"][phase] = []
+        for order, (question_id, answer_type, metadata) in enumerate(questions):
+            primary, secondary = _question_signals(answer_type, metadata)
+            plan["phase_of"][question_id] = phase
+            plan["order"][question_id] = order
+            plan["primary"][question_id] = primary
+            plan["secondary"][question_id] = secondary
+            for signal in primary | secondary:
+                plan["signal_index"].setdefault(signal, []).append(question_id)
+            score = PRIMARY_WEIGHT * len(primary) + SECONDARY_WEIGHT * len(secondary) - ORDER_BIAS * order
+            heap.append((-score, order, 0, question_id))
+        heapq.heapify(heap)
+    return plan
+
+
+class AdaptiveQuestionScheduler:
+    """基于回答内容的自适应问题调度器"""
+
+    def __init__(self, skip_redundant: bool = True, min_evidence: int = 2):
+        """
+        Args:
+            skip_redundant: 是否跳过主信号已全部被覆盖的问题
+            min_evidence: 信号被视为覆盖所需的回答次数（默认2：单条回答中偶然出现的关键词不足以跳过问题）
+        """
+        self.skip_redundant = skip_redundant
+        self.min_evidence = min_evidence
+        self.reset({})
+
+    def reset(self, question_templates: Dict):
+        """
+        根据问题模板重建调度状态
+
+        Args:
+            question_templates: FiveWInterviewer.question_templates
+        """
+        self.questions = {}
+        fingerprint = []
+        for phase, phase_data in question_templates.items():
+            entries = []
+            for question in phase_data["questions"]:
+                self.questions[question["id"]] = question
+                entries.append((
+                    question["id"],
+                    question.get("answer_type", ""),
+                    tuple(question.get("follow_up", ())) + tuple(question.get("validation", ()))
+                ))
+            fingerprint.append((phase, tuple(entries)))
+
+        plan = _build_plan(tuple(fingerprint))
+        self.phase_of = plan["phase_of"]
+        self.order = plan["order"]
+        self.primary = plan["primary"]
+        self.secondary = plan["secondary"]
+        self.signal_index = plan["signal_index"]
+
+        # 会话内可变状态
+        self.signal_counts = {}
+        self.handled = set()
+        self.skipped = {}
+        self._version = dict.fromkeys(self.order, 0)
+        self._heaps = {phase: list(heap) for phase, heap in plan["heaps"].items()}
+
+    def _covered(self, signal: str) -> bool:
+        return self.signal_counts.get(signal, 0) >= self.min_evidence
+
+    def _score(self, question_id: str) -> float:
+        """信息增益：尚未覆盖的信号权重之和，附加少量顺序偏置保持模板顺序"""
+        gain = sum(PRIMARY_WEIGHT for s in self.primary[question_id] if not self._covered(s))
+        gain += sum(SECONDARY_WEIGHT for s in self.secondary[question_id] if not self._covered(s))
+        return gain - ORDER_BIAS * self.order[question_id]
+
+    def _is_redundant(self, question_id: str) -> bool:
+        primary = self.primary[question_id]
+        return bool(primary) and all(self._covered(s) for s in primary)
+
+    def observe(self, question_id: Optional[str], text: str) -> List[str]:
+        """
+        记录一条回答并更新受影响问题的优先级
+
+        Args:
+            question_id: 已回答的问题ID（初始问题描述可传None）
+            text: 回答全文（含详情）
+
+        Returns:
+            List[str]: 因此被判定为冗余而跳过的问题ID
+        """
+        if question_id is not None:
+            self.handled.add(question_id)
+
+        newly_covered = []
+        for signal in extract_signals(text):
+            before = self._covered(signal)
+            self.signal_counts[signal] = self.signal_counts.get(signal, 0) + 1
+            if not before and self._covered(signal):
+                newly_covered.append(signal)
+
+        # 仅重新评分包含新覆盖信号的问题
+        skipped = []
+        for signal in newly_covered:
+            for affected in self.signal_index.get(signal, ()):
+                if affected in self.handled:
+                    continue
+                if self.skip_redundant and self._is_redundant(affected):
+                    self.handled.add(affected)
+                    self.skipped[affected] = sorted(self.primary[affected])
+                    skipped.append(affected)
+                    continue
+                self._version[affected] += 1
+                heapq.heappush(self._heaps[self.phase_of[affected]],
+                               (-self._score(affected), self.order[affected],
+                                self._version[affected], affected))
+        return skipped
+
+    def mark_handled(self, question_id: str):
+        """标记问题已处理（不提供回答内容）"""
+        self.handled.add(question_id)
+
+    def next_question(self, phase: str) -> Optional[Dict]:
+        """
+        取出阶段内信息增益最高的问题（不出队，回答后才标记已处理）
+
+        Args:
+            phase: 阶段名称
+
+        Returns:
+            Optional[Dict]: 问题模板，阶段内无剩余问题时返回None
+        """
+        heap = self._heaps.get(phase)
+        if not heap:
+            return None
+        while heap:
+            _, _, version, question_id = heap[0]
+            if question_id in self.handled or version != self._version[question_id]:
+                heapq.heappop(heap)
+                continue
+            return self.questions[question_id]
+        return None
+
+
+def main():
+    """主函数，用于测试"""
+    try:
+        from .five_w_interviewer import FiveWInterviewer
+    except ImportError:
+        from five_w_interviewer import FiveWInterviewer
+
+    for adaptive in (False, True):
+        interviewer = FiveWInterviewer(adaptive=adaptive)
+        result = interviewer.start_interview("空调制冷效果不佳，压缩机启动后立即停止")
+        question = result["next_question"]
+        asked = []
+        answers = [
+            "2024年1月批次在北美安装现场出现，供应商A的启动电容导致压缩机停机",
+            "已有300台受影响，客户投诉12起",
+            "来料检验流程未覆盖电容参数，监控系统失效",
+            "增加来料全检，更新控制计划并培训检验员"
+        ]
+        while question is not None:
+            asked.append(question.question_id)
+            answer = answers[min(len(asked) - 1, len(answers) - 1)]
+            result = interviewer.process_response(question.question_id, answer)
+            question = result.get("next_question")
+        print(f"adaptive={adaptive}: 提问{len(asked)}个 {asked}")
+        if adaptive:
+            print("  跳过:", interviewer.questions_skipped)
+
+
+if __name__ == "__main__":
+    main()
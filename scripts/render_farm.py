@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+8D报告多格式并行渲染
+将完成的报告按需渲染为 JSON、DOCX、Markdown 和可打印HTML，渲染任务在进程池中并行执行；
+相同内容的渲染请求按内容哈希去重，渲染产物缓存复用，并统计吞吐量
+"""
+
+import os
+import html
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .eight_d_report_generator import EightDReportGenerator
+    from .tracing import MetricsRegistry
+    from . import serializers
+except ImportError:
+    from eight_d_report_generator import EightDReportGenerator
+    from tracing import MetricsRegistry
+    import serializers
+
+RENDER_FORMATS = ("json", "docx", "markdown", "html")
+
+ARTIFACT_EXTENSIONS = {
+    "json": ".json",
+    "docx": ".docx",
+    "markdown": ".md",
+    "html": ".html"
+}
+
+# 可打印HTML样式（A4页面，每个阶段避免跨页断开）
+HTML_STYLE = """
+@page { size: A4; margin: 18mm; }
+body { font-family: "Microsoft YaHei", "PingFang SC", sans-serif; font-size: 11pt; color: #222; }
+h1 { border-bottom: 2px solid #333; padding-bottom: 4px; }
+section { page-break-inside: avoid; margin-bottom: 14px; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border: 1px solid #999; padding: 4px 8px; text-align: left; vertical-align: top; }
+th { width: 28%; background: #f2f2f2; }
+"""
+
+
+def content_hash(report_data: Dict) -> str:
+    """
+    计算报告内容哈希（忽略生成时间，内容相同的报告重复导出时命中缓存）
+
+    Args:
+        report_data: 报告数据
+
+    Returns:
+        str: SHA-256十六进制摘要
+    """
+    stable = dict(report_data)
+    info = stable.get("报告信息")
+    if isinstance(info, dict) and "生成时间" in info:
+        stable["报告信息"] = {k: v for k, v in info.items() if k != "生成时间"}
+    canonical = json.dumps(stable, ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+                           default=serializers._default)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _phase_titles() -> Dict[str, str]:
+    return {phase: template["title"] for phase, template in EightDReportGenerator().report_template.items()}
+
+
+def _format_value(value) -> str:
+    """将字段值格式化为单行文本"""
+    if isinstance(value, dict):
+        return "；".join(f"{k}: {_format_value(v)}" for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return "、".join(_format_value(v) for v in value)
+    return str(value)
+
+
+def render_markdown(report_data: Dict) -> str:
+    """渲染为Markdown"""
+    titles = _phase_titles()
+    lines = ["# 8D问题解决报告", ""]
+    for key, value in report_data.get("报告信息", {}).items():
+        lines.append(f"- **{key}**: {value}")
+    for phase, data in report_data.get("8D分析", {}).items():
+        lines.extend(["", f"## {titles.get(phase, phase)}", ""])
+        for field, value in data.items():
+            if isinstance(value, (list, tuple)) and value:
+                lines.append(f"- **{field}**:")
+                lines.extend(f"  - {_format_value(item)}" for item in value)
+            else:
+                lines.append(f"- **{field}**: {_format_value(value)}")
+    status = report_data.get("完成状态")
+    if status:
+        lines.extend(["", "## 完成状态", "", "| 阶段 | 状态 |", "| --- | --- |"])
+        lines.extend(f"| {k} | {v} |" for k, v in status.items())
+    return "\n".join(lines) + "\n"
+
+
+def render_html(report_data: Dict) -> str:
+    """渲染为可打印（可直接转PDF）的HTML"""
+    titles = _phase_titles()
+    escape = html.escape
+    parts = ["<!DOCTYPE html>", '<html lang="zh-CN"><head><meta charset="utf-8">',
+             "<title>8D问题解决报告</title>", f"<style>{HTML_STYLE}</style></head><body>",
+             "<h1>8D问题解决报告</h1>", "<table>"]
+    for key, value in report_data.get("报告信息", {}).items():
+        parts.append(f"<tr><th>{escape(str(key))}</th><td>{escape(str(value))}</td></tr>")
+    parts.append("</table>")
+    for phase, data in report_data.get("8D分析", {}).items():
+        parts.append(f"<section><h2>{escape(titles.get(phase, phase))}</h2><table>")
+        for field, value in data.items():
+            if isinstance(value, (list, tuple)) and value:
+                cell = "<ul>" + "".join(f"<li>{escape(_format_value(v))}</li>" for v in value) + "</ul>"
+            else:
+                cell = escape(_format_value(value))
+            parts.append(f"<tr><th>{escape(field)}</th><td>{cell}</td></tr>")
+        parts.append("</table></section>")
+    status = report_data.get("完成状态")
+    if status:
+        parts.append("<section><h2>完成状态</h2><table>")
+        parts.extend(f"<tr><th>{escape(k)}</th><td>{escape(str(v))}</td></tr>" for k, v in status.items())
+        parts.append("</table></section>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def render_artifact(fmt: str, report_data: Dict, output_path: str) -> int:
+    """
+    渲染单个格式的产物（先写临时文件再原子替换，避免并发读到半成品）
+
+    Args:
+        fmt: 渲染格式
+        report_data: 报告数据
+        output_path: 输出文件路径
+
+    Returns:
+        int: 产物字节数
+    """
+    serializers.ensure_parent_dir(output_path)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    if fmt == "json":
+        serializers.write_file(report_data, tmp_path, "json", pretty=True)
+    elif fmt == "docx":
+        try:
+            import docx  # noqa: F401
+        except ImportError:
+            raise ImportError("需要安装python-docx库来生成Word文档")
+        EightDReportGenerator.from_report_data(report_data).export_to_word(tmp_path)
+    elif fmt == "markdown":
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(render_markdown(report_data))
+    elif fmt == "html":
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(render_html(report_data))
+    else:
+        raise ValueError(f"不支持的渲染格式: {fmt}")
+    os.replace(tmp_path, output_path)
+    return os.path.getsize(output_path)
+
+
+def _render_task(args) -> Tuple[int, float]:
+    """进程池任务：渲染到缓存路径，返回字节数和耗时"""
+    fmt, report_data, cache_path = args
+    start = time.perf_counter()
+    size = render_artifact(fmt, report_data, cache_path)
+    return size, time.perf_counter() - start
+
+
+def _publish(cache_path: str, output_path: str):
+    """将缓存产物复制到输出路径（不共享inode，修改输出文件不会污染缓存）"""
+    serializers.ensure_parent_dir(output_path)
+    partial = output_path + ".partial"
+    shutil.copyfile(cache_path, partial)
+    os.replace(partial, output_path)
+
+
+class RenderFarm:
+    """多格式渲染任务队列"""
+
+    def __init__(self, output_dir: str, cache_dir: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        """
+        Args:
+            output_dir: 产物输出目录
+            cache_dir: 产物缓存目录，默认 output_dir/.render_cache
+            max_workers: 进程数，默认CPU核数
+        """
+        self.output_dir = output_dir
+        self.cache_dir = cache_dir or os.path.join(output_dir, ".render_cache")
+        self.max_workers = max_workers
+        self.registry = MetricsRegistry()
+        self._executor = None
+        self._inflight = {}
+        self._pending = []
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        """重置吞吐量统计"""
+        self.registry.reset()
+        self.metrics = {"requested": 0, "rendered": 0, "deduplicated": 0, "cache_hits": 0,
+                        "errors": 0, "bytes": 0, "elapsed_seconds": 0.0}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _cache_path(self, digest: str, fmt: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], digest + ARTIFACT_EXTENSIONS[fmt])
+
+    def submit(self, report_id: str, report_data: Dict,
+               formats: Iterable[str] = RENDER_FORMATS) -> List[str]:
+        """
+        提交报告的渲染请求（立即返回，调用 wait() 获取结果）
+
+        Args:
+            report_id: 报告ID，用作输出文件名
+            report_data: 报告数据（generate_report / to_report_data 输出）
+            formats: 需要的格式
+
+        Returns:
+            List[str]: 各格式的输出路径
+        """
+        digest = content_hash(report_data)
+        outputs = []
+        for fmt in formats:
+            if fmt not in ARTIFACT_EXTENSIONS:
+                raise ValueError(f"不支持的渲染格式: {fmt}")
+            key = (digest, fmt)
+            cache_path = self._cache_path(digest, fmt)
+            output_path = os.path.join(self.output_dir, report_id + ARTIFACT_EXTENSIONS[fmt])
+            self.metrics["requested"] += 1
+
+            if key in self._inflight:
+                source = "deduplicated"
+            elif os.path.exists(cache_path):
+                source = "cached"
+                self._inflight[key] = None
+            else:
+                source = "rendered"
+                self._inflight[key] = self._pool().submit(_render_task, (fmt, report_data, cache_path))
+            self._pending.append((report_id, fmt, key, source, cache_path, output_path))
+            outputs.append(output_path)
+        return outputs
+
+    def submit_generator(self, report_id: str, generator: EightDReportGenerator,
+                         formats: Iterable[str] = RENDER_FORMATS) -> List[str]:
+        """提交 EightDReportGenerator 当前报告的渲染请求"""
+        return self.submit(report_id, generator.to_report_data(), formats)
+
+    def wait(self) -> List[Dict]:
+        """
+        等待所有已提交的请求完成并发布产物
+
+        Returns:
+            List[Dict]: 每个请求的结果（report_id, format, output, source, error）
+        """
+        start = time.perf_counter()
+        errors = {}
+        results = []
+        for report_id, fmt, key, source, cache_path, output_path in self._pending:
+            future = self._inflight.get(key)
+            result = {"report_id": report_id, "format": fmt, "output": output_path, "source": source}
+            if future is not None and key not in errors:
+                try:
+                    size, seconds = future.result()
+                    if source == "rendered":
+                        self.registry.record(f"render.{fmt}", seconds, size)
+                        self.metrics["rendered"] += 1
+                        self.metrics["bytes"] += size
+                except Exception as e:
+                    errors[key] = str(e)
+
+            if key in errors:
+                result["source"] = "error"
+                result["error"] = errors[key]
+                self.metrics["errors"] += 1
+            else:
+                if source == "deduplicated":
+                    self.metrics["deduplicated"] += 1
+                elif source == "cached":
+                    self.metrics["cache_hits"] += 1
+                _publish(cache_path, output_path)
+            results.append(result)
+
+        self.metrics["elapsed_seconds"] += time.perf_counter() - start
+        self._pending = []
+        self._inflight = {}
+        return results
+
+    def render(self, reports: Iterable[Tuple[str, Dict]],
+               formats: Iterable[str] = RENDER_FORMATS) -> List[Dict]:
+        """批量提交并等待完成"""
+        formats = tuple(formats)
+        start = time.perf_counter()
+        for report_id, report_data in reports:
+            self.submit(report_id, report_data, formats)
+        self.metrics["elapsed_seconds"] += time.perf_counter() - start
+        return self.wait()
+
+    def throughput(self) -> Dict:
+        """
+        吞吐量统计
+
+        Returns:
+            Dict: 请求数、渲染/去重/缓存命中数、每秒产物数、每种格式的平均渲染耗时
+        """
+        elapsed = self.metrics["elapsed_seconds"]
+        delivered = self.metrics["requested"] - self.metrics["errors"]
+        stats = dict(self.metrics)
+        stats["artifacts_per_second"] = delivered / elapsed if elapsed else 0.0
+        stats["render_ms"] = {
+            name.split(".", 1)[1]: hist.total / hist.count * 1000
+            for name, hist in self.registry.histograms.items() if hist.count
+        }
+        return stats
+
+    def close(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _sample_report(index: int) -> Dict:
+    generator = EightDReportGenerator()
+    generator.collect_information("D0", {
+        "problem_description": f"空调制冷效果不佳（批次{index}）",
+        "discovery_date": "2024-01-20",
+        "discovery_person": "张三",
+        "affected_products": [f"AC-2024-{index:03d}"],
+        "initial_severity": "中等",
+        "initial_response": "暂停相关产品出货"
+    })
+    return generator.to_report_data()
+
+
+def main():
+    """命令行入口：批量渲染报告文件，未提供文件时渲染示例报告"""
+    parser = argparse.ArgumentParser(description="8D报告多格式并行渲染")
+    parser.add_argument("reports", nargs="*", help="generate_report 输出的报告文件")
+    parser.add_argument("-o", "--output-dir", default="rendered_reports", help="产物输出目录")
+    parser.add_argument("--formats", default=",".join(RENDER_FORMATS), help="逗号分隔的格式列表")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认CPU核数")
+    args = parser.parse_args()
+
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    if args.reports:
+        reports = [(os.path.splitext(os.path.basename(path))[0], serializers.read_file(path))
+                   for path in args.reports]
+    else:
+        # 示例：200份报告，其中一半内容重复
+        reports = [(f"8D-{i:04d}", _sample_report(i % 100)) for i in range(200)]
+
+    with RenderFarm(args.output_dir, max_workers=args.workers) as farm:
+        results = farm.render(reports, formats)
+        for result in results:
+            if result["source"] == "error":
+                print(f"渲染失败 {result['report_id']} {result['format']}: {result['error']}")
+                break
+        print(json.dumps(farm.throughput(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
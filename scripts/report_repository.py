@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+8D报告与访谈记录存储库
+基于SQLite（WAL模式 + FTS5全文索引）按租户存储 EightDReportGenerator 报告和
+FiveWInterviewer 访谈记录，在状态、严重程度、产品、日期和团队上建立二级索引，
+支持批量写入、多进程并发写入和基于游标的分页流式查询
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .eight_d_report_generator import PHASE_ORDER
+    from . import serializers
+except ImportError:
+    from eight_d_report_generator import PHASE_ORDER
+    import serializers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    report_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    current_phase TEXT,
+    severity TEXT,
+    discovery_date TEXT,
+    team_leader TEXT,
+    updated_at INTEGER NOT NULL,
+    fmt TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    UNIQUE (tenant, report_id)
+);
+CREATE INDEX IF NOT EXISTS idx_reports_status ON reports (tenant, status, severity);
+CREATE INDEX IF NOT EXISTS idx_reports_severity ON reports (tenant, severity);
+CREATE INDEX IF NOT EXISTS idx_reports_date ON reports (tenant, discovery_date);
+CREATE INDEX IF NOT EXISTS idx_reports_team ON reports (tenant, team_leader);
+CREATE INDEX IF NOT EXISTS idx_reports_updated ON reports (tenant, updated_at);
+
+CREATE TABLE IF NOT EXISTS report_products (
+    tenant TEXT NOT NULL,
+    product TEXT NOT NULL,
+    report_pk INTEGER NOT NULL,
+    PRIMARY KEY (tenant, product, report_pk)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_products_report ON report_products (report_pk);
+
+CREATE TABLE IF NOT EXISTS report_team (
+    tenant TEXT NOT NULL,
+    member TEXT NOT NULL,
+    report_pk INTEGER NOT NULL,
+    PRIMARY KEY (tenant, member, report_pk)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_team_report ON report_team (report_pk);
+
+CREATE TABLE IF NOT EXISTS interviews (
+    id INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    problem TEXT,
+    current_phase TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    response_count INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    fmt TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    UNIQUE (tenant, session_id)
+);
+CREATE INDEX IF NOT EXISTS idx_interviews_started ON interviews (tenant, started_at);
+CREATE INDEX IF NOT EXISTS idx_interviews_phase ON interviews (tenant, current_phase);
+"""
+
+# 中文没有空格分词，优先使用 trigram 分词器支持任意子串检索（SQLite 3.34+）
+FTS_TOKENIZERS = ("trigram", "unicode61")
+
+PAGE_SIZE = 500
+WRITE_BATCH_SIZE = 1000
+# 单次批量写入超过该数量后刷新统计信息，保证查询规划器选择选择性最高的索引
+ANALYZE_THRESHOLD = 10000
+
+REPORT_COLUMNS = ("report_id", "status", "current_phase", "severity",
+                  "discovery_date", "team_leader", "updated_at")
+INTERVIEW_COLUMNS = ("session_id", "problem", "current_phase", "started_at",
+                     "finished_at", "response_count", "updated_at")
+
+
+def _collect_text(value, parts: List[str]):
+    """递归收集报告中的文本用于全文索引"""
+    if isinstance(value, str):
+        if value:
+            parts.append(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_text(item, parts)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_text(item, parts)
+
+
+def extract_report_fields(report_data: Dict) -> Dict:
+    """
+    从报告数据中提取索引字段
+
+    Args:
+        report_data: generate_report / to_report_data 输出的报告数据
+
+    Returns:
+        Dict: 索引字段、产品列表、团队成员和全文内容
+    """
+    phases = report_data.get("8D分析", {})
+    d0 = phases.get("D0", {})
+    d1 = phases.get("D1", {})
+    current_phase = next((phase for phase in PHASE_ORDER if phase not in phases), None)
+
+    team = list(d1.get("team_members", []))
+    if d1.get("team_leader"):
+        team.append(d1["team_leader"])
+
+    parts = []
+    _collect_text(phases, parts)
+    return {
+        "status": "已完成" if current_phase is None else "进行中",
+        "current_phase": current_phase,
+        "severity": d0.get("initial_severity"),
+        "discovery_date": d0.get("discovery_date"),
+        "team_leader": d1.get("team_leader"),
+        "products": sorted(set(d0.get("affected_products", []))),
+        "team": sorted(set(team)),
+        "content": "\n".join(parts)
+    }
+
+
+def extract_interview_fields(export_data: Dict) -> Dict:
+    """
+    从访谈记录中提取索引字段
+
+    Args:
+        export_data: export_conversation / to_export_data 输出的对话记录
+
+    Returns:
+        Dict: 索引字段和全文内容
+    """
+    record = export_data.get("访谈记录", {})
+    history = record.get("对话历史", [])
+    problem = ""
+    parts = []
+    for entry in history:
+        answer = entry.get("回答", {})
+        if entry.get("问题ID") == "initial_problem":
+            problem = answer.get("answer_text", "")
+        _collect_text([answer.get("answer_text", ""), answer.get("answer_details", [])], parts)
+    return {
+        "problem": problem,
+        "current_phase": record.get("当前阶段"),
+        "started_at": record.get("开始时间"),
+        "finished_at": record.get("完成时间"),
+        "response_count": len(history),
+        "content": "\n".join(parts)
+    }
+
+
+def _prefix_range(pattern: str) -> Tuple[str, str]:
+    """将 "AC-2024-*" 形式的前缀模式转换为可走索引的范围查询"""
+    prefix = pattern[:-1]
+    return prefix, prefix + "\U0010ffff"
+
+
+class ReportRepository:
+    """多租户8D报告与访谈存储库"""
+
+    def __init__(self, path: str, tenant: str = "default", fmt: Optional[str] = None,
+                 timeout: float = 30.0):
+        """
+        Args:
+            path: SQLite数据库文件路径，":memory:" 时使用随实例删除的临时数据库文件
+            tenant: 租户名称，所有读写都限定在该租户内
+            fmt: 报告正文的序列化格式，默认使用全局配置
+            timeout: 并发写入时等待锁的秒数
+        """
+        self.path = path
+        self.tenant = tenant
+        self.fmt = fmt or serializers.get_default_format()
+        self.timeout = timeout
+        self._local = threading.local()
+        self.fts_tokenizer = None
+        self._temp_dir = None
+        if path == ":memory:":
+            # 每个线程独立连接时 ":memory:" 各自得到空库，共享缓存内存库的表锁又不受 timeout 约束，
+            # 因此改用临时文件，与文件数据库一样使用WAL和锁等待；实例回收时临时目录自动删除
+            self._temp_dir = tempfile.TemporaryDirectory(prefix="report_repository_")
+            self._database = os.path.join(self._temp_dir.name, "repository.db")
+        else:
+            self._database = path
+            serializers.ensure_parent_dir(path)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接（sqlite3连接不能跨线程共享）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._database, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-65536")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        for table in ("reports_fts", "interviews_fts"):
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+            if row is not None:
+                self.fts_tokenizer = "trigram" if "trigram" in row[0] else "unicode61"
+                continue
+            for tokenizer in FTS_TOKENIZERS:
+                try:
+                    conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} "
+                                 f"USING fts5(content, tokenize='{tokenizer}')")
+                    self.fts_tokenizer = tokenizer
+                    break
+                except sqlite3.OperationalError:
+                    continue
+            else:
+                raise RuntimeError("当前SQLite不支持FTS5全文索引")
+
+    def optimize(self):
+        """刷新索引统计信息"""
+        conn = self._connect()
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.execute("PRAGMA optimize")
+            conn.close()
+            self._local.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, rows: Iterable, write_one) -> int:
+        """分批在 BEGIN IMMEDIATE 事务中写入，减少锁持有时间并允许其他写入者交替进行"""
+        conn = self._connect()
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= WRITE_BATCH_SIZE:
+                count += self._write_batch(conn, batch, write_one)
+                batch = []
+        if batch:
+            count += self._write_batch(conn, batch, write_one)
+        if count >= ANALYZE_THRESHOLD:
+            self.optimize()
+        return count
+
+    def _write_batch(self, conn, batch: List, write_one) -> int:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = int(time.time())
+            for row in batch:
+                write_one(conn, row, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(batch)
+
+    # ---- 报告 ----
+
+    def _write_report(self, conn, row: Tuple[str, Dict], now: int):
+        report_id, report_data = row
+        fields = extract_report_fields(report_data)
+        payload = serializers.dumps(report_data, self.fmt)
+        conn.execute(
+            "INSERT INTO reports (tenant, report_id, status, current_phase, severity, discovery_date,"
+            " team_leader, updated_at, fmt, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (tenant, report_id) DO UPDATE SET status = excluded.status,"
+            " current_phase = excluded.current_phase, severity = excluded.severity,"
+            " discovery_date = excluded.discovery_date, team_leader = excluded.team_leader,"
+            " updated_at = excluded.updated_at, fmt = excluded.fmt, payload = excluded.payload",
+            (self.tenant, report_id, fields["status"], fields["current_phase"], fields["severity"],
+             fields["discovery_date"], fields["team_leader"], now, self.fmt, payload))
+        pk = conn.execute("SELECT id FROM reports WHERE tenant = ? AND report_id = ?",
+                          (self.tenant, report_id)).fetchone()[0]
+
+        conn.execute("DELETE FROM report_products WHERE report_pk = ?", (pk,))
+        conn.executemany("INSERT INTO report_products (tenant, product, report_pk) VALUES (?, ?, ?)",
+                         [(self.tenant, product, pk) for product in fields["products"]])
+        conn.execute("DELETE FROM report_team WHERE report_pk = ?", (pk,))
+        conn.executemany("INSERT INTO report_team (tenant, member, report_pk) VALUES (?, ?, ?)",
+                         [(self.tenant, member, pk) for member in fields["team"]])
+        conn.execute("DELETE FROM reports_fts WHERE rowid = ?", (pk,))
+        conn.execute("INSERT INTO reports_fts (rowid, content) VALUES (?, ?)", (pk, fields["content"]))
+
+    def upsert_reports(self, reports: Iterable[Tuple[str, Dict]]) -> int:
+        """
+        批量写入或更新报告
+
+        Args:
+            reports: (报告ID, 报告数据) 序列，可以是生成器
+
+        Returns:
+            int: 写入的报告数
+        """
+        return self._write(reports, self._write_report)
+
+    def save_report(self, report_id: str, generator) -> int:
+        """保存 EightDReportGenerator 的当前报告"""
+        return self.upsert_reports([(report_id, generator.to_report_data())])
+
+    def get_report(self, report_id: str) -> Optional[Dict]:
+        """按ID读取报告数据"""
+        row = self._connect().execute(
+            "SELECT fmt, payload FROM reports WHERE tenant = ? AND report_id = ?",
+            (self.tenant, report_id)).fetchone()
+        return serializers.loads(row[1], row[0]) if row else None
+
+    def delete_report(self, report_id: str) -> bool:
+        """删除报告及其索引"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT id FROM reports WHERE tenant = ? AND report_id = ?",
+                               (self.tenant, report_id)).fetchone()
+            if row is not None:
+                for table in ("report_products", "report_team"):
+                    conn.execute(f"DELETE FROM {table} WHERE report_pk = ?", row)
+                conn.execute("DELETE FROM reports_fts WHERE rowid = ?", row)
+                conn.execute("DELETE FROM reports WHERE id = ?", row)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return row is not None
+
+    def _fts_condition(self, table: str, text: str) -> Tuple[str, List]:
+        """全文检索条件：trigram 分词器需要至少3个字符，较短的词退化为逐行子串匹配"""
+        if self.fts_tokenizer == "trigram" and len(text) < 3:
+            return f"id IN (SELECT rowid FROM {table} WHERE instr(content, ?) > 0)", [text]
+        phrase = '"' + text.replace('"', '""') + '"'
+        return f"id IN (SELECT rowid FROM {table} WHERE {table} MATCH ?)", [phrase]
+
+    def _report_filters(self, status=None, severity=None, product=None, team=None,
+                        date_from=None, date_to=None, text=None) -> Tuple[List[str], List]:
+        conditions = ["tenant = ?"]
+        params = [self.tenant]
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        if severity is not None:
+            conditions.append("severity = ?")
+            params.append(severity)
+        if date_from is not None:
+            conditions.append("discovery_date >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("discovery_date <= ?")
+            params.append(date_to)
+        if product is not None:
+            if product.endswith("*"):
+                conditions.append("id IN (SELECT report_pk FROM report_products"
+                                  " WHERE tenant = ? AND product >= ? AND product < ?)")
+                params.extend((self.tenant,) + _prefix_range(product))
+            else:
+                conditions.append("id IN (SELECT report_pk FROM report_products"
+                                  " WHERE tenant = ? AND product = ?)")
+                params.extend((self.tenant, product))
+        if team is not None:
+            conditions.append("id IN (SELECT report_pk FROM report_team WHERE tenant = ? AND member = ?)")
+            params.extend((self.tenant, team))
+        if text:
+            condition, fts_params = self._fts_condition("reports_fts", text)
+            conditions.append(condition)
+            params.extend(fts_params)
+        return conditions, params
+
+    def _report_select(self, with_payload: bool, filters: Dict, after: int = 0) -> Tuple[str, List]:
+        conditions, params = self._report_filters(**filters)
+        if after:
+            conditions.append("id > ?")
+            params.append(after)
+        columns = ", ".join(("id",) + REPORT_COLUMNS + (("fmt", "payload") if with_payload else ()))
+        return f"SELECT {columns} FROM reports WHERE {' AND '.join(conditions)} ORDER BY id", params
+
+    @staticmethod
+    def _report_row(row, with_payload: bool) -> Dict:
+        item = dict(zip(REPORT_COLUMNS, row[1:len(REPORT_COLUMNS) + 1]))
+        if with_payload:
+            item["report"] = serializers.loads(row[-1], row[-2])
+        return item
+
+    def query_reports(self, after: int = 0, limit: int = 50, with_payload: bool = False,
+                      **filters) -> Tuple[List[Dict], Optional[int]]:
+        """
+        分页查询报告（游标分页，翻页代价与页码无关）
+
+        Args:
+            after: 上一页返回的游标，首页为0
+            limit: 每页条数
+            with_payload: 是否返回完整报告数据
+            **filters: status, severity, product（支持 "AC-2024-*" 前缀）, team,
+                date_from, date_to, text（全文检索）
+
+        Returns:
+            Tuple[List[Dict], Optional[int]]: 本页结果和下一页游标（无更多结果时为None）
+        """
+        sql, params = self._report_select(with_payload, filters, after)
+        rows = self._connect().execute(sql + " LIMIT ?", params + [limit]).fetchall()
+        results = [self._report_row(row, with_payload) for row in rows]
+        next_cursor = rows[-1][0] if len(rows) == limit else None
+        return results, next_cursor
+
+    def iter_reports(self, page_size: int = PAGE_SIZE, with_payload: bool = False,
+                     **filters) -> Iterator[Dict]:
+        """
+        流式遍历匹配的报告：单条语句按批读取，内存占用与结果总数无关
+        （WAL模式下读取期间不阻塞其他写入者）
+        """
+        sql, params = self._report_select(with_payload, filters)
+        cursor = self._connect().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(page_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield self._report_row(row, with_payload)
+        finally:
+            cursor.close()
+
+    def count_reports(self, **filters) -> int:
+        """统计匹配的报告数"""
+        conditions, params = self._report_filters(**filters)
+        return self._connect().execute(
+            f"SELECT COUNT(*) FROM reports WHERE {' AND '.join(conditions)}", params).fetchone()[0]
+
+    # ---- 访谈 ----
+
+    def _write_interview(self, conn, row: Tuple[str, Dict], now: int):
+        session_id, export_data = row
+        fields = extract_interview_fields(export_data)
+        payload = serializers.dumps(export_data, self.fmt)
+        conn.execute(
+            "INSERT INTO interviews (tenant, session_id, problem, current_phase, started_at, finished_at,"
+            " response_count, updated_at, fmt, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (tenant, session_id) DO UPDATE SET problem = excluded.problem,"
+            " current_phase = excluded.current_phase, started_at = excluded.started_at,"
+            " finished_at = excluded.finished_at, response_count = excluded.response_count,"
+            " updated_at = excluded.updated_at, fmt = excluded.fmt, payload = excluded.payload",
+            (self.tenant, session_id, fields["problem"], fields["current_phase"], fields["started_at"],
+             fields["finished_at"], fields["response_count"], now, self.fmt, payload))
+        pk = conn.execute("SELECT id FROM interviews WHERE tenant = ? AND session_id = ?",
+                          (self.tenant, session_id)).fetchone()[0]
+        conn.execute("DELETE FROM interviews_fts WHERE rowid = ?", (pk,))
+        conn.execute("INSERT INTO interviews_fts (rowid, content) VALUES (?, ?)", (pk, fields["content"]))
+
+    def upsert_interviews(self, sessions: Iterable[Tuple[str, Dict]]) -> int:
+        """
+        批量写入或更新访谈记录
+
+        Args:
+            sessions: (会话ID, 对话记录) 序列
+
+        Returns:
+            int: 写入的会话数
+        """
+        return self._write(sessions, self._write_interview)
+
+    def save_interview(self, session_id: str, interviewer) -> int:
+        """保存 FiveWInterviewer 的当前会话"""
+        return self.upsert_interviews([(session_id, interviewer.to_export_data())])
+
+    def get_interview(self, session_id: str) -> Optional[Dict]:
+        """按ID读取访谈记录"""
+        row = self._connect().execute(
+            "SELECT fmt, payload FROM interviews WHERE tenant = ? AND session_id = ?",
+            (self.tenant, session_id)).fetchone()
+        return serializers.loads(row[1], row[0]) if row else None
+
+    def iter_interviews(self, started_from: Optional[str] = None, started_to: Optional[str] = None,
+                        phase: Optional[str] = None, text: Optional[str] = None,
+                        page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+        """
+        流式遍历访谈记录
+
+        Args:
+            started_from: 开始时间下限（ISO格式）
+            started_to: 开始时间上限
+            phase: 访谈结束时所处阶段
+            text: 全文检索回答内容
+            page_size: 每次读取的条数
+        """
+        conditions = ["tenant = ?"]
+        params = [self.tenant]
+        if started_from is not None:
+            conditions.append("started_at >= ?")
+            params.append(started_from)
+        if started_to is not None:
+            conditions.append("started_at <= ?")
+            params.append(started_to)
+        if phase is not None:
+            conditions.append("current_phase = ?")
+            params.append(phase)
+        if text:
+            condition, fts_params = self._fts_condition("interviews_fts", text)
+            conditions.append(condition)
+            params.extend(fts_params)
+        sql = (f"SELECT {', '.join(INTERVIEW_COLUMNS)} FROM interviews"
+               f" WHERE {' AND '.join(conditions)} ORDER BY id")
+
+        cursor = self._connect().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(page_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(zip(INTERVIEW_COLUMNS, row))
+        finally:
+            cursor.close()
+
+    def import_files(self, paths: Iterable[str]) -> Dict[str, int]:
+        """
+        导入 generate_report / export_conversation 写出的文件，按内容自动识别类型，
+        以文件名（不含扩展名）作为ID
+
+        Returns:
+            Dict[str, int]: 导入的报告数和访谈数
+        """
+        reports, interviews = [], []
+        for path in paths:
+            data = serializers.read_file(path)
+            key = os.path.splitext(os.path.basename(path))[0]
+            if "8D分析" in data:
+                reports.append((key, data))
+            elif "访谈记录" in data:
+                interviews.append((key, data))
+        return {"reports": self.upsert_reports(reports), "interviews": self.upsert_interviews(interviews)}
+
+
+def _synthetic_reports(count: int, offset: int = 0) -> Iterator[Tuple[str, Dict]]:
+    """生成合成报告，用于演示和压测"""
+    severities = ("严重", "中等", "低")
+    problems = ("空调制冷效果不佳", "压缩机启动后立即停止", "室内机漏水", "室外机噪音异常")
+    for i in range(offset, offset + count):
+        phases = {
+            "D0": {
+                "problem_description": problems[i % len(problems)],
+                "discovery_date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "discovery_person": f"发现人{i % 50}",
+                "affected_products": [f"AC-{2022 + i % 3}-{i % 500:03d}"],
+                "initial_severity": severities[i % 3],
+                "initial_response": "暂停相关产品出货"
+            }
+        }
+        if i % 2:
+            phases["D1"] = {"team_leader": f"组长{i % 40}", "team_members": [f"成员{i % 90}"],
+                            "team_roles": {}, "communication_plan": "每日站会"}
+        yield f"8D-{i:06d}", {"报告信息": {"版本": "1.0"}, "8D分析": phases}
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="8D报告与访谈存储库")
+    parser.add_argument("database", nargs="?", default="", help="SQLite数据库文件，省略时运行内存示例")
+    parser.add_argument("--tenant", default="default", help="租户名称")
+    parser.add_argument("--import", dest="import_files", nargs="*", default=[],
+                        help="导入报告/访谈文件")
+    parser.add_argument("--status", default=None, help="按状态过滤（进行中/已完成）")
+    parser.add_argument("--severity", default=None, help="按初始严重程度过滤")
+    parser.add_argument("--product", default=None, help="按产品过滤，支持 AC-2024-* 前缀")
+    parser.add_argument("--team", default=None, help="按团队成员过滤")
+    parser.add_argument("--text", default=None, help="全文检索")
+    parser.add_argument("--limit", type=int, default=20, help="最多输出条数")
+    args = parser.parse_args()
+
+    repo = ReportRepository(args.database or ":memory:", args.tenant)
+    if args.import_files:
+        print("导入:", repo.import_files(args.import_files))
+    if not args.database:
+        start = time.perf_counter()
+        count = repo.upsert_reports(_synthetic_reports(20000))
+        print(f"写入{count}个合成报告: {time.perf_counter() - start:.2f}s (FTS分词器: {repo.fts_tokenizer})")
+
+    filters = {key: getattr(args, key) for key in ("status", "severity", "product", "team", "text")
+               if getattr(args, key) is not None}
+    if not args.database and not filters:
+        filters = {"status": "进行中", "severity": "严重", "product": "AC-2022-*", "text": "压缩机"}
+
+    start = time.perf_counter()
+    total = repo.count_reports(**filters)
+    page, _ = repo.query_reports(limit=args.limit, **filters)
+    print(f"查询 {filters}: 共{total}条 ({(time.perf_counter() - start) * 1000:.1f}ms)")
+    for item in page:
+        print(" ", item)
+
+
+if __name__ == "__main__":
+    main()
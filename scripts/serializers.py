@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可插拔序列化层
+报告与导出统一经由此模块写出：JSON（安装orjson时走快速路径）和
+msgpack二进制格式（机器间交换），默认紧凑输出，仅在需要人工阅读时美化
+可通过 set_default_format() 或环境变量 QA_SERIALIZER=json|msgpack 配置默认格式
+"""
+
+import os
+import json
+import warnings
+import threading
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMATS = ("json", "msgpack")
+
+FILE_EXTENSIONS = {
+    "json": ".json",
+    "msgpack": ".msgpack"
+}
+
+_default_format = os.environ.get("QA_SERIALIZER", "json").strip().lower() or "json"
+if _default_format not in FORMATS:
+    # 导入时校验，避免拼写错误推迟到写文件时才以 KeyError 暴露
+    warnings.warn(f"QA_SERIALIZER={_default_format!r} 不是支持的序列化格式 {FORMATS}，使用json")
+    _default_format = "json"
+
+# 已确认存在的输出目录，避免每次写入都调用 os.makedirs
+_known_dirs = set()
+_dirs_lock = threading.Lock()
+
+
+def set_default_format(fmt: str):
+    """设置默认序列化格式"""
+    global _default_format
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的序列化格式: {fmt}")
+    _default_format = fmt
+
+
+def get_default_format() -> str:
+    """获取默认序列化格式"""
+    return _default_format
+
+
+def _default(obj):
+    """处理标准JSON无法直接序列化的对象"""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def dumps(obj: Any, fmt: Optional[str] = None, pretty: bool = False) -> bytes:
+    """
+    序列化为字节
+
+    Args:
+        obj: 待序列化对象
+        fmt: 格式 (json, msgpack)，默认使用全局配置
+        pretty: 是否美化输出（仅JSON有效）
+
+    Returns:
+        bytes: 序列化结果
+    """
+    fmt = fmt or _default_format
+    if fmt == "json":
+        if orjson is not None:
+            # dataclass 交给 _default 调用 to_dict()，与标准库json输出一致（如时间戳输出为ISO字符串）
+            option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+                      | (orjson.OPT_INDENT_2 if pretty else 0))
+            return orjson.dumps(obj, default=_default, option=option)
+        if pretty:
+            return json.dumps(obj, ensure_ascii=False, indent=2, default=_default).encode("utf-8")
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise ImportError("需要安装msgpack库来使用二进制格式")
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+    raise ValueError(f"不支持的序列化格式: {fmt}")
+
+
+def loads(data: bytes, fmt: Optional[str] = None) -> Any:
+    """
+    反序列化
+
+    Args:
+        data: 序列化字节
+        fmt: 格式，默认使用全局配置
+
+    Returns:
+        Any: 反序列化结果
+    """
+    fmt = fmt or _default_format
+    if fmt == "json":
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data.decode("utf-8") if isinstance(data, bytes) else data)
+
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise ImportError("需要安装msgpack库来使用二进制格式")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    raise ValueError(f"不支持的序列化格式: {fmt}")
+
+
+def format_from_path(path: str) -> Optional[str]:
+    """根据文件扩展名推断格式"""
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, fmt_extension in FILE_EXTENSIONS.items():
+        if extension == fmt_extension:
+            return fmt
+    return None
+
+
+def ensure_parent_dir(path: str):
+    """确保输出文件所在目录存在（目录缓存后不再重复检查）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    if directory in _known_dirs:
+        return
+    os.makedirs(directory, exist_ok=True)
+    with _dirs_lock:
+        _known_dirs.add(directory)
+
+
+def write_file(obj: Any, path: str, fmt: Optional[str] = None, pretty: bool = False) -> str:
+    """
+    序列化并写入文件
+
+    Args:
+        obj: 待序列化对象
+        path: 输出文件路径
+        fmt: 格式，默认按扩展名推断，无法推断时使用全局配置
+        pretty: 是否美化输出
+
+    Returns:
+        str: 输出文件路径
+    """
+    fmt = fmt or format_from_path(path) or _default_format
+    data = dumps(obj, fmt, pretty)
+    ensure_parent_dir(path)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def read_file(path: str, fmt: Optional[str] = None) -> Any:
+    """
+    读取由 write_file 写出的文件
+
+    Args:
+        path: 文件路径
+        fmt: 格式，默认按扩展名推断
+
+    Returns:
+        Any: 反序列化结果
+    """
+    fmt = fmt or format_from_path(path) or _default_format
+    with open(path, 'rb') as f:
+        return loads(f.read(), fmt)
+
+
+def available_formats() -> Dict[str, str]:
+    """当前环境可用的格式及后端"""
+    formats = {"json": "orjson" if orjson is not None else "json"}
+    if msgpack is not None:
+        formats["msgpack"] = "msgpack"
+    return formats
+
+
+def main():
+    """主函数，用于测试"""
+    sample = {"报告信息": {"版本": "1.0"}, "8D分析": {"D0": {"affected_products": ["AC-2024-001"]}}}
+    print("可用格式:", available_formats())
+    for fmt in available_formats():
+        data = dumps(sample, fmt)
+        print(f"{fmt}: {len(data)} 字节, 往返一致: {loads(data, fmt) == sample}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+8D阶段期限（SLA）跟踪器
+将所有未关闭的8D报告按当前阶段期限索引在最小堆中，快速查询逾期和即将到期的报告、
+按逾期时长逐级升级，并以列式快照持久化状态，只重新读取有变化的报告文件
+"""
+
+import os
+import heapq
+import hashlib
+import argparse
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .eight_d_report_generator import PHASE_ORDER, PHASE_SLA_DAYS, SEVERITY_SLA_FACTOR
+    from .compact_models import iso_to_epoch_us, epoch_us_to_iso, now_epoch_us, intern_code
+    from . import serializers
+except ImportError:
+    from eight_d_report_generator import PHASE_ORDER, PHASE_SLA_DAYS, SEVERITY_SLA_FACTOR
+    from compact_models import iso_to_epoch_us, epoch_us_to_iso, now_epoch_us, intern_code
+    import serializers
+
+HOUR_US = 3600 * 1000000
+DAY_US = 24 * HOUR_US
+
+# 升级规则：(逾期时长, 升级对象)，逾期时长达到阈值即升级到对应级别
+ESCALATION_LEVELS = (
+    (0, "团队负责人"),
+    (24 * HOUR_US, "质量经理"),
+    (72 * HOUR_US, "管理层")
+)
+
+# 版本2起 sources 按文件路径记录 [报告ID, 修改时间]
+STATE_VERSION = 2
+
+# 同步时无法解析的报告文件（格式错误、缺少字段、日期无效等），跳过并记录
+SYNC_ERRORS = (OSError, ValueError, KeyError, TypeError, AttributeError)
+
+
+class _SLAEntry:
+    """单个报告的跟踪状态"""
+    __slots__ = ("phase_index", "deadline_us", "discovery_us", "severity", "level", "version")
+
+    def __init__(self, phase_index: int, deadline_us: int, discovery_us: int,
+                 severity: str, level: int, version: int):
+        self.phase_index = phase_index
+        self.deadline_us = deadline_us
+        self.discovery_us = discovery_us
+        self.severity = severity
+        self.level = level
+        self.version = version
+
+
+class SLATracker:
+    """基于最小堆的8D阶段期限跟踪器"""
+
+    def __init__(self, sla_days: Optional[Dict[str, float]] = None,
+                 escalation_levels: Tuple = ESCALATION_LEVELS):
+        """
+        Args:
+            sla_days: 各阶段自发现起的期限（天），默认 PHASE_SLA_DAYS
+            escalation_levels: 升级规则
+        """
+        self.sla_days = dict(sla_days or PHASE_SLA_DAYS)
+        self.escalation_levels = escalation_levels
+        self._entries = {}
+        self._heap = []
+        self._stale = 0
+        self._version = 0
+        self._sources = {}
+        self._source_paths = {}
+        self.sync_errors = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _deadline(self, discovery_us: int, severity: str, phase_index: int) -> int:
+        factor = SEVERITY_SLA_FACTOR.get(severity, 1.0)
+        return discovery_us + int(self.sla_days[PHASE_ORDER[phase_index]] * factor * DAY_US)
+
+    def _push(self, report_id: str, entry: _SLAEntry):
+        """写入新版本条目；旧堆节点延迟失效，失效节点过多时重建堆"""
+        if report_id in self._entries:
+            self._stale += 1
+        self._version += 1
+        entry.version = self._version
+        self._entries[report_id] = entry
+        heapq.heappush(self._heap, (entry.deadline_us, entry.version, report_id))
+        if self._stale > len(self._entries) + 64:
+            self._compact()
+
+    def _compact(self):
+        self._heap = [(e.deadline_us, e.version, rid) for rid, e in self._entries.items()]
+        heapq.heapify(self._heap)
+        self._stale = 0
+
+    def _is_live(self, version: int, report_id: str) -> bool:
+        entry = self._entries.get(report_id)
+        return entry is not None and entry.version == version
+
+    def track(self, report_id: str, discovery_date: str, severity: str,
+              completed_phases: Iterable[str] = ()) -> Optional[str]:
+        """
+        开始或更新跟踪一个报告
+
+        Args:
+            report_id: 报告ID
+            discovery_date: D0发现日期（ISO格式）
+            severity: 初始严重程度
+            completed_phases: 已完成的阶段
+
+        Returns:
+            Optional[str]: 当前待完成阶段，全部完成时返回None（并停止跟踪）
+        """
+        completed = set(completed_phases)
+        phase_index = next((i for i, phase in enumerate(PHASE_ORDER)
+                            if phase not in completed and phase in self.sla_days), None)
+        if phase_index is None:
+            self.close(report_id)
+            return None
+
+        discovery_us = iso_to_epoch_us(discovery_date)
+        severity = intern_code(severity)
+        previous = self._entries.get(report_id)
+        if previous is not None and previous.phase_index == phase_index \
+                and previous.discovery_us == discovery_us and previous.severity == severity:
+            return PHASE_ORDER[phase_index]
+
+        deadline_us = self._deadline(discovery_us, severity, phase_index)
+        self._push(report_id, _SLAEntry(phase_index, deadline_us, discovery_us, severity, 0, 0))
+        return PHASE_ORDER[phase_index]
+
+    def track_generator(self, report_id: str, generator) -> Optional[str]:
+        """跟踪 EightDReportGenerator 中的报告（需已完成D0）"""
+        d0 = generator.current_data.get("D0")
+        if d0 is None:
+            return None
+        return self.track(report_id, d0.discovery_date, d0.initial_severity, generator.current_data)
+
+    def track_report(self, report_id: str, report_data: Dict) -> Optional[str]:
+        """跟踪 generate_report 输出的报告数据，格式不符时抛出 ValueError"""
+        if not isinstance(report_data, dict) or not isinstance(report_data.get("8D分析", {}), dict):
+            raise ValueError(f"报告格式无效: {report_id}")
+        phases = report_data.get("8D分析", {})
+        d0 = phases.get("D0")
+        if not d0:
+            return None
+        if not isinstance(d0, dict) or not d0.get("discovery_date") or not d0.get("initial_severity"):
+            raise ValueError(f"报告D0缺少发现日期或初始严重程度: {report_id}")
+        return self.track(report_id, d0["discovery_date"], d0["initial_severity"], phases)
+
+    def complete_phase(self, report_id: str, phase: str) -> Optional[str]:
+        """
+        标记当前阶段完成，推进到下一阶段并重新计算期限
+
+        Returns:
+            Optional[str]: 新的当前阶段，全部完成时返回None
+        """
+        entry = self._entries.get(report_id)
+        if entry is None or PHASE_ORDER[entry.phase_index] != phase:
+            return PHASE_ORDER[entry.phase_index] if entry else None
+
+        for phase_index in range(entry.phase_index + 1, len(PHASE_ORDER)):
+            if PHASE_ORDER[phase_index] in self.sla_days:
+                deadline_us = self._deadline(entry.discovery_us, entry.severity, phase_index)
+                self._push(report_id, _SLAEntry(phase_index, deadline_us, entry.discovery_us,
+                                                entry.severity, 0, 0))
+                return PHASE_ORDER[phase_index]
+        self.close(report_id)
+        return None
+
+    def close(self, report_id: str):
+        """停止跟踪报告（堆节点延迟清理）"""
+        if self._entries.pop(report_id, None) is not None:
+            self._stale += 1
+        path = self._source_paths.pop(report_id, None)
+        if path is not None:
+            self._sources.pop(path, None)
+
+    def _describe(self, report_id: str, entry: _SLAEntry, now_us: int) -> Dict:
+        return {
+            "report_id": report_id,
+            "phase": PHASE_ORDER[entry.phase_index],
+            "deadline": epoch_us_to_iso(entry.deadline_us),
+            "severity": entry.severity,
+            "hours_remaining": round((entry.deadline_us - now_us) / HOUR_US, 1)
+        }
+
+    def next_deadline(self, now: Optional[str] = None) -> Optional[Dict]:
+        """最近的期限（堆顶，均摊 O(log n)）"""
+        heap = self._heap
+        while heap and not self._is_live(heap[0][1], heap[0][2]):
+            heapq.heappop(heap)
+            self._stale -= 1
+        if not heap:
+            return None
+        now_us = iso_to_epoch_us(now) if now else now_epoch_us()
+        return self._describe(heap[0][2], self._entries[heap[0][2]], now_us)
+
+    def _due_before(self, until_us: int) -> List[Tuple[int, str]]:
+        """
+        遍历堆中期限不晚于 until_us 的节点：子节点期限不早于父节点，
+        超出范围的子树整体剪枝，代价与结果数成正比而不是与报告总数成正比
+        """
+        heap = self._heap
+        size = len(heap)
+        found = []
+        stack = [0] if size else []
+        while stack:
+            index = stack.pop()
+            deadline_us, version, report_id = heap[index]
+            if deadline_us > until_us:
+                continue
+            if self._is_live(version, report_id):
+                found.append((deadline_us, report_id))
+            child = 2 * index + 1
+            if child < size:
+                stack.append(child)
+            if child + 1 < size:
+                stack.append(child + 1)
+        found.sort()
+        return found
+
+    def overdue(self, now: Optional[str] = None) -> List[Dict]:
+        """已逾期的报告，按期限排序"""
+        now_us = iso_to_epoch_us(now) if now else now_epoch_us()
+        return [self._describe(rid, self._entries[rid], now_us)
+                for _, rid in self._due_before(now_us - 1)]
+
+    def due_within(self, hours: float = 24, now: Optional[str] = None) -> List[Dict]:
+        """未来 hours 小时内到期（尚未逾期）的报告"""
+        now_us = iso_to_epoch_us(now) if now else now_epoch_us()
+        return [self._describe(rid, self._entries[rid], now_us)
+                for deadline_us, rid in self._due_before(now_us + int(hours * HOUR_US))
+                if deadline_us >= now_us]
+
+    def escalate(self, now: Optional[str] = None) -> List[Dict]:
+        """
+        检查逾期报告并生成升级事件，同一阶段每个级别只升级一次
+
+        Returns:
+            List[Dict]: 升级事件
+        """
+        now_us = iso_to_epoch_us(now) if now else now_epoch_us()
+        events = []
+        for deadline_us, report_id in self._due_before(now_us - 1):
+            entry = self._entries[report_id]
+            overdue_us = now_us - deadline_us
+            level = sum(1 for threshold, _ in self.escalation_levels if overdue_us >= threshold)
+            if level <= entry.level:
+                continue
+            entry.level = level
+            event = self._describe(report_id, entry, now_us)
+            event["overdue_hours"] = round(overdue_us / HOUR_US, 1)
+            event["level"] = level
+            event["escalate_to"] = self.escalation_levels[level - 1][1]
+            events.append(event)
+        return events
+
+    def sync_report_files(self, paths: Iterable[str]) -> int:
+        """
+        增量同步报告文件：只读取自上次同步后修改过的文件；无法解析的文件跳过，
+        记录在 sync_errors 中，下次同步时重新尝试
+
+        Args:
+            paths: generate_report 输出的报告文件
+
+        Returns:
+            int: 实际读取的文件数
+        """
+        loaded = 0
+        self.sync_errors = []
+        for path in paths:
+            path = os.path.abspath(path)
+            source = self._sources.get(path)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                if source is not None and source[1] == mtime:
+                    continue
+                report_id = source[0] if source is not None else self._report_id_for(path)
+                self.track_report(report_id, serializers.read_file(path))
+            except SYNC_ERRORS as e:
+                self.sync_errors.append({"path": path, "error": f"{type(e).__name__}: {e}"})
+                continue
+            self._sources[path] = [report_id, mtime]
+            self._source_paths[report_id] = path
+            loaded += 1
+        return loaded
+
+    def _report_id_for(self, path: str) -> str:
+        """
+        报告文件对应的报告ID：默认为文件名（不含扩展名）；不同目录下的同名文件
+        加上路径哈希后缀区分，已分配的ID随文件路径保存在快照中保持不变
+        """
+        report_id = os.path.splitext(os.path.basename(path))[0]
+        if self._source_paths.get(report_id, path) != path:
+            report_id = f"{report_id}-{hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]}"
+        return report_id
+
+    def save(self, path: str, fmt: Optional[str] = None) -> str:
+        """
+        保存列式状态快照（每列一个数组，比逐条记录更紧凑，加载时一次heapify重建堆）
+        """
+        report_ids = list(self._entries)
+        entries = [self._entries[rid] for rid in report_ids]
+        state = {
+            "version": STATE_VERSION,
+            "sla_days": self.sla_days,
+            "report_id": report_ids,
+            "phase_index": [e.phase_index for e in entries],
+            "deadline_us": [e.deadline_us for e in entries],
+            "discovery_us": [e.discovery_us for e in entries],
+            "severity": [e.severity for e in entries],
+            "level": [e.level for e in entries],
+            "sources": self._sources
+        }
+        return serializers.write_file(state, path, fmt)
+
+    @classmethod
+    def load(cls, path: str, fmt: Optional[str] = None,
+             escalation_levels: Tuple = ESCALATION_LEVELS) -> "SLATracker":
+        """从 save() 保存的快照恢复"""
+        state = serializers.read_file(path, fmt)
+        if state.get("version") not in (1, STATE_VERSION):
+            raise ValueError(f"不支持的状态版本: {state.get('version')}")
+        tracker = cls(state["sla_days"], escalation_levels)
+        for version, row in enumerate(zip(state["report_id"], state["phase_index"], state["deadline_us"],
+                                          state["discovery_us"], state["severity"], state["level"]), 1):
+            report_id, phase_index, deadline_us, discovery_us, severity, level = row
+            tracker._entries[report_id] = _SLAEntry(phase_index, deadline_us, discovery_us,
+                                                    intern_code(severity), level, version)
+        tracker._version = len(tracker._entries)
+        # 版本1的 sources 按报告ID记录，无法对应到文件路径，丢弃后下次同步重新读取
+        if state["version"] == STATE_VERSION:
+            tracker._sources = {path: list(source) for path, source in state.get("sources", {}).items()}
+            tracker._source_paths = {source[0]: path for path, source in tracker._sources.items()}
+        tracker._compact()
+        return tracker
+
+
+def main():
+    """命令行入口：同步报告目录并输出逾期、即将到期和升级事件"""
+    parser = argparse.ArgumentParser(description="8D阶段期限跟踪")
+    parser.add_argument("reports", nargs="*", help="generate_report 输出的报告文件")
+    parser.add_argument("--state", default="", help="状态快照文件，存在时先加载，结束后保存")
+    parser.add_argument("--hours", type=float, default=24, help="即将到期的时间窗口（小时）")
+    parser.add_argument("--now", default=None, help="当前时间（ISO格式），默认系统时间")
+    args = parser.parse_args()
+
+    if args.state and os.path.exists(args.state):
+        tracker = SLATracker.load(args.state)
+    else:
+        tracker = SLATracker()
+
+    if args.reports:
+        loaded = tracker.sync_report_files(args.reports)
+        print(f"同步报告: 读取{loaded}个文件，跳过{len(tracker.sync_errors)}个无法解析的文件，跟踪{len(tracker)}个报告")
+        for error in tracker.sync_errors[:5]:
+            print(f"  跳过: {error['path']}: {error['error']}")
+    else:
+        # 示例数据
+        tracker.track("8D-001", "2024-01-20", "中等", ["D0", "D1", "D2"])
+        tracker.track("8D-002", "2024-01-21", "严重", ["D0"])
+        tracker.track("8D-003", "2024-01-10", "低", ["D0", "D1", "D2", "D3"])
+        args.now = args.now or "2024-01-22T12:00:00"
+
+    print("最近期限:", tracker.next_deadline(args.now))
+    print("已逾期:", tracker.overdue(args.now))
+    print(f"{args.hours:g}小时内到期:", tracker.due_within(args.hours, args.now))
+    for event in tracker.escalate(args.now):
+        print(f"升级: {event['report_id']} {event['phase']} 逾期{event['overdue_hours']}小时 -> {event['escalate_to']}")
+
+    if args.state:
+        tracker.save(args.state)
+
+
+if __name__ == "__main__":
+    main()
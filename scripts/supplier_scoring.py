@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+供应商/物料质量评分
+增量汇入8D报告的D4/D5结果和 process_image 缺陷检测结果（按供应商和批次标记），
+在列式数组中维护指数衰减的缺陷率、PPM和8D事件计数，排名查询无需重新扫描历史报告
+"""
+
+import math
+import time
+import heapq
+import random
+import argparse
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .answer_validator import FISHBONE_TERMS
+    from .compact_models import iso_to_epoch_us, epoch_us_to_iso, now_epoch_us
+    from . import serializers
+except ImportError:
+    from answer_validator import FISHBONE_TERMS
+    from compact_models import iso_to_epoch_us, epoch_us_to_iso, now_epoch_us
+    import serializers
+
+DAY_US = 24 * 3600 * 1000000
+
+# 默认半衰期约一个季度：90天前的数据权重减半
+DEFAULT_HALF_LIFE_DAYS = 91
+
+# 衰减因子的指数超过该值时重设基准时间，避免浮点溢出
+MAX_EXPONENT = 300.0
+
+# 列：检验数、不良品数、缺陷数、8D事件（按严重度加权）、根因指向材料/供应商的8D数、纠正措施数
+COLUMNS = ("inspected", "defective", "defects", "incidents", "root_causes", "actions")
+
+# 8D事件按D0初始严重度加权
+SEVERITY_WEIGHT = {"严重": 3.0, "高": 3.0, "中等": 2.0, "中": 2.0, "低": 1.0}
+
+MATERIAL_TERMS = FISHBONE_TERMS["材料"]
+
+METRICS = ("ppm", "defect_rate", "incidents", "root_causes", "actions")
+
+STATE_VERSION = 1
+
+
+class DecayedStore:
+    """
+    按名称索引的指数衰减计数列存储
+
+    每个值以"基准时间 origin_us 时刻的等价量"存储：t 时刻的增量 w 记为 w·e^(λ(t-origin))，
+    读取时统一乘 e^(-λ(now-origin))。写入只触及一行，同一时刻所有行的衰减因子相同，
+    因此比值（PPM、缺陷率）和排名可以直接在存储值上计算
+    """
+
+    def __init__(self, decay: float, origin_us: int):
+        """
+        Args:
+            decay: 衰减率 λ（每微秒）
+            origin_us: 基准时间
+        """
+        self.decay = decay
+        self.origin_us = origin_us
+        self.index = {}
+        self.names = []
+        self.last_us = array("q")
+        self.columns = {column: array("d") for column in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def slot(self, name: str) -> int:
+        """名称对应的行号，不存在时新增一行"""
+        i = self.index.get(name)
+        if i is None:
+            i = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.last_us.append(0)
+            for values in self.columns.values():
+                values.append(0.0)
+        return i
+
+    def scale(self, at_us: int) -> float:
+        """at_us 时刻增量换算到基准时间的倍数"""
+        exponent = self.decay * (at_us - self.origin_us)
+        if exponent > MAX_EXPONENT:
+            self.rebase(at_us)
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def rebase(self, origin_us: int):
+        """将基准时间移到 origin_us，所有存储值同比缩放"""
+        factor = math.exp(-self.decay * (origin_us - self.origin_us))
+        for values in self.columns.values():
+            for i in range(len(values)):
+                values[i] *= factor
+        self.origin_us = origin_us
+
+    def add(self, name: str, amounts: Dict[str, float], at_us: int, sign: float = 1.0):
+        """
+        在 at_us 时刻累加（sign=-1 时撤销之前的累加）
+
+        Args:
+            name: 供应商或批次
+            amounts: 列名 -> 增量
+            at_us: 事件时间
+            sign: 1 累加，-1 撤销
+        """
+        i = self.slot(name)
+        factor = sign * self.scale(at_us)
+        for column, amount in amounts.items():
+            self.columns[column][i] += amount * factor
+        if sign > 0 and at_us > self.last_us[i]:
+            self.last_us[i] = at_us
+
+    def now_factor(self, now_us: int) -> float:
+        """存储值换算到 now_us 时刻衰减值的倍数"""
+        return math.exp(-self.decay * (now_us - self.origin_us))
+
+    def raw_metric(self, i: int, metric: str) -> Optional[float]:
+        """未乘当前衰减因子的指标值，比值类指标检验数为0时返回None"""
+        columns = self.columns
+        if metric in ("ppm", "defect_rate"):
+            inspected = columns["inspected"][i]
+            if inspected <= 0:
+                return None
+            column = "defective" if metric == "ppm" else "defects"
+            return columns[column][i] / inspected * (1000000.0 if metric == "ppm" else 1.0)
+        return columns[metric][i]
+
+    def summary(self, i: int, now_us: int) -> Dict:
+        """单行的全部衰减值和指标"""
+        factor = self.now_factor(now_us)
+        result = {"name": self.names[i], "last_event": epoch_us_to_iso(self.last_us[i]) if self.last_us[i] else ""}
+        for column in COLUMNS:
+            result[column] = round(self.columns[column][i] * factor, 3)
+        for metric in ("ppm", "defect_rate"):
+            value = self.raw_metric(i, metric)
+            result[metric] = round(value, 3) if value is not None else None
+        return result
+
+    def top(self, n: int, metric: str, now_us: int, min_inspected: float = 0.0,
+            prefix: str = "") -> List[Dict]:
+        """
+        按指标从高到低取前 n 行
+
+        Args:
+            n: 返回数量
+            metric: METRICS 之一
+            now_us: 查询时刻
+            min_inspected: 比值类指标要求的最小衰减检验数（避免样本过少的噪声）
+            prefix: 只考虑以该前缀开头的名称
+        """
+        if metric not in METRICS:
+            raise ValueError(f"不支持的指标: {metric}")
+        threshold = min_inspected / self.now_factor(now_us) if min_inspected else 0.0
+        inspected = self.columns["inspected"]
+        ratio = metric in ("ppm", "defect_rate")
+
+        candidates = []
+        for i, name in enumerate(self.names):
+            if prefix and not name.startswith(prefix):
+                continue
+            if ratio and inspected[i] < threshold:
+                continue
+            value = self.raw_metric(i, metric)
+            if value:
+                candidates.append((value, i))
+        return [self.summary(i, now_us) for _, i in heapq.nlargest(n, candidates)]
+
+    def to_state(self) -> Dict:
+        state = {"names": self.names, "last_us": self.last_us.tolist()}
+        for column, values in self.columns.items():
+            state[column] = values.tolist()
+        return state
+
+    def load_state(self, state: Dict):
+        self.names = list(state["names"])
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.last_us = array("q", state["last_us"])
+        self.columns = {column: array("d", state[column]) for column in COLUMNS}
+
+
+def _time_us(value) -> int:
+    return now_epoch_us() if value is None else iso_to_epoch_us(value)
+
+
+def _mentions_material(value) -> bool:
+    """文本（或嵌套的字典/列表）中是否提到材料、来料或供应商"""
+    if isinstance(value, dict):
+        return any(_mentions_material(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_mentions_material(v) for v in value)
+    return isinstance(value, str) and any(term in value for term in MATERIAL_TERMS)
+
+
+def report_contribution(report_data: Dict) -> Tuple[Optional[str], Dict[str, float]]:
+    """
+    从8D报告数据中提取对供应商评分的贡献
+
+    Args:
+        report_data: generate_report / to_report_data 输出的报告数据
+
+    Returns:
+        (事件时间即D0发现日期, 列名 -> 增量)
+    """
+    phases = report_data.get("8D分析", report_data)
+    d0 = phases.get("D0") or {}
+    d4 = phases.get("D4") or {}
+    d5 = phases.get("D5") or {}
+
+    weight = SEVERITY_WEIGHT.get(d0.get("initial_severity", ""), 1.0)
+    amounts = {"incidents": weight}
+    # 已验证根因指向材料时计入；未验证时参考鱼骨图"材料"分支和潜在原因
+    if d4.get("verified_root_cause"):
+        attributed = _mentions_material(d4["verified_root_cause"])
+    else:
+        attributed = (_mentions_material((d4.get("fishbone_diagram") or {}).get("材料"))
+                      or _mentions_material(d4.get("potential_causes")))
+    if attributed:
+        amounts["root_causes"] = weight
+    if d5.get("corrective_actions"):
+        amounts["actions"] = float(len(d5["corrective_actions"]))
+    return d0.get("discovery_date") or None, amounts
+
+
+class SupplierScorer:
+    """供应商与批次的质量评分"""
+
+    def __init__(self, half_life_days: float = DEFAULT_HALF_LIFE_DAYS, min_inspected: float = 50.0,
+                 origin: Optional[str] = None):
+        """
+        Args:
+            half_life_days: 衰减半衰期（天）
+            min_inspected: 按PPM/缺陷率排名时要求的最小衰减检验数
+            origin: 衰减基准时间，默认当前时间
+        """
+        self.half_life_days = half_life_days
+        self.min_inspected = min_inspected
+        decay = math.log(2) / (half_life_days * DAY_US)
+        origin_us = _time_us(origin)
+        self.suppliers = DecayedStore(decay, origin_us)
+        self.lots = DecayedStore(decay, origin_us)
+        # 报告编号 -> (供应商, 批次, 事件时间, 增量)，报告更新后重新汇入时先撤销旧贡献
+        self._reports = {}
+
+    def _add(self, supplier: str, lot: Optional[str], amounts: Dict[str, float], at_us: int,
+             sign: float = 1.0):
+        self.suppliers.add(supplier, amounts, at_us, sign)
+        if lot:
+            self.lots.add(f"{supplier}/{lot}", amounts, at_us, sign)
+
+    def record_inspection(self, supplier: str, lot: Optional[str] = None, inspected: int = 1,
+                          defective: int = 0, defects: int = 0, at=None):
+        """
+        记录来料或过程检验结果
+
+        Args:
+            supplier: 供应商
+            lot: 批次
+            inspected: 检验数量
+            defective: 不良品数量
+            defects: 缺陷数量（一件不良品可能有多处缺陷）
+            at: 检验时间（ISO字符串、datetime或微秒时间戳），默认当前时间
+        """
+        self._add(supplier, lot, {"inspected": float(inspected), "defective": float(defective),
+                                  "defects": float(max(defects, defective))}, _time_us(at))
+
+    def ingest_image_result(self, result: Dict, supplier: str, lot: Optional[str] = None, at=None) -> bool:
+        """
+        汇入一张零件图片的 process_image 结果（一张图片计一件检验品）
+
+        Returns:
+            bool: 是否计入（分析失败的结果不计入）
+        """
+        if result.get("status") != "success":
+            return False
+        defects = len(result.get("defects_detected", []))
+        self.record_inspection(supplier, lot, 1, 1 if defects else 0, defects, at)
+        return True
+
+    def ingest_report(self, report_data: Dict, supplier: str, lot: Optional[str] = None,
+                      report_id: Optional[str] = None, at=None):
+        """
+        汇入一份8D报告的D4/D5结果
+
+        Args:
+            report_data: 报告数据
+            supplier: 涉及的供应商
+            lot: 涉及的批次
+            report_id: 报告编号，提供时同一报告再次汇入会替换之前的贡献（D4/D5更新后重新汇入）
+            at: 事件时间，默认取D0发现日期，缺失时为当前时间
+        """
+        discovery_date, amounts = report_contribution(report_data)
+        at_us = _time_us(at if at is not None else discovery_date)
+        if report_id is not None:
+            previous = self._reports.pop(report_id, None)
+            if previous is not None:
+                self._add(previous[0], previous[1], previous[3], previous[2], -1.0)
+            self._reports[report_id] = (supplier, lot, at_us, amounts)
+        self._add(supplier, lot, amounts, at_us)
+
+    def ingest_generator(self, generator, supplier: str, lot: Optional[str] = None,
+                         report_id: Optional[str] = None):
+        """汇入 EightDReportGenerator 的当前数据"""
+        self.ingest_report(generator.to_report_data(), supplier, lot, report_id)
+
+    def worst_suppliers(self, n: int = 10, metric: str = "ppm", now=None,
+                        min_inspected: Optional[float] = None) -> List[Dict]:
+        """
+        当前最差的供应商
+
+        Args:
+            n: 返回数量
+            metric: ppm、defect_rate（每件缺陷数）、incidents、root_causes 或 actions
+            now: 查询时刻，默认当前时间
+            min_inspected: 比值类指标要求的最小衰减检验数，默认使用初始化时的设置
+
+        Returns:
+            List[Dict]: 按指标从高到低的供应商衰减统计
+        """
+        threshold = self.min_inspected if min_inspected is None else min_inspected
+        return self.suppliers.top(n, metric, _time_us(now), threshold)
+
+    def worst_lots(self, n: int = 10, metric: str = "ppm", supplier: Optional[str] = None,
+                   now=None, min_inspected: Optional[float] = None) -> List[Dict]:
+        """当前最差的批次，可限定供应商（参数同 worst_suppliers）"""
+        prefix = f"{supplier}/" if supplier else ""
+        threshold = self.min_inspected if min_inspected is None else min_inspected
+        return self.lots.top(n, metric, _time_us(now), threshold, prefix)
+
+    def supplier_summary(self, supplier: str, now=None) -> Optional[Dict]:
+        """单个供应商的衰减统计，不存在时返回None"""
+        i = self.suppliers.index.get(supplier)
+        return None if i is None else self.suppliers.summary(i, _time_us(now))
+
+    def save(self, path: str, fmt: Optional[str] = None) -> str:
+        """保存列式状态快照"""
+        state = {
+            "version": STATE_VERSION,
+            "half_life_days": self.half_life_days,
+            "min_inspected": self.min_inspected,
+            "origin_us": self.suppliers.origin_us,
+            "suppliers": self.suppliers.to_state(),
+            "lots": self.lots.to_state(),
+            "reports": {report_id: list(entry) for report_id, entry in self._reports.items()}
+        }
+        return serializers.write_file(state, path, fmt)
+
+    @classmethod
+    def load(cls, path: str, fmt: Optional[str] = None) -> "SupplierScorer":
+        """从 save() 保存的快照恢复"""
+        state = serializers.read_file(path, fmt)
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"不支持的状态版本: {state.get('version')}")
+        scorer = cls(state["half_life_days"], state["min_inspected"], origin=state["origin_us"])
+        scorer.suppliers.load_state(state["suppliers"])
+        scorer.lots.load_state(state["lots"])
+        scorer._reports = {report_id: (entry[0], entry[1], entry[2], entry[3])
+                           for report_id, entry in state.get("reports", {}).items()}
+        return scorer
+
+
+def simulate(scorer: SupplierScorer, suppliers: int, inspections: int, reports: int,
+             days: int, seed: int = 0) -> Iterable[str]:
+    """按供应商的真实不良率随机生成一段时间内的检验记录和8D报告，返回供应商列表"""
+    rng = random.Random(seed)
+    names = [f"SUP-{i:03d}" for i in range(suppliers)]
+    # 少数供应商不良率明显偏高，且最近一个季度恶化
+    base_rate = {name: rng.choice([0.0005, 0.001, 0.002, 0.02]) for name in names}
+    end_us = now_epoch_us()
+    start_us = end_us - days * DAY_US
+    events = sorted(rng.randrange(start_us, end_us) for _ in range(inspections))
+    for at_us in events:
+        name = rng.choice(names)
+        rate = base_rate[name] * (3 if name == names[0] and end_us - at_us < 90 * DAY_US else 1)
+        defective = 1 if rng.random() < rate else 0
+        scorer.record_inspection(name, f"L{(at_us - start_us) // (7 * DAY_US):03d}", 1, defective, defective, at_us)
+    for k in range(reports):
+        name = rng.choice(names)
+        cause = "来料电容批次不良" if rng.random() < 0.5 else "作业标准不清"
+        report = {"8D分析": {
+            "D0": {"discovery_date": epoch_us_to_iso(rng.randrange(start_us, end_us)),
+                   "initial_severity": rng.choice(["高", "中等", "低"])},
+            "D4": {"verified_root_cause": cause},
+            "D5": {"corrective_actions": [{"action": "供应商整改"}]}
+        }}
+        scorer.ingest_report(report, name, report_id=f"8D-{k:05d}")
+    return names
+
+
+def main():
+    """命令行入口：模拟一年的检验和8D数据，输出本季度最差供应商"""
+    parser = argparse.ArgumentParser(description="供应商质量评分")
+    parser.add_argument("--suppliers", type=int, default=200, help="供应商数量")
+    parser.add_argument("--inspections", type=int, default=200000, help="检验记录数")
+    parser.add_argument("--reports", type=int, default=2000, help="8D报告数")
+    parser.add_argument("--days", type=int, default=365, help="时间跨度（天）")
+    parser.add_argument("--state", default="", help="保存状态快照的路径")
+    args = parser.parse_args()
+
+    scorer = SupplierScorer()
+    start = time.perf_counter()
+    simulate(scorer, args.suppliers, args.inspections, args.reports, args.days)
+    ingest_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    worst = scorer.worst_suppliers(5, "ppm")
+    query_ms = (time.perf_counter() - start) * 1000
+    print(f"汇入 {args.inspections} 条检验记录和 {args.reports} 份8D报告: {ingest_seconds:.2f}s，"
+          f"排名查询: {query_ms:.2f}ms")
+    print("PPM最差的供应商:")
+    for row in worst:
+        print(f"  {row['name']}: PPM {row['ppm']:.0f}, 衰减检验数 {row['inspected']:.0f}, 8D事件 {row['incidents']:.1f}")
+    print("根因指向材料最多的供应商:")
+    for row in scorer.worst_suppliers(3, "root_causes"):
+        print(f"  {row['name']}: {row['root_causes']:.2f}")
+    supplier = worst[0]["name"] if worst else ""
+    for row in scorer.worst_lots(3, "ppm", supplier, min_inspected=1):
+        print(f"  批次 {row['name']}: PPM {row['ppm']:.0f}")
+
+    if args.state:
+        print("状态已保存:", scorer.save(args.state))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轻量级链路追踪与性能剖析模块
+记录热点路径（文件读取、base64编码、模型调用、序列化、文档保存）的耗时、
+处理字节数和内存变化，未启用时开销接近于零
+"""
+
+import os
+import io
+import json
+import time
+import threading
+import functools
+import cProfile
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# 直方图默认桶（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class Histogram:
+    """累积直方图，兼容Prometheus的bucket语义"""
+
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    """内存中的指标注册表：耗时直方图 + 字节/内存计数器"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self.histograms = {}
+        self.bytes_total = {}
+        self.memory_delta_total = {}
+
+    def record(self, name: str, duration: float, nbytes: int = 0, memory_delta: int = 0):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram(self._buckets)
+            hist.observe(duration)
+            if nbytes:
+                self.bytes_total[name] = self.bytes_total.get(name, 0) + nbytes
+            if memory_delta:
+                self.memory_delta_total[name] = self.memory_delta_total.get(name, 0) + memory_delta
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.bytes_total.clear()
+            self.memory_delta_total.clear()
+
+    def to_prometheus(self, prefix: str = "qa") -> str:
+        """导出为Prometheus文本格式"""
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds 追踪区段耗时",
+            f"# TYPE {prefix}_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name in sorted(self.histograms):
+                hist = self.histograms[name]
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {hist.count}')
+                lines.append(f'{prefix}_span_duration_seconds_sum{{span="{name}"}} {hist.total:.9f}')
+                lines.append(f'{prefix}_span_duration_seconds_count{{span="{name}"}} {hist.count}')
+
+            lines.append(f"# HELP {prefix}_span_bytes_total 追踪区段处理字节数")
+            lines.append(f"# TYPE {prefix}_span_bytes_total counter")
+            for name in sorted(self.bytes_total):
+                lines.append(f'{prefix}_span_bytes_total{{span="{name}"}} {self.bytes_total[name]}')
+
+            lines.append(f"# HELP {prefix}_span_memory_delta_bytes 追踪区段内存变化")
+            lines.append(f"# TYPE {prefix}_span_memory_delta_bytes gauge")
+            for name in sorted(self.memory_delta_total):
+                lines.append(f'{prefix}_span_memory_delta_bytes{{span="{name}"}} {self.memory_delta_total[name]}')
+
+        return "\n".join(lines) + "\n"
+
+
+class Span:
+    """单个追踪区段"""
+
+    __slots__ = ("name", "start_ns", "duration_ns", "bytes", "memory_delta", "tid", "parent")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None):
+        self.name = name
+        self.start_ns = 0
+        self.duration_ns = 0
+        self.bytes = 0
+        self.memory_delta = 0
+        self.tid = threading.get_ident()
+        self.parent = parent
+
+    def add_bytes(self, nbytes: int):
+        self.bytes += nbytes
+
+
+class _NullSpan:
+    """未启用追踪时返回的空区段"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add_bytes(self, nbytes: int):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """追踪器：维护线程本地的区段栈，并将完成的区段写入注册表"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, max_spans: int = 100000):
+        self.enabled = False
+        self.track_memory = False
+        # 是否由 enable_tracing 启动了tracemalloc（调用方自己启动的不由本模块停止）
+        self.started_tracemalloc = False
+        self.registry = registry or MetricsRegistry()
+        self.max_spans = max_spans
+        self.finished_spans = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current_span(self) -> Optional[Span]:
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def _span(self, name: str):
+        stack = self._stack()
+        span = Span(name, stack[-1] if stack else None)
+        stack.append(span)
+        track_memory = self.track_memory and tracemalloc.is_tracing()
+        mem_before = tracemalloc.get_traced_memory()[0] if track_memory else 0
+        span.start_ns = time.perf_counter_ns()
+        try:
+            yield span
+        finally:
+            span.duration_ns = time.perf_counter_ns() - span.start_ns
+            if track_memory:
+                span.memory_delta = tracemalloc.get_traced_memory()[0] - mem_before
+            stack.pop()
+            self._finish(span)
+
+    def span(self, name: str):
+        """创建追踪区段（上下文管理器），未启用时返回空区段"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name)
+
+    def _finish(self, span: Span):
+        self.registry.record(span.name, span.duration_ns / 1e9, span.bytes, span.memory_delta)
+        with self._lock:
+            if len(self.finished_spans) < self.max_spans:
+                self.finished_spans.append(span)
+
+    def reset(self):
+        """清空已记录的区段和指标"""
+        with self._lock:
+            self.finished_spans = []
+        self.registry.reset()
+
+    def to_chrome_trace(self) -> Dict:
+        """转换为Chrome trace事件格式（chrome://tracing / Perfetto）"""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.finished_spans)
+        events = []
+        for span in spans:
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": span.start_ns / 1000.0,
+                "dur": span.duration_ns / 1000.0,
+                "pid": pid,
+                "tid": span.tid,
+                "args": {"bytes": span.bytes, "memory_delta": span.memory_delta}
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, output_path: str) -> str:
+        """导出Chrome trace JSON文件"""
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return output_path
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """获取全局追踪器"""
+    return _tracer
+
+
+def enable_tracing(track_memory: bool = False):
+    """
+    启用追踪
+
+    Args:
+        track_memory: 是否通过tracemalloc记录内存变化（开销较大）
+    """
+    _tracer.enabled = True
+    _tracer.track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _tracer.started_tracemalloc = True
+
+
+def disable_tracing():
+    """关闭追踪"""
+    _tracer.enabled = False
+    if _tracer.started_tracemalloc and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _tracer.started_tracemalloc = False
+    _tracer.track_memory = False
+
+
+def span(name: str):
+    """在全局追踪器上创建追踪区段"""
+    if not _tracer.enabled:
+        return _NULL_SPAN
+    return _tracer._span(name)
+
+
+def record_bytes(nbytes: int):
+    """为当前区段累加处理字节数"""
+    if _tracer.enabled:
+        current = _tracer.current_span()
+        if current is not None:
+            current.add_bytes(nbytes)
+
+
+def traced(name: str) -> Callable:
+    """
+    追踪装饰器，未启用时仅多一次属性判断
+
+    Args:
+        name: 区段名称，如 "multimedia.process_image"
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with _tracer._span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profile_capture(sort_by: str = "cumulative", limit: int = 30, memory_top: int = 10):
+    """
+    可选的cProfile + tracemalloc捕获模式
+
+    用法:
+        with profile_capture() as capture:
+            processor.process_image("defect.jpg")
+        print(capture["profile"])
+
+    Yields:
+        Dict: 退出后填充 "profile"（pstats文本）和 "memory_top"（内存分配热点）
+    """
+    capture = {"profile": "", "memory_top": []}
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield capture
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(sort_by).print_stats(limit)
+        capture["profile"] = stream.getvalue()
+        capture["memory_top"] = [
+            {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:memory_top]
+        ]
+
+
+# 通过环境变量开启：QA_TRACE=1，QA_TRACE=memory 同时记录内存
+if os.environ.get("QA_TRACE"):
+    enable_tracing(track_memory=os.environ.get("QA_TRACE") == "memory")
+
+
+def main():
+    """主函数，用于测试"""
+    enable_tracing(track_memory=True)
+
+    @traced("demo.work")
+    def work(n):
+        with span("demo.inner"):
+            record_bytes(n)
+            return sum(range(n))
+
+    for n in (1000, 10000, 100000):
+        work(n)
+
+    print(get_tracer().registry.to_prometheus())
+    print("Chrome trace事件数:", len(get_tracer().to_chrome_trace()["traceEvents"]))
+
+    with profile_capture(limit=5) as capture:
+        work(200000)
+    print(capture["profile"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频时间轴索引
+将 process_video 结果中的 "00:00:25" 形式的事件时间解析为毫秒整数，按视频存入有序数组，
+并建立"事件类型 -> (视频, 偏移)"的全局倒排索引，跨视频查找事件只需查表，
+命中结果可直接换算为剪辑片段的起止位置
+"""
+
+import os
+import time
+import argparse
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from . import serializers
+except ImportError:
+    import serializers
+
+# 含时间点的结果字段 -> 事件描述所在的键
+TIMED_EVENT_FIELDS = (
+    ("operation_sequence", "action"),
+    ("abnormal_points", "event")
+)
+
+INDEX_VERSION = 1
+
+
+def parse_timecode(value) -> int:
+    """
+    将时间码解析为毫秒
+
+    Args:
+        value: "HH:MM:SS"、"MM:SS"、"HH:MM:SS.mmm" 或秒数
+
+    Returns:
+        int: 毫秒偏移
+    """
+    if isinstance(value, (int, float)):
+        return int(round(value * 1000))
+    seconds = 0.0
+    for part in str(value).strip().split(":"):
+        seconds = seconds * 60 + float(part)
+    return int(round(seconds * 1000))
+
+
+def format_timecode(offset_ms: int) -> str:
+    """将毫秒偏移格式化为 HH:MM:SS(.mmm)"""
+    seconds, millis = divmod(max(offset_ms, 0), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    text = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{text}.{millis:03d}" if millis else text
+
+
+def extract_events(analysis_result: Dict) -> List[Tuple[int, str]]:
+    """
+    从 process_video 的结果中提取带时间点的事件
+
+    Returns:
+        List[Tuple[int, str]]: (毫秒偏移, 事件描述)
+    """
+    events = []
+    for field, label_key in TIMED_EVENT_FIELDS:
+        for item in analysis_result.get(field, ()):
+            if "time" in item and item.get(label_key):
+                events.append((parse_timecode(item["time"]), item[label_key]))
+    return events
+
+
+class VideoTimeline:
+    """单个视频的事件时间轴：按偏移排序的并列数组"""
+
+    __slots__ = ("video_id", "path", "content_hash", "offsets", "type_ids")
+
+    def __init__(self, video_id: str, path: str = "", content_hash: str = ""):
+        self.video_id = video_id
+        self.path = path
+        self.content_hash = content_hash
+        self.offsets = array("q")
+        self.type_ids = array("l")
+
+    def set_events(self, events: Iterable[Tuple[int, int]]):
+        """以 (偏移, 事件类型ID) 重建时间轴"""
+        ordered = sorted(events)
+        self.offsets = array("q", (offset for offset, _ in ordered))
+        self.type_ids = array("l", (type_id for _, type_id in ordered))
+
+    def range(self, start_ms: int, end_ms: int) -> Tuple[int, int]:
+        """二分查找 [start_ms, end_ms] 内事件的下标范围"""
+        return bisect_left(self.offsets, start_ms), bisect_right(self.offsets, end_ms)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+
+class TimelineIndex:
+    """跨视频事件时间轴索引"""
+
+    def __init__(self):
+        self.videos = {}
+        self.event_types = []
+        self._type_ids = {}
+        # 事件类型ID -> 视频ID -> 有序偏移数组
+        self._postings = {}
+
+    def _type_id(self, event_type: str) -> int:
+        type_id = self._type_ids.get(event_type)
+        if type_id is None:
+            type_id = self._type_ids[event_type] = len(self.event_types)
+            self.event_types.append(event_type)
+        return type_id
+
+    def add_video(self, video_id: str, analysis_results: Iterable[Dict], path: str = "") -> int:
+        """
+        索引一个视频（同一视频再次添加时替换原有事件；内容哈希、提取出的事件和路径都未变时跳过，
+        同一内容重新分析后结果变化也会更新索引）
+
+        Args:
+            video_id: 视频ID
+            analysis_results: 该视频的一个或多个 process_video 结果
+            path: 视频文件路径，用于剪辑定位
+
+        Returns:
+            int: 索引的事件数
+        """
+        if isinstance(analysis_results, dict):
+            analysis_results = [analysis_results]
+        analysis_results = [r for r in analysis_results if r.get("status") != "error"]
+        content_hash = next((r.get("content_hash", "") for r in analysis_results if r.get("content_hash")), "")
+
+        events = set()
+        for result in analysis_results:
+            for offset, label in extract_events(result):
+                events.add((offset, self._type_id(label)))
+
+        existing = self.videos.get(video_id)
+        if existing is not None:
+            if (content_hash and existing.content_hash == content_hash and existing.path == (path or video_id)
+                    and set(zip(existing.offsets, existing.type_ids)) == events):
+                return len(existing)
+            self.remove_video(video_id)
+
+        timeline = VideoTimeline(video_id, path or video_id, content_hash)
+        timeline.set_events(events)
+        self.videos[video_id] = timeline
+
+        per_type = {}
+        for offset, type_id in zip(timeline.offsets, timeline.type_ids):
+            per_type.setdefault(type_id, array("q")).append(offset)
+        for type_id, offsets in per_type.items():
+            self._postings.setdefault(type_id, {})[video_id] = offsets
+        return len(timeline)
+
+    def remove_video(self, video_id: str):
+        """移除视频及其倒排索引项"""
+        timeline = self.videos.pop(video_id, None)
+        if timeline is None:
+            return
+        for type_id in set(timeline.type_ids):
+            postings = self._postings.get(type_id)
+            if postings is not None:
+                postings.pop(video_id, None)
+
+    def match_types(self, query: str, exact: bool = False) -> List[str]:
+        """
+        匹配事件类型（事件类型数量远小于事件数，子串匹配只扫描类型表）
+
+        Args:
+            query: 事件描述或关键词
+            exact: 是否精确匹配
+        """
+        if exact:
+            return [query] if query in self._type_ids else []
+        return [event_type for event_type in self.event_types if query in event_type]
+
+    def find(self, query: str, exact: bool = False,
+             videos: Optional[Iterable[str]] = None) -> List[Tuple[str, int, str]]:
+        """
+        跨视频查找事件
+
+        Args:
+            query: 事件描述或关键词，如 "停机"
+            exact: 是否精确匹配事件类型
+            videos: 限定的视频ID
+
+        Returns:
+            List[Tuple[str, int, str]]: (视频ID, 毫秒偏移, 事件类型)，按视频和时间排序
+        """
+        allowed = set(videos) if videos is not None else None
+        hits = []
+        for event_type in self.match_types(query, exact):
+            for video_id, offsets in self._postings.get(self._type_ids[event_type], {}).items():
+                if allowed is None or video_id in allowed:
+                    hits.extend((video_id, offset, event_type) for offset in offsets)
+        hits.sort()
+        return hits
+
+    def events_between(self, video_id: str, start_ms: int, end_ms: int) -> List[Tuple[int, str]]:
+        """获取视频中某一时间段内的所有事件"""
+        timeline = self.videos.get(video_id)
+        if timeline is None:
+            return []
+        lo, hi = timeline.range(start_ms, end_ms)
+        return [(timeline.offsets[i], self.event_types[timeline.type_ids[i]]) for i in range(lo, hi)]
+
+    def clip_windows(self, query: str, before_ms: int = 5000, after_ms: int = 5000,
+                     exact: bool = False) -> List[Dict]:
+        """
+        计算命中事件周围的剪辑片段，同一视频中重叠的片段合并
+
+        Args:
+            query: 事件描述或关键词
+            before_ms: 事件前保留的毫秒数
+            after_ms: 事件后保留的毫秒数
+            exact: 是否精确匹配事件类型
+
+        Returns:
+            List[Dict]: 片段（视频路径、起止偏移、时间码和直接定位的ffmpeg参数）
+        """
+        windows = []
+        for video_id, offset, event_type in self.find(query, exact):
+            start, end = max(offset - before_ms, 0), offset + after_ms
+            last = windows[-1] if windows else None
+            if last is not None and last["video_id"] == video_id and start <= last["end_ms"]:
+                last["end_ms"] = max(last["end_ms"], end)
+                last["events"].append(event_type)
+                continue
+            windows.append({"video_id": video_id, "path": self.videos[video_id].path,
+                            "start_ms": start, "end_ms": end, "events": [event_type]})
+
+        for window in windows:
+            window["start"] = format_timecode(window["start_ms"])
+            window["end"] = format_timecode(window["end_ms"])
+            # -ss 放在 -i 之前由解复用器直接定位到关键帧，无需从头解码
+            window["ffmpeg_args"] = ["-ss", f"{window['start_ms'] / 1000:.3f}", "-i", window["path"],
+                                     "-t", f"{(window['end_ms'] - window['start_ms']) / 1000:.3f}",
+                                     "-c", "copy"]
+        return windows
+
+    def stats(self) -> Dict:
+        """索引规模统计"""
+        return {"videos": len(self.videos), "event_types": len(self.event_types),
+                "events": sum(len(t) for t in self.videos.values())}
+
+    def save(self, path: str, fmt: Optional[str] = None) -> str:
+        """保存索引（时间轴以整数列表存储，加载时重建倒排索引）"""
+        state = {
+            "version": INDEX_VERSION,
+            "event_types": self.event_types,
+            "videos": [
+                {"video_id": t.video_id, "path": t.path, "content_hash": t.content_hash,
+                 "offsets": t.offsets.tolist(), "type_ids": t.type_ids.tolist()}
+                for t in self.videos.values()
+            ]
+        }
+        return serializers.write_file(state, path, fmt)
+
+    @classmethod
+    def load(cls, path: str, fmt: Optional[str] = None) -> "TimelineIndex":
+        """从 save() 保存的文件恢复索引"""
+        state = serializers.read_file(path, fmt)
+        if state.get("version") != INDEX_VERSION:
+            raise ValueError(f"不支持的索引版本: {state.get('version')}")
+        index = cls()
+        for event_type in state["event_types"]:
+            index._type_id(event_type)
+        for entry in state["videos"]:
+            timeline = VideoTimeline(entry["video_id"], entry["path"], entry["content_hash"])
+            timeline.offsets = array("q", entry["offsets"])
+            timeline.type_ids = array("l", entry["type_ids"])
+            index.videos[timeline.video_id] = timeline
+            for offset, type_id in zip(timeline.offsets, timeline.type_ids):
+                index._postings.setdefault(type_id, {}).setdefault(timeline.video_id, array("q")).append(offset)
+        return index
+
+
+def index_videos(index: TimelineIndex, video_paths: Iterable[str], processor=None,
+                 analysis_types: Tuple[str, ...] = ("operation_sequence", "fault_phenomenon")) -> int:
+    """
+    分析视频并加入索引
+
+    Args:
+        index: 时间轴索引
+        video_paths: 视频文件路径
+        processor: MultimediaProcessor，默认新建
+        analysis_types: 需要执行的视频分析类型
+
+    Returns:
+        int: 索引的事件总数
+    """
+    if processor is None:
+        try:
+            from .multimedia_processor import MultimediaProcessor
+        except ImportError:
+            from multimedia_processor import MultimediaProcessor
+        processor = MultimediaProcessor()
+
+    total = 0
+    for path in video_paths:
+        results = [processor.process_video(path, analysis_type) for analysis_type in analysis_types]
+        total += index.add_video(path, results, path)
+    return total
+
+
+def _synthetic_result(rng, video_number: int) -> Dict:
+    actions = ["开机", "设定温度", "启动压缩机", "压缩机异常停机", "风机启动", "化霜", "关机"]
+    offset = 0
+    sequence, abnormal = [], []
+    for _ in range(rng.randint(20, 60)):
+        offset += rng.randint(2, 90)
+        action = rng.choice(actions)
+        sequence.append({"time": format_timecode(offset * 1000), "action": action})
+        if "异常" in action:
+            abnormal.append({"time": format_timecode(offset * 1000), "event": action})
+    return {"status": "success", "content_hash": f"synthetic-{video_number}",
+            "operation_sequence": sequence, "abnormal_points": abnormal}
+
+
+def main():
+    """命令行入口：索引视频并查询事件，未提供视频时使用合成录像"""
+    parser = argparse.ArgumentParser(description="视频时间轴事件索引")
+    parser.add_argument("videos", nargs="*", help="视频文件")
+    parser.add_argument("--query", default="停机", help="要查找的事件关键词")
+    parser.add_argument("--index", default="", help="索引文件，存在时先加载，结束后保存")
+    parser.add_argument("--window", type=float, default=5.0, help="事件前后保留的秒数")
+    args = parser.parse_args()
+
+    if args.index and os.path.exists(args.index):
+        index = TimelineIndex.load(args.index)
+    else:
+        index = TimelineIndex()
+
+    start = time.perf_counter()
+    if args.videos:
+        index_videos(index, args.videos)
+    elif not index.videos:
+        import random
+        rng = random.Random(0)
+        for number in range(5000):
+            index.add_video(f"recordings/2024-01/cam{number:04d}.mp4", _synthetic_result(rng, number))
+    print(f"索引: {index.stats()} ({time.perf_counter() - start:.2f}s)")
+
+    start = time.perf_counter()
+    hits = index.find(args.query)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"查询 '{args.query}': {len(hits)}个事件，{len({h[0] for h in hits})}个视频 ({elapsed:.2f}ms)")
+
+    window_ms = int(args.window * 1000)
+    for clip in index.clip_windows(args.query, window_ms, window_ms)[:5]:
+        print(f"  {clip['video_id']} {clip['start']} - {clip['end']}: ffmpeg {' '.join(clip['ffmpeg_args'])}")
+
+    if args.index:
+        index.save(args.index)
+
+
+if __name__ == "__main__":
+    main()
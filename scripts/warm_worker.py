@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻预热工作进程
+一次性预加载并冻结问题/报告模板、参考文档索引和重量级依赖，然后通过标准输入JSONL
+或本地Unix套接字提供处理服务；套接字模式下预先fork多个写时复制的工作进程，
+每个请求只承担实际处理的开销
+
+请求格式（每行一个JSON）: {"id": 1, "op": "process_image", "args": {...}}
+响应格式: {"id": 1, "ok": true, "result": ..., "elapsed_ms": 0.3}
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+import importlib
+from typing import Callable, Dict, Optional
+
+try:
+    from .five_w_interviewer import FiveWInterviewer
+    from .eight_d_report_generator import EightDReportGenerator
+    from .multimedia_processor import MultimediaProcessor
+    from .question_scheduler import AdaptiveQuestionScheduler
+    from .interview_to_8d import InterviewTo8DMapper
+    from .render_farm import render_artifact
+    from . import serializers
+except ImportError:
+    from five_w_interviewer import FiveWInterviewer
+    from eight_d_report_generator import EightDReportGenerator
+    from multimedia_processor import MultimediaProcessor
+    from question_scheduler import AdaptiveQuestionScheduler
+    from interview_to_8d import InterviewTo8DMapper
+    from render_farm import render_artifact
+    import serializers
+
+# 可选的重量级依赖，预加载失败不影响其他功能
+OPTIONAL_IMPORTS = ("docx", "PIL.Image", "orjson", "msgpack")
+
+WARMUP_ANSWER = "2024年1月20日上午9:30，北美工厂供应商A的启动电容导致压缩机停机，已有300台受影响"
+
+REFERENCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "references")
+
+# 请求处理函数注册表：op -> handler(worker, args)
+HANDLERS = {}
+
+
+def handler(op: str) -> Callable:
+    """注册请求处理函数"""
+    def decorator(func: Callable) -> Callable:
+        HANDLERS[op] = func
+        return func
+    return decorator
+
+
+def load_reference_index(directory: str = REFERENCES_DIR) -> Dict[str, Dict[str, str]]:
+    """
+    按标题切分参考文档
+
+    Returns:
+        Dict[str, Dict[str, str]]: 文档名 -> {标题: 正文}
+    """
+    index = {}
+    if not os.path.isdir(directory):
+        return index
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".md"):
+            continue
+        sections = {}
+        title, lines = "", []
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith("#"):
+                    if lines:
+                        sections[title] = "".join(lines).strip()
+                    title, lines = line.lstrip("#").strip(), []
+                else:
+                    lines.append(line)
+        if lines:
+            sections[title] = "".join(lines).strip()
+        index[os.path.splitext(name)[0]] = sections
+    return index
+
+
+class WarmWorker:
+    """预热后的请求处理器"""
+
+    def __init__(self):
+        self.preload_stats = {}
+        self.references = {}
+        self.processor = None
+        self.requests_served = 0
+
+    def preload(self) -> Dict:
+        """
+        预加载模板、参考文档和可选依赖，完成后冻结GC跟踪的对象，
+        使fork出的子进程不会因垃圾回收写入这些对象而复制内存页
+
+        Returns:
+            Dict: 各项预加载耗时和已加载的可选依赖
+        """
+        stats = {"optional_imports": []}
+        start = time.perf_counter()
+        for module in OPTIONAL_IMPORTS:
+            try:
+                importlib.import_module(module)
+                stats["optional_imports"].append(module)
+            except ImportError:
+                pass
+        stats["imports_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        templates = FiveWInterviewer.freeze_templates()
+        EightDReportGenerator.freeze_template()
+        AdaptiveQuestionScheduler().reset(templates)
+        # 每条验证规则执行一次，提前完成首次调用时的惰性初始化
+        for phase_data in templates.values():
+            for question in phase_data["questions"]:
+                FiveWInterviewer._frozen_validator.validate(question["id"], WARMUP_ANSWER, [], [])
+        stats["templates_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        self.references = load_reference_index()
+        stats["references_ms"] = (time.perf_counter() - start) * 1000
+
+        self.processor = MultimediaProcessor()
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+        self.preload_stats = stats
+        return stats
+
+    def handle(self, request: Dict) -> Dict:
+        """处理单个请求，异常转换为错误响应"""
+        start = time.perf_counter()
+        response = {"id": request.get("id")}
+        func = HANDLERS.get(request.get("op"))
+        try:
+            if func is None:
+                raise ValueError(f"未知的操作: {request.get('op')}")
+            response["result"] = func(self, request.get("args") or {})
+            response["ok"] = True
+        except Exception as e:
+            response["ok"] = False
+            response["error"] = str(e)
+        response["elapsed_ms"] = (time.perf_counter() - start) * 1000
+        self.requests_served += 1
+        return response
+
+    def serve_stream(self, reader, writer):
+        """在一对二进制流上处理JSONL请求，直到输入结束"""
+        for line in reader:
+            if not line.strip():
+                continue
+            try:
+                request = serializers.loads(line, "json")
+            except ValueError as e:
+                request = None
+                response = {"id": None, "ok": False, "error": f"无效的请求: {e}"}
+            else:
+                if not isinstance(request, dict):
+                    response = {"id": None, "ok": False,
+                                "error": f"无效的请求: 应为JSON对象，实际为{type(request).__name__}"}
+                    request = None
+            if request is not None:
+                response = self.handle(request)
+            writer.write(serializers.dumps(response, "json") + b"\n")
+            writer.flush()
+
+
+@handler("ping")
+def _ping(worker: WarmWorker, args: Dict) -> Dict:
+    return {"pid": os.getpid(), "requests_served": worker.requests_served, "preload": worker.preload_stats}
+
+
+@handler("process_image")
+def _process_image(worker: WarmWorker, args: Dict) -> Dict:
+    return worker.processor.process_image(args["path"], args.get("analysis_type", "quality_defect"))
+
+
+@handler("process_video")
+def _process_video(worker: WarmWorker, args: Dict) -> Dict:
+    return worker.processor.process_video(args["path"], args.get("analysis_type", "operation_sequence"))
+
+
+@handler("validate_answer")
+def _validate_answer(worker: WarmWorker, args: Dict) -> Dict:
+    return FiveWInterviewer._frozen_validator.validate(
+        args["question_id"], args.get("answer_text", ""),
+        args.get("answer_details", []), args.get("supporting_evidence", []))
+
+
+@handler("interview_to_8d")
+def _interview_to_8d(worker: WarmWorker, args: Dict) -> Dict:
+    mapper = InterviewTo8DMapper.from_export(args["path"])
+    return {phase: data.to_dict() for phase, data in mapper.drafts().items()}
+
+
+@handler("generate_report")
+def _generate_report(worker: WarmWorker, args: Dict) -> str:
+    generator = EightDReportGenerator.from_report_data({"8D分析": args["phases"]})
+    return generator.generate_report(args["output_path"], args.get("fmt"), args.get("pretty", False))
+
+
+@handler("render")
+def _render(worker: WarmWorker, args: Dict) -> Dict:
+    return {"output": args["output_path"],
+            "bytes": render_artifact(args["format"], args["report_data"], args["output_path"])}
+
+
+@handler("reference")
+def _reference(worker: WarmWorker, args: Dict):
+    sections = worker.references.get(args["name"])
+    if sections is None:
+        raise ValueError(f"未知的参考文档: {args['name']}")
+    if "section" in args:
+        return sections.get(args["section"], "")
+    return list(sections)
+
+
+def serve_stdin(worker: WarmWorker):
+    """标准输入/输出JSONL模式（单进程）"""
+    worker.serve_stream(sys.stdin.buffer, sys.stdout.buffer)
+
+
+def _accept_loop(worker: WarmWorker, server: socket.socket):
+    """子进程：逐个接受连接并处理其中的全部请求"""
+    while True:
+        try:
+            conn, _ = server.accept()
+        except InterruptedError:
+            continue
+        with conn:
+            reader, writer = conn.makefile("rb"), conn.makefile("wb")
+            try:
+                worker.serve_stream(reader, writer)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                reader.close()
+                writer.close()
+
+
+def _spawn(worker: WarmWorker, server: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            _accept_loop(worker, server)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def serve_socket(worker: WarmWorker, path: str, workers: int = 0):
+    """
+    Unix套接字预fork模式：父进程预加载后fork工作进程，工作进程异常退出时自动补充
+
+    Args:
+        worker: 已预加载的处理器
+        path: 套接字文件路径
+        workers: 工作进程数，默认CPU核数
+    """
+    if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("套接字预fork模式需要POSIX系统，请使用 --stdin 模式")
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(128)
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    children = set()
+    try:
+        for _ in range(workers or os.cpu_count() or 1):
+            children.add(_spawn(worker, server))
+        print(f"预热工作进程已就绪: {path} ({len(children)}个进程)", file=sys.stderr, flush=True)
+        while True:
+            pid, _ = os.wait()
+            if pid in children:
+                children.discard(pid)
+                children.add(_spawn(worker, server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+class WarmWorkerClient:
+    """预热工作进程的套接字客户端"""
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(path)
+        self._reader = self._sock.makefile("rb")
+        self._writer = self._sock.makefile("wb")
+        self._next_id = 0
+
+    def call(self, op: str, **args):
+        """
+        发送请求并等待响应
+
+        Returns:
+            处理结果，失败时抛出 RuntimeError
+        """
+        self._next_id += 1
+        self._writer.write(serializers.dumps({"id": self._next_id, "op": op, "args": args}, "json") + b"\n")
+        self._writer.flush()
+        line = self._reader.readline()
+        if not line:
+            raise RuntimeError("工作进程已关闭连接")
+        response = serializers.loads(line, "json")
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error", "请求失败"))
+        return response["result"]
+
+    def close(self):
+        self._reader.close()
+        self._writer.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="常驻预热工作进程")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--stdin", action="store_true", help="从标准输入读取JSONL请求")
+    mode.add_argument("--socket", default="", help="监听的Unix套接字路径（预fork模式）")
+    mode.add_argument("--call", nargs=2, metavar=("SOCKET", "REQUEST"),
+                      help='向运行中的工作进程发送请求，如 /tmp/qa.sock \'{"op": "ping"}\'')
+    parser.add_argument("--workers", type=int, default=0, help="预fork的工作进程数，默认CPU核数")
+    args = parser.parse_args()
+
+    if args.call:
+        path, request = args.call
+        request = serializers.loads(request.encode("utf-8"), "json")
+        with WarmWorkerClient(path) as client:
+            result = client.call(request["op"], **request.get("args", {}))
+        print(serializers.dumps(result, "json", pretty=True).decode("utf-8"))
+        return
+
+    worker = WarmWorker()
+    stats = worker.preload()
+    if args.socket:
+        serve_socket(worker, args.socket, args.workers)
+    elif args.stdin:
+        serve_stdin(worker)
+    else:
+        print("预加载:", stats)
+        for request in ({"id": 1, "op": "ping"},
+                        {"id": 2, "op": "validate_answer",
+                         "args": {"question_id": "when_problem", "answer_text": "2024年1月20日上午9:30"}},
+                        {"id": 3, "op": "reference", "args": {"name": "8d_report_standard"}}):
+            print(worker.handle(request))
+
+
+if __name__ == "__main__":
+    main()